@@ -1,27 +1,87 @@
-import pandas as pd
 import streamlit as st
 import datetime as dt
 from streamlit_folium import st_folium
 import folium
-from utils.model_interface import load_preprocessor_and_model, predict_from_input
+from utils.ui_metadata import get_file_version, get_ui_metadata_version, load_ui_metadata
 
-load_preprocessor_and_model()
 
-df = pd.read_csv("data/ANALYSED_Melbourne_Housing_Market.csv")
+@st.cache_data
+def get_ui_metadata(version: float) -> dict:
+    return load_ui_metadata()
+
+
+@st.cache_resource
+def get_model_interface():
+    import utils.model_interface as mi
+    from utils.profiling import enable_from_environment
+    enable_from_environment()
+    mi.load_preprocessor_and_model()
+    mi.enable_prediction_cache()
+    return mi
+
+
+@st.cache_resource
+def get_spatial_index():
+    import os
+    from utils.spatial_index import SPATIAL_INDEX_PATH, load_spatial_index
+    return load_spatial_index() if os.path.exists(SPATIAL_INDEX_PATH) else None
+
+
+def option_index(options: list, value, fallback=None) -> int:
+    if value is None or (value not in options and fallback not in options):
+        return 0
+    return options.index(value if value in options else fallback)
+
+
+@st.cache_data
+def get_price_tiles(version: float) -> dict:
+    import json
+    import os
+    if not os.path.exists("data/price_tiles/manifest.json"):
+        return None
+    with open("data/price_tiles/manifest.json") as file:
+        return json.load(file)
+
+
+@st.cache_resource(max_entries=32)
+def get_base_map(location: tuple, zoom: int, tiles_image: str = None, tiles_bounds: tuple = None) -> folium.Map:
+    m = folium.Map(location=list(location), zoom_start=zoom)
+    if tiles_image is not None:
+        folium.raster_layers.ImageOverlay(tiles_image, bounds=[list(corner) for corner in tiles_bounds], opacity=0.5,
+                                          name="Predicted price").add_to(m)
+        folium.LayerControl().add_to(m)
+    m.add_child(folium.LatLngPopup())
+    return m
+
+
+metadata = get_ui_metadata(get_ui_metadata_version())
+bounds, categories = metadata["bounds"], metadata["categories"]
 
 st.title("Melbourne Property Price Predictor")
 
-lat_min, lat_max = df["Latitude"].min(), df["Latitude"].max()
-lng_min, lng_max = df["Longitude"].min(), df["Longitude"].max()
+lat_min, lat_max = bounds["Latitude"]
+lng_min, lng_max = bounds["Longitude"]
 lat_cen = ((lat_max - lat_min) / 2) + lat_min
 lng_cen = ((lng_max - lng_min) / 2) + lng_min
 if "clicked_point" not in st.session_state:
     st.session_state.clicked_point = None
-m = folium.Map(location=[lat_cen, lng_cen], zoom_start=10)
-m.add_child(folium.LatLngPopup())
+if "map_view" not in st.session_state:
+    st.session_state.map_view = ((round(lat_cen, 3), round(lng_cen, 3)), 10)
+location, zoom = st.session_state.map_view
+price_tiles = get_price_tiles(get_file_version("data/price_tiles/manifest.json"))
+if price_tiles is not None:
+    levels = [level for level in price_tiles["levels"] if level["zoom"] <= zoom] or price_tiles["levels"][:1]
+    tiles_bounds = tuple(zip(*(price_tiles["bounds"][column] for column in ["Latitude", "Longitude"])))
+    m = get_base_map(location, zoom, levels[-1]["image"], tiles_bounds)
+else:
+    m = get_base_map(location, zoom)
 map_data = st_folium(m, width=800, height=400)
+if map_data and map_data.get("zoom") and map_data.get("center"):
+    st.session_state.map_view = ((round(map_data["center"]["lat"], 3), round(map_data["center"]["lng"], 3)),
+                                 int(map_data["zoom"]))
 if map_data and map_data.get("last_clicked"):
     st.session_state.clicked_point = map_data["last_clicked"]
+suggestions = {}
 if st.session_state.clicked_point:
     lat = st.session_state.clicked_point["lat"]
     lng = st.session_state.clicked_point["lng"]
@@ -30,6 +90,11 @@ if st.session_state.clicked_point:
         lat, lng = lat_cen, lng_cen
     else:
         st.success(f"Latitude: {lat}, Longitude: {lng}")
+        spatial_index = get_spatial_index()
+        if spatial_index is not None:
+            suggestions = spatial_index.suggest_inputs(lat, lng)
+            with st.expander("Nearest historical sales"):
+                st.dataframe(spatial_index.nearest(lat, lng))
 else:
     st.write("Click on the map to get unit coordinates")
     lat, lng = lat_cen, lng_cen
@@ -39,25 +104,32 @@ with st.form("model_input_form"):
 
     year_built = st.date_input("When was it built?", value=dt.date.today() - dt.timedelta(days=20 * 365)).year
 
-    region_names = sorted(df["RegionName"].unique())
-    region_name = st.radio("To which Region does it belong?", region_names, horizontal=True)
+    region_names = categories["RegionName"]
+    region_name = st.radio("To which Region does it belong?", region_names, horizontal=True,
+                           index=option_index(region_names, suggestions.get("RegionName")))
 
-    suburbs = sorted(df["Suburb"].unique())
-    suburb = st.selectbox("To which Suburb does it belong?", suburbs)
+    suburbs = categories["Suburb"]
+    suburb = st.selectbox("To which Suburb does it belong?", suburbs,
+                          index=option_index(suburbs, suggestions.get("Suburb"), "Other"))
 
-    council_areas = sorted(df["CouncilArea"].unique())
-    council_area = st.selectbox("To which Suburb does it belong?", council_areas)
+    council_areas = categories["CouncilArea"]
+    council_area = st.selectbox("To which Suburb does it belong?", council_areas,
+                                index=option_index(council_areas, suggestions.get("CouncilArea")))
 
-    min_distance_to_cbd, max_distance_to_cbd = df["DistanceToCBD"].min(), df["DistanceToCBD"].max()
+    min_distance_to_cbd, max_distance_to_cbd = bounds["DistanceToCBD"]
     distance_to_cbd = st.slider("Distance to City Center (Kilometers):", min_value=min_distance_to_cbd,
-                                max_value=max_distance_to_cbd)
+                                max_value=max_distance_to_cbd,
+                                value=min(max(suggestions.get("DistanceToCBD", min_distance_to_cbd),
+                                              min_distance_to_cbd), max_distance_to_cbd))
 
-    postcode = st.number_input("Enter the unit's Postcode:", min_value=0, max_value=10000, value=1000)
+    postcode = st.number_input("Enter the unit's Postcode:", min_value=0, max_value=10000,
+                               value=int(suggestions.get("Postcode", 1000)))
 
     neighbouring_properties = st.number_input("Enter the number of Neighbouring Properties:", min_value=0,
-                                              max_value=20000, value=500)
+                                              max_value=20000,
+                                              value=min(int(suggestions.get("NeighbouringProperties", 500)), 20000))
 
-    real_estate_agents = sorted(df["RealEstateAgent"].unique())
+    real_estate_agents = categories["RealEstateAgent"]
     real_estate_agent = st.selectbox("Which Real Estate Agent is offering?", real_estate_agents)
 
     land_size = st.number_input("What is the size of the Land (Square Meters)?", min_value=0, max_value=10000,
@@ -66,21 +138,23 @@ with st.form("model_input_form"):
     building_area = st.number_input("What is the size of the Unit (Square Meters)?", min_value=0,
                                     max_value=land_size, value=250)
 
-    bedrooms = sorted(df["Bedrooms"].unique().astype(int))
+    bedrooms = categories["Bedrooms"]
     n_bedrooms = st.radio("How many Bedrooms in the unit?", bedrooms, horizontal=True)
 
-    rooms = sorted(df["Rooms"].unique().astype(int))
+    rooms = categories["Rooms"]
     n_rooms = st.radio("How many other rooms are there?", rooms, horizontal=True)
 
-    bathrooms = sorted(df["Bathrooms"].unique().astype(int))
+    bathrooms = categories["Bathrooms"]
     n_bathrooms = st.radio("How many Bathrooms in the unit?", bathrooms, horizontal=True)
 
-    car_spots = sorted(df["CarSpots"].unique().astype(int))
+    car_spots = categories["CarSpots"]
     n_car_spots = st.radio("How many Car Spots in the unit?", car_spots, horizontal=True)
 
     submitted = st.form_submit_button("Predict")
 
     if submitted:
+        import pandas as pd
+        mi = get_model_interface()
         user_input = pd.Series({
             "Latitude": lat,
             "Longitude": lng,
@@ -100,5 +174,23 @@ with st.form("model_input_form"):
             "Bathrooms": n_bathrooms,
             "CarSpots": n_car_spots
         })
-        pred = predict_from_input(user_input)
+        pred = mi.predict_from_input(user_input)
+        st.session_state.last_input = user_input
         st.success(f"ML Model Prediction: ${pred:,.2f}")
+
+if "last_input" in st.session_state:
+    st.subheader("Sensitivity")
+    sweep_ranges = {"LandSize": (0, 10000), "BuildingArea": (0, 10000), "DistanceToCBD": tuple(bounds["DistanceToCBD"]),
+                    "YearBuilt": (1800, dt.date.today().year), "NeighbouringProperties": (0, 20000), "SaleDate": None}
+    sweep_field = st.selectbox("Which input should vary?", list(sweep_ranges))
+    n_points = st.slider("Number of points:", min_value=10, max_value=1000, value=200)
+    if sweep_field == "SaleDate":
+        first_date = st.session_state.last_input["SaleDate"]
+        sweep_values = [first_date + dt.timedelta(days=365 * index / (n_points - 1)) for index in range(n_points)]
+    else:
+        sweep_min, sweep_max = sweep_ranges[sweep_field]
+        sweep_low, sweep_high = st.slider("Range:", min_value=sweep_min, max_value=sweep_max,
+                                          value=(sweep_min, sweep_max))
+        sweep_values = [sweep_low + (sweep_high - sweep_low) * index / (n_points - 1) for index in range(n_points)]
+    sweep = get_model_interface().sweep_predictions(st.session_state.last_input, {sweep_field: sweep_values})
+    st.line_chart(sweep, x=sweep_field, y="PredictedPrice")
@@ -0,0 +1,161 @@
+import argparse
+import datetime as dt
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import timeit
+import numpy as np
+import pandas as pd
+import sklearn
+import utils.model_interface as mi
+import utils.pipeline as pipeline
+import utils.price_tiles as tiles
+from utils.storage import load_dataset
+from benchmarks.compiled_model_benchmark import make_model_inputs
+from benchmarks.synthetic_data import write_raw_sales
+
+BASELINE_PATH = "benchmarks/baselines/baseline.json"
+DEFAULT_SCALES = [10_000, 100_000]
+STAGE_INPUTS = {"cleaning": None, "feature_engineering": "data/CLEANED_Melbourne_Housing_Market",
+                "analysis": "data/ENGINEERED_Melbourne_Housing_Market",
+                "preprocessing": "data/ANALYSED_Melbourne_Housing_Market"}
+PRICE_TILE_CELLS = (tiles.BASE_RESOLUTION * 2 ** (tiles.N_LEVELS - 1)) ** 2
+SERVED_MODEL = "GradientBoostingRegressor"
+REGRESSION_THRESHOLD = 0.2
+MIN_BENCHMARK_SECONDS = 1.0
+MAX_REPEATS = 50
+RESULT_COLUMNS = ["benchmark", "scale", "items", "seconds", "seconds_min", "items_per_second"]
+
+
+def time_repeats(function, repeats: int, warmup: int = 0, min_seconds: float = MIN_BENCHMARK_SECONDS) -> list:
+    for _ in range(warmup):
+        function()
+    seconds = []
+    while len(seconds) < repeats or (sum(seconds) < min_seconds and len(seconds) < MAX_REPEATS):
+        start = time.perf_counter()
+        function()
+        seconds.append(time.perf_counter() - start)
+    return seconds
+
+
+def summarize_timings(benchmark: str, scale: int, items: int, seconds: list) -> dict:
+    median = statistics.median(seconds)
+    return {"benchmark": benchmark, "scale": scale, "items": items, "seconds": median, "seconds_min": min(seconds),
+            "items_per_second": items / median if median else np.nan}
+
+
+def benchmark_scale(scale: int, repeats: int = 3, models: list = (), seed: int = 0, latency_calls: int = 200,
+                    batch_size: int = 10_000, workdir: str = None) -> pd.DataFrame:
+    results = []
+    with tempfile.TemporaryDirectory(dir=workdir) as directory:
+        prefix = directory + "/"
+        os.makedirs(prefix + "data")
+        os.makedirs(prefix + "raw")
+        write_raw_sales(f"{prefix}data/Melbourne_Housing_Market.csv", scale, seed)
+        for stage, input_path in STAGE_INPUTS.items():
+            stage_function = getattr(pipeline, f"run_{stage}")
+            items = scale if input_path is None else len(load_dataset(prefix + input_path))
+            results.append(summarize_timings(stage, scale, items,
+                                             time_repeats(lambda: stage_function(prefix), repeats)))
+        n_train = len(load_dataset(f"{prefix}data/split_data/y_train", header=None))
+        model_names = list(dict.fromkeys([*models, SERVED_MODEL]))
+        for model_name in model_names:
+            results.append(summarize_timings(f"training.{model_name}", scale, n_train,
+                                             time_repeats(lambda: pipeline.run_training(prefix, model_name), repeats)))
+        results.append(summarize_timings("evaluation", scale, len(model_names), time_repeats(
+            lambda: pipeline.run_evaluation(prefix, model_names), repeats)))
+        n_analysed = len(load_dataset(prefix + STAGE_INPUTS["preprocessing"]))
+        results.append(summarize_timings("spatial_index", scale, n_analysed,
+                                         time_repeats(lambda: pipeline.run_spatial_index(prefix), repeats)))
+        mi.disable_prediction_cache()
+        mi.load_preprocessor_and_model(prefix)
+        results.append(summarize_timings("ui_metadata", scale, n_analysed,
+                                         time_repeats(lambda: pipeline.run_ui_metadata(prefix), repeats)))
+        results.append(summarize_timings("price_tiles", scale, PRICE_TILE_CELLS,
+                                         time_repeats(lambda: pipeline.run_price_tiles(prefix), repeats)))
+        mi.load_preprocessor_and_model(prefix)
+        batch = make_model_inputs(batch_size, seed)
+        user_input = batch.iloc[0]
+        mi.predict_from_input(user_input.copy())
+        results.append(summarize_timings("predict.single_row", scale, latency_calls, timeit.repeat(
+            lambda: mi.predict_from_input(user_input.copy()), number=latency_calls, repeat=repeats)))
+        results.append(summarize_timings("predict.batch", scale, batch_size,
+                                         time_repeats(lambda: mi.predict_batch(batch), repeats, warmup=1)))
+    return pd.DataFrame(results, columns=RESULT_COLUMNS)
+
+
+def run_suite(scales: list = DEFAULT_SCALES, repeats: int = 3, models: list = (), seed: int = 0,
+              latency_calls: int = 200, batch_size: int = 10_000, workdir: str = None) -> pd.DataFrame:
+    return pd.concat([benchmark_scale(scale, repeats, models, seed, latency_calls, batch_size, workdir)
+                      for scale in scales], ignore_index=True)
+
+
+def get_environment() -> dict:
+    return {"python": platform.python_version(), "platform": platform.platform(), "cpu_count": os.cpu_count(),
+            "numpy": np.__version__, "pandas": pd.__version__, "sklearn": sklearn.__version__}
+
+
+def save_results(results: pd.DataFrame, path: str, settings: dict) -> str:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as file:
+        json.dump({"created": dt.datetime.now().isoformat(timespec="seconds"), "environment": get_environment(),
+                   "settings": settings, "results": results.to_dict(orient="records")}, file, indent=4)
+    return path
+
+
+def load_results(path: str) -> pd.DataFrame:
+    with open(path) as file:
+        return pd.DataFrame(json.load(file)["results"], columns=RESULT_COLUMNS)
+
+
+def compare_results(results: pd.DataFrame, baseline: pd.DataFrame,
+                    threshold: float = REGRESSION_THRESHOLD) -> pd.DataFrame:
+    comparison = results[["benchmark", "scale", "seconds_min"]].merge(
+        baseline[["benchmark", "scale", "seconds_min"]].rename(columns={"seconds_min": "baseline_seconds_min"}),
+        on=["benchmark", "scale"], how="left")
+    comparison["change"] = comparison["seconds_min"] / comparison["baseline_seconds_min"] - 1
+    conditions = [comparison["baseline_seconds_min"].isna(), comparison["change"] > threshold,
+                  comparison["change"] < -threshold]
+    comparison["status"] = np.select(conditions, ["new", "regression", "improvement"], "ok")
+    return comparison.set_index(["benchmark", "scale"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark every pipeline stage and prediction on synthetic data.")
+    parser.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES, help="raw rows generated per run")
+    parser.add_argument("--repeats", type=int, default=3,
+                        help="minimum timed runs per benchmark, short ones repeat for at least a second")
+    parser.add_argument("--models", nargs="*", default=[], help=f"models trained besides {SERVED_MODEL}")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic data generator")
+    parser.add_argument("--latency-calls", type=int, default=200, help="single-row predictions per timed run")
+    parser.add_argument("--batch-size", type=int, default=10_000, help="rows per timed batch prediction")
+    parser.add_argument("--workdir", help="directory for the temporary data/ and raw/ artifacts")
+    parser.add_argument("--results", help="compare this saved results file instead of running the suite")
+    parser.add_argument("--save", metavar="PATH", help=f"write the results as a baseline, e.g. {BASELINE_PATH}")
+    parser.add_argument("--compare", metavar="BASELINE", help="flag benchmarks slower than this baseline")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="relative slowdown of the fastest repeat reported as a regression")
+    args = parser.parse_args()
+    if args.results:
+        suite = load_results(args.results)
+    else:
+        suite = run_suite(args.scales, args.repeats, args.models, args.seed, args.latency_calls, args.batch_size,
+                          args.workdir)
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print(suite.to_string(index=False))
+        if args.save:
+            settings = {"scales": args.scales, "repeats": args.repeats, "models": args.models, "seed": args.seed,
+                        "latency_calls": args.latency_calls, "batch_size": args.batch_size}
+            print(f"Results saved to {save_results(suite, args.save, settings)}")
+        if args.compare:
+            comparison = compare_results(suite, load_results(args.compare), args.threshold)
+            print(comparison.round(3))
+            regressions = comparison.index[comparison["status"] == "regression"]
+            if len(regressions):
+                print(f"{len(regressions)} regressions beyond {args.threshold:.0%}: "
+                      f"{', '.join(f'{benchmark}@{scale}' for benchmark, scale in regressions)}")
+                sys.exit(1)
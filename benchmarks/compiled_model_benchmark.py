@@ -0,0 +1,50 @@
+import argparse
+import timeit
+import numpy as np
+import pandas as pd
+import utils.model_interface as mi
+
+
+def make_model_inputs(n_rows: int, seed: int = 42) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    inputs = pd.DataFrame({
+        "SaleDate": pd.to_datetime("2016-01-01") + pd.to_timedelta(rng.integers(0, 1000, n_rows), unit="D"),
+        "YearBuilt": rng.integers(1850, 2018, n_rows),
+        "Latitude": rng.uniform(-38.2, -37.4, n_rows),
+        "Longitude": rng.uniform(144.4, 145.5, n_rows),
+        "DistanceToCBD": rng.uniform(0, 40, n_rows),
+        "Postcode": rng.integers(3000, 3980, n_rows),
+        "NeighbouringProperties": rng.integers(200, 20000, n_rows),
+        "LandSize": rng.choice([0, 150, 300, 600, 900], n_rows),
+        "BuildingArea": rng.uniform(50, 400, n_rows).round(),
+        "Rooms": rng.integers(1, 7, n_rows),
+        "Bedrooms": rng.integers(1, 6, n_rows),
+        "Bathrooms": rng.integers(1, 4, n_rows),
+        "CarSpots": rng.integers(0, 4, n_rows),
+    })
+    for _, transformer, columns in mi.get_column_transformer().transformers_:
+        for column, categories in zip(columns, getattr(transformer, "categories_", [])):
+            inputs[column] = rng.choice(categories, n_rows)
+    return inputs
+
+
+def run_benchmark(batch_size: int, repeats: int) -> pd.DataFrame:
+    results = pd.DataFrame(columns=["single_row_ms", "batch_rows_per_second"])
+    results.index.name = "Engine"
+    mi.load_preprocessor_and_model()
+    batch = make_model_inputs(batch_size)
+    user_input = batch.iloc[0]
+    for engine, compiled in [("sklearn", False), ("compiled", True)]:
+        mi.load_preprocessor_and_model(compiled=compiled)
+        single_row_seconds = timeit.timeit(lambda: mi.predict_from_input(user_input.copy()), number=repeats) / repeats
+        batch_seconds = min(timeit.repeat(lambda: mi.predict_batch(batch), number=1, repeat=3))
+        results.loc[engine] = [single_row_seconds * 1e3, batch_size / batch_seconds]
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare sklearn and compiled NumPy model inference.")
+    parser.add_argument("--batch-size", type=int, default=100_000)
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+    print(run_benchmark(args.batch_size, args.repeats))
@@ -0,0 +1,35 @@
+import argparse
+import time
+import pandas as pd
+import utils.data_cleaning as dc
+
+
+def replace_non_alpha_num_chars_per_char(df_input: pd.DataFrame) -> pd.DataFrame:
+    df = df_input.copy()
+    text_data = df.select_dtypes(include="object").astype(str).values.ravel()
+    non_alpha_num_chars = {char for cell in text_data for char in cell if not char.isalnum()}
+    for column in df.select_dtypes(include="object").columns:
+        df[column] = df[column].str.strip().str.title()
+        for non_alpha_num_char in non_alpha_num_chars:
+            df[column] = df[column].str.replace(non_alpha_num_char, "_")
+        df[column] = df[column].str.strip("_")
+    return df
+
+
+def time_call(func, *args) -> tuple:
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare per-character and single-pass text normalization.")
+    parser.add_argument("--path", default="data/Melbourne_Housing_Market.csv")
+    parser.add_argument("--scale", type=int, default=50, help="number of times the dataset is repeated")
+    args = parser.parse_args()
+    dataset = dc.correct_column_names(pd.read_csv(args.path))
+    dataset = pd.concat([dataset] * args.scale, ignore_index=True)
+    per_char, per_char_seconds = time_call(replace_non_alpha_num_chars_per_char, dataset)
+    single_pass, single_pass_seconds = time_call(dc.replace_non_alpha_num_chars, dataset)
+    print(f"{len(dataset)} rows: per-character {per_char_seconds:.2f}s, single pass {single_pass_seconds:.2f}s "
+          f"({per_char_seconds / single_pass_seconds:.1f}x), identical output: {per_char.equals(single_pass)}")
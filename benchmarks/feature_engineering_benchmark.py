@@ -0,0 +1,59 @@
+import argparse
+import time
+import numpy as np
+import pandas as pd
+import utils.feature_engineering as fe
+
+
+def make_cleaned_dataset(n_rows: int, seed: int = 42) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    street_types = np.array(list(fe.STREET_TYPE_ABBREVIATIONS) + ["Unknown"])
+    street_names = np.array(["Turner", "Bloomburg", "Charles", "Federation", "Park", "Victoria", "High", "Church"])
+    addresses = pd.Series(rng.integers(1, 200, n_rows).astype(str)) + "_" + rng.choice(street_names, n_rows) + "_" + \
+        rng.choice(street_types, n_rows)
+    return pd.DataFrame({
+        "SaleDate": pd.to_datetime("2016-01-01") + pd.to_timedelta(rng.integers(0, 1000, n_rows), unit="D"),
+        "Address": addresses,
+        "YearBuilt": rng.integers(1850, 2018, n_rows).astype("float64"),
+        "BuildingArea": rng.uniform(50, 400, n_rows).round(),
+        "LandSize": rng.choice([0.0, 150.0, 300.0, 600.0, 900.0], n_rows),
+        "Rooms": rng.integers(1, 7, n_rows).astype("float64"),
+    })
+
+
+def engineer_features_row_wise(df_input: pd.DataFrame) -> pd.DataFrame:
+    df = df_input.copy()
+    df[["SaleYear", "SaleMonth", "SaleDay", "SaleQuarter", "SaleDayOfWeek"]] = df.apply(fe.separate_date, axis=1)
+    df[["StreetName", "StreetType"]] = df.apply(fe.separate_address, axis=1)
+    df["StreetType"] = df.apply(fe.get_full_street_type, axis=1)
+    df = fe.remove_column(df, "Address")
+    df["PropertyAge"] = df.apply(fe.calc_property_age, axis=1)
+    df["AvgRoomSize"] = df.apply(fe.calc_avg_room_size, axis=1)
+    df["BuildingToLandRatio"] = df.apply(fe.calc_building_to_land_ratio, axis=1)
+    return df
+
+
+def time_call(func, *args) -> float:
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def run_benchmark(sizes: list, skip_row_wise_above: int) -> pd.DataFrame:
+    results = pd.DataFrame(columns=["row_wise_seconds", "vectorized_seconds", "speedup"])
+    results.index.name = "Rows"
+    for size in sizes:
+        dataset = make_cleaned_dataset(size)
+        vectorized_seconds = time_call(fe.engineer_features, dataset)
+        row_wise_seconds = time_call(engineer_features_row_wise, dataset) if size <= skip_row_wise_above else np.nan
+        results.loc[size] = [row_wise_seconds, vectorized_seconds, row_wise_seconds / vectorized_seconds]
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare row-wise and vectorized feature engineering.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--skip-row-wise-above", type=int, default=100_000,
+                        help="largest size that also times the row-wise baseline, which takes minutes at 1M rows")
+    args = parser.parse_args()
+    print(run_benchmark(args.sizes, args.skip_row_wise_above))
@@ -0,0 +1,63 @@
+import argparse
+import asyncio
+import json
+import time
+import utils.model_interface as mi
+import utils.prediction_service as ps
+from benchmarks.compiled_model_benchmark import make_model_inputs
+
+
+async def send_request(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, method: str, path: str,
+                       payload=None) -> dict:
+    body = json.dumps(payload).encode() if payload is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    headers = {}
+    await reader.readline()
+    while (line := await reader.readline()) != b"\r\n":
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return json.loads(await reader.readexactly(int(headers["content-length"])))
+
+
+async def run_client(port: int, records: list) -> None:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    for record in records:
+        await send_request(reader, writer, "POST", "/predict", record)
+    writer.close()
+    await writer.wait_closed()
+
+
+async def run_load_test(n_clients: int, requests_per_client: int, window_ms: float, max_batch_size: int) -> dict:
+    server, batcher = await ps.start_service("127.0.0.1", 0, window_ms, max_batch_size)
+    port = server.sockets[0].getsockname()[1]
+    inputs = make_model_inputs(n_clients * requests_per_client)
+    inputs["SaleDate"] = inputs["SaleDate"].dt.strftime("%Y-%m-%d")
+    records = inputs.to_dict(orient="records")
+    start = time.perf_counter()
+    await asyncio.gather(*[run_client(port, records[index::n_clients]) for index in range(n_clients)])
+    seconds = time.perf_counter() - start
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    metrics = await send_request(reader, writer, "GET", "/metrics")
+    writer.close()
+    await writer.wait_closed()
+    server.close()
+    await server.wait_closed()
+    await asyncio.sleep(0.1)
+    batcher.task.cancel()
+    metrics["requests_per_second"] = len(records) / seconds
+    return metrics
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the local prediction service.")
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--requests-per-client", type=int, default=50)
+    parser.add_argument("--window-ms", type=float, default=5.0)
+    parser.add_argument("--max-batch-size", type=int, default=256)
+    parser.add_argument("--compiled", action="store_true")
+    args = parser.parse_args()
+    mi.load_preprocessor_and_model(compiled=args.compiled)
+    print(json.dumps(asyncio.run(run_load_test(args.clients, args.requests_per_client, args.window_ms,
+                                               args.max_batch_size)), indent=2))
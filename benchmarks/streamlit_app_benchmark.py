@@ -0,0 +1,58 @@
+import argparse
+import statistics
+import time
+from streamlit.testing.v1 import AppTest
+
+
+def time_run(app: AppTest) -> float:
+    start = time.perf_counter()
+    app.run()
+    if app.exception:
+        raise RuntimeError(app.exception[0].message)
+    return (time.perf_counter() - start) * 1000
+
+
+def benchmark_application(n_reruns: int, timeout: float) -> dict:
+    app = AppTest.from_file("Application.py", default_timeout=timeout)
+    first_paint_ms = time_run(app)
+    options = app.radio[0].options
+    rerun_ms = []
+    for index in range(n_reruns):
+        app.radio[0].set_value(options[index % len(options)])
+        rerun_ms.append(time_run(app))
+    app.button[0].click()
+    first_prediction_ms = time_run(app)
+    app.button[0].click()
+    prediction_ms = time_run(app)
+    return {"first_paint_ms": first_paint_ms, "median_rerun_ms": statistics.median(rerun_ms),
+            "first_prediction_ms": first_prediction_ms, "prediction_ms": prediction_ms}
+
+
+def benchmark_plot_generator(n_reruns: int, timeout: float) -> dict:
+    app = AppTest.from_file("pages/Plot_Generator.py", default_timeout=timeout)
+    first_paint_ms = time_run(app)
+    options = app.selectbox[0].options
+    rerun_ms = []
+    for index in range(n_reruns):
+        app.selectbox[0].set_value(options[index % len(options)])
+        rerun_ms.append(time_run(app))
+    app.selectbox[0].set_value("Price")
+    app.selectbox[3].set_value("histplot")
+    app.button[0].click()
+    first_plot_ms = time_run(app)
+    app.button[0].click()
+    plot_ms = time_run(app)
+    return {"first_paint_ms": first_paint_ms, "median_rerun_ms": statistics.median(rerun_ms),
+            "first_plot_ms": first_plot_ms, "plot_ms": plot_ms}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time first paint and widget reruns of the Streamlit pages. "
+                                                 "Run from the repository root in a fresh process.")
+    parser.add_argument("--page", choices=["application", "plot_generator"], default="application")
+    parser.add_argument("--reruns", type=int, default=20, help="widget interactions timed after first paint")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+    benchmark = benchmark_application if args.page == "application" else benchmark_plot_generator
+    for name, milliseconds in benchmark(args.reruns, args.timeout).items():
+        print(f"{name:20s} {milliseconds:9.1f} ms")
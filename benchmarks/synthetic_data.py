@@ -0,0 +1,209 @@
+import argparse
+import itertools
+import time
+import numpy as np
+import pandas as pd
+
+RAW_COLUMNS = ["Suburb", "Address", "Rooms", "Type", "Price", "Method", "SellerG", "Date", "Distance", "Postcode",
+               "Bedroom2", "Bathroom", "Car", "Landsize", "BuildingArea", "YearBuilt", "CouncilArea", "Lattitude",
+               "Longtitude", "Regionname", "Propertycount"]
+N_SUBURBS = 351
+N_COUNCILS = 33
+N_AGENTS = 388
+N_SALE_DATES = 78
+CBD = (-37.8136, 144.9631)
+KM_PER_DEGREE = (111.0, 88.0)
+NULL_RATES = {"Price": 0.218, "Details": 0.236, "Car": 0.018, "Landsize": 0.135, "BuildingArea": 0.484,
+              "YearBuilt": 0.416, "Coordinates": 0.229, "Council": 0.0001}
+DUPLICATE_RATE = 0.0005
+UNIT_TYPES = {"h": 0.68, "u": 0.21, "t": 0.11}
+SALE_METHODS = {"S": 0.57, "SP": 0.146, "PI": 0.14, "VB": 0.088, "SN": 0.03, "PN": 0.01, "SA": 0.006, "W": 0.005,
+                "SS": 0.001}
+ROOM_PROBABILITIES = {"h": [0.01, 0.12, 0.45, 0.30, 0.09, 0.02, 0.01], "u": [0.22, 0.62, 0.14, 0.02, 0, 0, 0],
+                      "t": [0.02, 0.35, 0.50, 0.12, 0.01, 0, 0]}
+TYPE_PRICE_FACTORS = {"h": 1.0, "u": 0.55, "t": 0.8}
+STREET_TYPE_WEIGHTS = {"St": 40, "Rd": 14, "Av": 10, "Ct": 8, "Dr": 6, "Cr": 5, "Gr": 5, "Pl": 3, "Pde": 2, "Cl": 2,
+                       "Wy": 1, "La": 1, "Bvd": 1, "Tce": 1, "Cct": 1}
+NAME_STARTS = ["Ash", "Bal", "Bay", "Box", "Bright", "Brun", "Cam", "Carl", "Clay", "Col", "Craig", "Dand", "Don",
+               "Els", "Elt", "Fitz", "Flem", "Glen", "Haw", "Heath", "Ivan", "Kew", "Kings", "Law", "Mal", "Mel",
+               "Mill", "Mont", "Moor", "Mor", "New", "Nor", "Oak", "Park", "Pres", "Rich", "Ros", "Sand", "Spring",
+               "Sun", "Tem", "Thorn", "Wat", "Wil", "Wood", "Yar"]
+NAME_ENDS = ["wood", "ton", "vale", "hill", "field", "bury", "mont", "dale", "brook", "side", "park", "leigh", "ford",
+             "worth", "ville", "haven", "stone", "shaw"]
+STREET_NAMES = ["Turner", "Bloomburg", "Charles", "Federation", "Park", "Victoria", "High", "Church", "Station",
+                "Albert", "King", "Queen", "George", "William", "Elizabeth", "Railway", "Union", "Hope", "Grange",
+                "Mitchell", "O'Brien", "O'Connor", "McKean", "St Georges", "Lake-View", "Bell", "Hill", "Murray",
+                "Gordon", "Princes", "Wattle", "Bridge", "Chapel", "Glenferrie", "Johnston", "Nicholson", "Lygon",
+                "Rathdowne", "Sydney", "Barkers", "Burke", "Warrigal", "Cotham", "Canterbury", "Riversdale"]
+METROPOLITAN_REGIONS = ["Northern Metropolitan", "Eastern Metropolitan", "South-Eastern Metropolitan",
+                        "Southern Metropolitan", "Western Metropolitan"]
+VICTORIA_REGIONS = ["Northern Victoria", "Eastern Victoria", "Western Victoria"]
+
+
+def zipf_weights(n: int, exponent: float = 1.1) -> np.ndarray:
+    weights = 1 / np.arange(1, n + 1) ** exponent
+    return weights / weights.sum()
+
+
+def make_names(rng: np.random.Generator, n: int) -> np.ndarray:
+    names = np.array([start + end for start, end in itertools.product(NAME_STARTS, NAME_ENDS)])
+    names = rng.choice(names, n, replace=False)
+    suffixes = rng.choice(["", " North", " East", " South", " West"], n, p=[0.85, 0.04, 0.04, 0.04, 0.03])
+    return np.char.add(names.astype(str), suffixes)
+
+
+def get_region(angle: np.ndarray, distance: np.ndarray) -> np.ndarray:
+    metropolitan = np.array(METROPOLITAN_REGIONS)[((angle + np.pi) / (2 * np.pi) * 5).astype(int) % 5]
+    victoria = np.array(VICTORIA_REGIONS)[((angle + np.pi) / (2 * np.pi) * 3).astype(int) % 3]
+    return np.where(distance > 25, victoria, metropolitan)
+
+
+def make_suburbs(rng: np.random.Generator, n_suburbs: int = N_SUBURBS, n_councils: int = N_COUNCILS) -> pd.DataFrame:
+    distance = np.minimum(rng.gamma(2.5, 4.5, n_suburbs), 48.1).round(1)
+    angle = rng.uniform(-np.pi, np.pi, n_suburbs)
+    council_names = np.char.add(rng.choice(NAME_STARTS, n_councils, replace=False).astype(str),
+                                rng.choice([" City Council", " Shire Council"], n_councils, p=[0.75, 0.25]))
+    council_angles = np.linspace(-np.pi, np.pi, n_councils, endpoint=False)
+    council_distances = np.tile([5.0, 15.0, 30.0], n_councils // 3 + 1)[:n_councils]
+    council_points = np.column_stack([council_distances * np.cos(council_angles),
+                                      council_distances * np.sin(council_angles)])
+    points = np.column_stack([distance * np.cos(angle), distance * np.sin(angle)])
+    council = np.argmin(((points[:, None, :] - council_points[None, :, :]) ** 2).sum(axis=2), axis=1)
+    postcodes = 3000 + np.sort(rng.choice(980, n_suburbs // 5 * 3, replace=False))
+    return pd.DataFrame({
+        "Suburb": make_names(rng, n_suburbs),
+        "Distance": distance,
+        "Postcode": postcodes[np.minimum((distance / 48.2 * len(postcodes)).astype(int), len(postcodes) - 1)],
+        "CouncilArea": council_names[council],
+        "Regionname": get_region(angle, distance),
+        "Lattitude": CBD[0] + points[:, 1] / KM_PER_DEGREE[0],
+        "Longtitude": CBD[1] + points[:, 0] / KM_PER_DEGREE[1],
+        "Propertycount": np.clip(rng.lognormal(8.7, 0.6, n_suburbs), 83, 21650).round(),
+        "Weight": zipf_weights(n_suburbs, 0.8)[rng.permutation(n_suburbs)],
+    })
+
+
+def make_agents(rng: np.random.Generator, n_agents: int = N_AGENTS) -> np.ndarray:
+    agents = make_names(rng, n_agents).astype(object)
+    lowercase = rng.random(n_agents) < 0.05
+    agents[lowercase] = [agent.lower().replace(" ", "") for agent in agents[lowercase]]
+    joint = rng.random(n_agents) < 0.05
+    agents[joint] = [f"{agent} & {partner}" for agent, partner in zip(agents[joint], rng.choice(NAME_STARTS,
+                                                                                              joint.sum()))]
+    return agents
+
+
+def make_sale_dates(rng: np.random.Generator, n_dates: int = N_SALE_DATES) -> tuple:
+    saturdays = pd.date_range("2016-01-30", "2018-03-17", freq="W-SAT")
+    dates = saturdays[np.sort(rng.choice(len(saturdays), n_dates, replace=False))]
+    weights = np.linspace(1.0, 2.0, n_dates)
+    return np.array([f"{date.day}/{date.month:02d}/{date.year}" for date in dates]), weights / weights.sum()
+
+
+def make_reference_tables(seed: int = 0) -> dict:
+    rng = np.random.default_rng(seed)
+    sale_dates, date_weights = make_sale_dates(rng)
+    return {"suburbs": make_suburbs(rng), "agents": make_agents(rng), "sale_dates": sale_dates,
+            "date_weights": date_weights}
+
+
+def with_nulls(rng: np.random.Generator, values: np.ndarray, rate: float, mask: np.ndarray = None) -> np.ndarray:
+    missing = rng.random(len(values)) < rate if mask is None else mask
+    return np.where(missing, np.nan, values.astype("float64"))
+
+
+def make_addresses(rng: np.random.Generator, n_rows: int) -> pd.Series:
+    numbers = pd.Series(rng.integers(1, 250, n_rows).astype(str))
+    units = rng.random(n_rows) < 0.15
+    numbers[units] = pd.Series(rng.integers(1, 30, units.sum()).astype(str)).to_numpy() + "/" + numbers[units]
+    street_types = np.array(list(STREET_TYPE_WEIGHTS))
+    street_type_weights = np.array(list(STREET_TYPE_WEIGHTS.values()), dtype="float64")
+    return numbers + " " + rng.choice(STREET_NAMES, n_rows) + " " + rng.choice(
+        street_types, n_rows, p=street_type_weights / street_type_weights.sum())
+
+
+def generate_raw_sales(n_rows: int, rng: np.random.Generator, tables: dict) -> pd.DataFrame:
+    suburbs = tables["suburbs"]
+    suburb = suburbs.iloc[rng.choice(len(suburbs), n_rows, p=suburbs["Weight"].to_numpy())].reset_index(drop=True)
+    unit_type = rng.choice(list(UNIT_TYPES), n_rows, p=list(UNIT_TYPES.values()))
+    rooms = np.empty(n_rows, dtype="int64")
+    for code, probabilities in ROOM_PROBABILITIES.items():
+        mask = unit_type == code
+        rooms[mask] = rng.choice(np.arange(1, 8), mask.sum(), p=np.array(probabilities) / sum(probabilities))
+    bedrooms = np.maximum(rooms + rng.choice([-1, 0, 0, 0, 0, 0, 0, 0, 1], n_rows), 0)
+    bathrooms = np.clip(1 + rng.binomial(np.maximum(rooms - 2, 0), 0.4), 1, 8)
+    car_spots = np.clip(rng.poisson(np.where(unit_type == "u", 1.0, 1.7)), 0, 10)
+    land_size = np.where((unit_type != "h") & (rng.random(n_rows) < 0.45), 0.0,
+                         rng.lognormal(np.where(unit_type == "h", 6.3, 5.3), 0.6)).round()
+    outliers = rng.random(n_rows) < 0.001
+    land_size[outliers] = rng.uniform(20_000, 430_000, outliers.sum()).round()
+    building_area = (rooms * rng.lognormal(3.7, 0.25, n_rows)).round()
+    year_built = np.clip(rng.normal(np.where(unit_type == "h", 1955, 1985), 30), 1830, 2018).round()
+    distance = suburb["Distance"].to_numpy()
+    type_factor = pd.Series(unit_type).map(TYPE_PRICE_FACTORS).to_numpy()
+    price = type_factor * 1_450_000 * np.exp(-distance / 28) * (rooms / 3) ** 0.45 * rng.lognormal(0, 0.3, n_rows)
+    details_missing = rng.random(n_rows) < NULL_RATES["Details"]
+    coordinates_missing = rng.random(n_rows) < NULL_RATES["Coordinates"]
+    df = pd.DataFrame({
+        "Suburb": suburb["Suburb"],
+        "Address": make_addresses(rng, n_rows),
+        "Rooms": rooms,
+        "Type": unit_type,
+        "Price": with_nulls(rng, (price / 1_000).round() * 1_000, NULL_RATES["Price"]),
+        "Method": rng.choice(list(SALE_METHODS), n_rows, p=np.array(list(SALE_METHODS.values())) / sum(
+            SALE_METHODS.values())),
+        "SellerG": rng.choice(tables["agents"], n_rows, p=zipf_weights(len(tables["agents"]))),
+        "Date": rng.choice(tables["sale_dates"], n_rows, p=tables["date_weights"]),
+        "Distance": distance,
+        "Postcode": suburb["Postcode"].astype("float64"),
+        "Bedroom2": with_nulls(rng, bedrooms, 0, details_missing),
+        "Bathroom": with_nulls(rng, bathrooms, 0, details_missing),
+        "Car": with_nulls(rng, car_spots, 0, details_missing | (rng.random(n_rows) < NULL_RATES["Car"])),
+        "Landsize": with_nulls(rng, land_size, 0, details_missing | (rng.random(n_rows) < NULL_RATES["Landsize"])),
+        "BuildingArea": with_nulls(rng, building_area, 0,
+                                   details_missing | (rng.random(n_rows) < NULL_RATES["BuildingArea"])),
+        "YearBuilt": with_nulls(rng, year_built, 0, details_missing | (rng.random(n_rows) < NULL_RATES["YearBuilt"])),
+        "CouncilArea": suburb["CouncilArea"],
+        "Lattitude": with_nulls(rng, suburb["Lattitude"].to_numpy() + rng.normal(0, 0.012, n_rows), 0,
+                                coordinates_missing),
+        "Longtitude": with_nulls(rng, suburb["Longtitude"].to_numpy() + rng.normal(0, 0.015, n_rows), 0,
+                                 coordinates_missing),
+        "Regionname": suburb["Regionname"],
+        "Propertycount": suburb["Propertycount"],
+    })
+    council_missing = rng.random(n_rows) < NULL_RATES["Council"]
+    df.loc[council_missing, ["CouncilArea", "Regionname", "Propertycount"]] = np.nan
+    duplicates = np.flatnonzero(rng.random(n_rows) < DUPLICATE_RATE)
+    if len(duplicates) and n_rows > 1:
+        df.iloc[duplicates] = df.iloc[rng.integers(0, n_rows, len(duplicates))].to_numpy()
+    return df[RAW_COLUMNS]
+
+
+def iter_raw_sales(n_rows: int, seed: int = 0, chunk_size: int = 1_000_000):
+    tables = make_reference_tables(seed)
+    n_chunks = -(-n_rows // chunk_size)
+    for index, chunk_seed in enumerate(np.random.SeedSequence(seed).spawn(n_chunks)):
+        yield generate_raw_sales(min(chunk_size, n_rows - index * chunk_size), np.random.default_rng(chunk_seed),
+                                 tables)
+
+
+def make_raw_sales(n_rows: int, seed: int = 0, chunk_size: int = 1_000_000) -> pd.DataFrame:
+    return pd.concat(iter_raw_sales(n_rows, seed, chunk_size), ignore_index=True)
+
+
+def write_raw_sales(path: str, n_rows: int, seed: int = 0, chunk_size: int = 1_000_000) -> str:
+    for index, chunk in enumerate(iter_raw_sales(n_rows, seed, chunk_size)):
+        chunk.to_csv(path, mode="w" if index == 0 else "a", header=index == 0, index=False)
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write synthetic raw sales in the Kaggle Melbourne housing schema.")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--output", default="../data/SYNTHETIC_Melbourne_Housing_Market.csv")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-size", type=int, default=1_000_000, help="rows generated and written at a time")
+    args = parser.parse_args()
+    start = time.perf_counter()
+    write_raw_sales(args.output, args.rows, args.seed, args.chunk_size)
+    print(f"Wrote {args.rows} rows to {args.output} in {time.perf_counter() - start:.2f}s")
@@ -1,31 +1,36 @@
 import streamlit as st
-import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
+from utils.ui_metadata import get_ui_metadata_version, load_ui_metadata
 
-df = pd.read_csv("data/ANALYSED_Melbourne_Housing_Market.csv")
+
+@st.cache_data
+def get_ui_metadata(version: float) -> dict:
+    return load_ui_metadata()
+
+
+@st.cache_resource
+def get_dataset(version: float):
+    from utils.storage import load_dataset
+    return load_dataset("data/ANALYSED_Melbourne_Housing_Market")
+
+
+version = get_ui_metadata_version()
+metadata = get_ui_metadata(version)
+columns = metadata["columns"]
 
 st.subheader("Data Preview")
-st.dataframe(df.head())
+st.dataframe(metadata["preview"])
 
 st.subheader("Plot Settings")
-x_col = st.selectbox("X-axis column", df.columns)
-y_col = st.selectbox("Y-axis column (optional)", [None] + list(df.columns))
-hue_col = st.selectbox("Hue column (optional)", [None] + list(df.columns))
+x_col = st.selectbox("X-axis column", columns)
+y_col = st.selectbox("Y-axis column (optional)", [None] + columns)
+hue_col = st.selectbox("Hue column (optional)", [None] + columns)
 plot_type = st.selectbox("Plot type", [
     "scatterplot", "lineplot", "boxplot", "barplot", "histplot", "violinplot"
 ])
 
 if st.button("Generate Plot"):
     try:
-        fig = plt.figure()
-        plot_func = getattr(sns, plot_type)
-        plot_func(
-            data=df,
-            x=x_col,
-            y=y_col if y_col else None,
-            hue=hue_col if hue_col else None
-        )
-        st.pyplot(fig)
+        from utils.plot_aggregation import get_figure
+        st.image(get_figure(get_dataset(version), version, x_col, y_col, hue_col, plot_type))
     except Exception as e:
         st.error(f"❌ Plot Error: {e}")
@@ -0,0 +1,41 @@
+import shutil
+import pytest
+import utils.model_interface as mi
+import utils.pipeline as pipeline
+from benchmarks.synthetic_data import make_raw_sales, write_raw_sales
+
+N_RAW_ROWS = 3_000
+
+
+@pytest.fixture(scope="session")
+def raw_sales():
+    return make_raw_sales(N_RAW_ROWS, seed=0)
+
+
+@pytest.fixture(scope="session")
+def built_workspace(tmp_path_factory) -> str:
+    directory = tmp_path_factory.mktemp("workspace")
+    (directory / "data").mkdir()
+    (directory / "raw").mkdir()
+    prefix = f"{directory}/"
+    write_raw_sales(f"{prefix}data/Melbourne_Housing_Market.csv", N_RAW_ROWS, seed=0)
+    for stage in pipeline.DATA_STAGES:
+        getattr(pipeline, f"run_{stage}")(prefix)
+    pipeline.run_training(prefix, "GradientBoostingRegressor", n_estimators=40)
+    return prefix
+
+
+@pytest.fixture
+def workspace(built_workspace, tmp_path) -> str:
+    prefix = f"{tmp_path}/workspace/"
+    shutil.copytree(built_workspace, prefix)
+    return prefix
+
+
+@pytest.fixture
+def served_model(built_workspace):
+    mi.disable_prediction_cache()
+    mi.load_preprocessor_and_model(built_workspace)
+    yield built_workspace
+    mi.disable_prediction_cache()
+    mi.load_preprocessor_and_model(built_workspace)
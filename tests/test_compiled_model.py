@@ -0,0 +1,59 @@
+import os
+import joblib
+import numpy as np
+import pytest
+import utils.compiled_model as cm
+import utils.model_development as md
+import utils.model_interface as mi
+from benchmarks.compiled_model_benchmark import make_model_inputs
+from utils.storage import load_dataset
+
+
+def load_raw_inputs(prefix: str):
+    user_inputs = load_dataset(f"{prefix}data/CLEANED_Melbourne_Housing_Market")
+    return user_inputs[mi.INPUT_COLUMNS]
+
+
+def score_with(prefix: str, compiled: bool, user_inputs):
+    mi.load_preprocessor_and_model(prefix, compiled)
+    return mi.predict_batch(user_inputs), [mi.predict_from_input(row) for _, row in user_inputs.head(20).iterrows()]
+
+
+@pytest.mark.parametrize("source", ["cleaned", "generated"])
+def test_compiled_engine_matches_sklearn_on_raw_inputs(workspace, source):
+    mi.disable_prediction_cache()
+    mi.load_preprocessor_and_model(workspace)
+    user_inputs = load_raw_inputs(workspace) if source == "cleaned" else make_model_inputs(2_000, seed=1)
+    expected_batch, expected_rows = score_with(workspace, False, user_inputs)
+    actual_batch, actual_rows = score_with(workspace, True, user_inputs)
+    np.testing.assert_allclose(actual_batch, expected_batch, rtol=1e-9)
+    np.testing.assert_allclose(actual_rows, expected_rows, rtol=1e-9)
+
+
+def test_compiled_model_is_loaded_from_disk(workspace, monkeypatch):
+    mi.load_preprocessor_and_model(workspace, compiled=True)
+    assert os.path.exists(workspace + cm.COMPILED_MODEL_PATH)
+    exported = mi.compiled_model
+
+    def fail_export(preprocessor, model):
+        raise AssertionError("the saved compiled model should have been reused")
+
+    monkeypatch.setattr(cm, "export_compiled_model", fail_export)
+    mi.load_preprocessor_and_model(workspace, compiled=True)
+    assert mi.compiled_model.keys() == exported.keys()
+    np.testing.assert_array_equal(mi.compiled_model["tree_threshold"], exported["tree_threshold"])
+
+
+def test_stale_compiled_model_is_exported_again(workspace):
+    mi.load_preprocessor_and_model(workspace, compiled=True)
+    model = mi.model
+    X_train, _, y_train, _ = md.load_split_datasets(workspace)
+    model.set_params(n_estimators=model.n_estimators_ // 2).fit(X_train, y_train)
+    joblib.dump(model, f"{workspace}raw/GradientBoostingRegressor.pkl")
+    mi.load_preprocessor_and_model(workspace, compiled=True)
+    assert str(mi.compiled_model["artifact_hash"]) == mi.artifact_hash
+    assert len(mi.compiled_model["tree_feature"]) == model.n_estimators_
+    user_inputs = load_raw_inputs(workspace)
+    np.testing.assert_allclose(mi.predict_batch(user_inputs), score_with(workspace, False, user_inputs)[0],
+                               rtol=1e-9)
+
@@ -0,0 +1,18 @@
+import warnings
+import pandas as pd
+import utils.data_cleaning as dc
+
+
+def test_compact_cleaning_emits_no_chained_assignment_warnings(raw_sales):
+    with pd.option_context("mode.copy_on_write", False), warnings.catch_warnings():
+        warnings.simplefilter("error", pd.errors.SettingWithCopyWarning)
+        cleaned = dc.clean_dataset(raw_sales.copy(), compact=True)
+    assert not cleaned.isna().drop(columns=["SaleDate"], errors="ignore").any().any()
+    assert len(cleaned) <= raw_sales["Price"].notna().sum()
+
+
+def test_fill_nulls_leaves_its_input_untouched(raw_sales):
+    df = dc.correct_column_names(raw_sales.head(500))
+    before = df.copy()
+    dc.fill_nulls(df, remove_price=True)
+    pd.testing.assert_frame_equal(df, before)
@@ -0,0 +1,87 @@
+import os
+import time
+import joblib
+import numpy as np
+import utils.hyperparameter_search as hs
+import utils.model_development as md
+
+
+def record_pid_and_sleep(path: str, seconds: float) -> int:
+    with open(path, "w") as file:
+        file.write(str(os.getpid()))
+    time.sleep(seconds)
+    return os.getpid()
+
+
+def is_running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+
+def test_workers_past_the_deadline_are_terminated(tmp_path):
+    path = str(tmp_path / "pid")
+    start = time.perf_counter()
+    results = hs.map_with_deadline(record_pid_and_sleep, [(path, 60)], time.perf_counter() + 1.0, workers=1)
+    assert results == {}
+    assert time.perf_counter() - start < 10
+    assert not is_running(int(open(path).read()))
+
+
+def test_finished_work_is_returned_in_order(tmp_path):
+    results = hs.map_with_deadline(pow, [(2, 3), (3, 2)], time.perf_counter() + 30)
+    assert results == {0: 8, 1: 9}
+
+
+def test_search_and_refit_stay_within_the_budget(workspace):
+    X_train, X_test, y_train, y_test = md.load_split_datasets(workspace)
+    budget_seconds = 3.0
+    start = time.perf_counter()
+    try:
+        best_params, scores, history, published = hs.search_model(
+            "GradientBoostingRegressor", X_train, X_test, y_train, y_test, workspace, budget_seconds,
+            n_candidates=27, workers=1)
+    except TimeoutError:
+        history = None
+    assert time.perf_counter() - start < budget_seconds + 2.0
+    if history is not None:
+        assert set(best_params) >= {"learning_rate", "n_estimators"}
+        assert os.path.exists(f"{workspace}{hs.SEARCH_DIRECTORY}/GradientBoostingRegressor.pkl")
+
+
+def test_search_result_is_published_only_when_better(workspace):
+    X_train, X_test, y_train, y_test = md.load_split_datasets(workspace)
+    production_path = f"{workspace}raw/GradientBoostingRegressor.pkl"
+    worse = md.build_model("GradientBoostingRegressor", n_estimators=1).fit(X_train, y_train)
+    before = os.path.getmtime(production_path), joblib.load(production_path).n_estimators_
+    scores, published = hs.publish_model(worse, "GradientBoostingRegressor", X_test, y_test, prefix=workspace)
+    assert not published
+    assert scores.at["rmse", "search"] > scores.at["rmse", "current"]
+    assert (os.path.getmtime(production_path), joblib.load(production_path).n_estimators_) == before
+    assert joblib.load(f"{workspace}{hs.SEARCH_DIRECTORY}/GradientBoostingRegressor.pkl").n_estimators_ == 1
+
+    joblib.dump(worse, production_path)
+    better = md.build_model("GradientBoostingRegressor", n_estimators=50).fit(X_train, y_train)
+    scores, published = hs.publish_model(better, "GradientBoostingRegressor", X_test, y_test, prefix=workspace)
+    assert published
+    assert joblib.load(production_path).n_estimators_ == 50
+
+
+def test_ridge_search_reports_history(workspace):
+    X_train, X_test, y_train, y_test = md.load_split_datasets(workspace)
+    best_params, scores, history, published = hs.search_model("Ridge", X_train, X_test, y_train, y_test, workspace,
+                                                              budget_seconds=60, n_candidates=5, workers=1)
+    assert published
+    assert best_params["alpha"] in hs.SEARCH_SPACES["Ridge"]["alpha"]
+    assert history["rung"].max() >= 0
+    assert np.isfinite(scores.at["rmse", "search"])
+
+
+def test_halving_schedule_counts_exact_powers():
+    assert hs.halving_schedule(243, 243, 1) == [1, 3, 9, 27, 81, 243]
+    assert hs.halving_schedule(1000, 1000, 1, eta=10) == [1, 10, 100, 1000]
+    assert hs.halving_schedule(242, 243, 1) == [3, 9, 27, 81, 243]
+    assert hs.halving_schedule(243, 200, 10) == [22, 66, 200]
+    assert hs.halving_schedule(1, 200, 10) == [200]
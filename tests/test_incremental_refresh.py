@@ -0,0 +1,85 @@
+import json
+import os
+import joblib
+import numpy as np
+import pytest
+from sklearn.model_selection import train_test_split
+import utils.incremental_refresh as ir
+import utils.model_development as md
+import utils.model_interface as mi
+from utils.prediction_cache import hash_artifacts
+from benchmarks.synthetic_data import make_raw_sales
+
+
+def read_artifacts(prefix: str) -> tuple:
+    with open(prefix + ir.MODEL_PATH, "rb") as model_file, open(prefix + ir.PREPROCESSOR_PATH, "rb") as file:
+        return model_file.read(), file.read()
+
+
+@pytest.mark.parametrize("mode", ir.REFRESH_MODES)
+def test_published_refresh_appends_the_new_rows_to_the_stored_split(workspace, mode):
+    X_train, X_test, y_train, y_test = md.load_split_datasets(workspace)
+    new_sales = make_raw_sales(1_500, seed=1)
+    report = ir.refresh_model(new_sales, workspace, mode, extra_stages=10, tolerance=10.0)
+    assert report["published"] is True
+    with open(f"{workspace}{ir.VERSIONS_DIRECTORY}/{report['version']}/report.json") as file:
+        assert json.load(file)["published"] is True
+    increment = ir.prepare_increment(new_sales)
+    X_new_train, X_new_test, y_new_train, y_new_test = train_test_split(
+        increment.drop(columns=["Price"]), increment["Price"].to_numpy(), test_size=0.2, random_state=42)
+    preprocessor = joblib.load(workspace + ir.PREPROCESSOR_PATH)
+    refreshed = md.load_split_datasets(workspace)
+    for old, new, stored in [(X_train, X_new_train, refreshed[0]), (X_test, X_new_test, refreshed[1])]:
+        assert len(stored) == len(old) + len(new)
+        np.testing.assert_allclose(stored.tail(len(new)).to_numpy(),
+                                   ir.transform_features(preprocessor, new).to_numpy())
+    np.testing.assert_array_equal(refreshed[2], np.concatenate([y_train, y_new_train]))
+    np.testing.assert_array_equal(refreshed[3], np.concatenate([y_test, y_new_test]))
+    assert report["holdout_rows"] == min(len(y_test), ir.HOLDOUT_ROWS) + len(y_new_test)
+
+
+def test_stored_rows_follow_the_refreshed_preprocessor(workspace):
+    X_train = md.load_split_datasets(workspace)[0]
+    before = joblib.load(workspace + ir.PREPROCESSOR_PATH)
+    ir.refresh_model(make_raw_sales(1_500, seed=1), workspace, extra_stages=10, tolerance=10.0)
+    after = joblib.load(workspace + ir.PREPROCESSOR_PATH)
+    refreshed = md.load_split_datasets(workspace)[0].head(len(X_train))
+    scaler_before = mi.get_column_transformer(before).named_transformers_["scaler"]
+    scaler_after = mi.get_column_transformer(after).named_transformers_["scaler"]
+    columns = [f"scaler__{column}" for column in scaler_before.feature_names_in_]
+    unscaled = X_train[columns] * scaler_before.scale_ + scaler_before.mean_
+    np.testing.assert_allclose(refreshed[columns], (unscaled - scaler_after.mean_) / scaler_after.scale_)
+    others = refreshed.columns.difference(columns)
+    np.testing.assert_array_equal(refreshed[others], X_train[others])
+
+
+def test_refresh_switches_the_served_pair_through_one_pointer(workspace):
+    assert mi.get_artifact_paths(workspace) == (workspace + ir.PREPROCESSOR_PATH, workspace + ir.MODEL_PATH)
+    report = ir.refresh_model(make_raw_sales(1_500, seed=1), workspace, extra_stages=10, tolerance=10.0)
+    version_paths = mi.get_artifact_paths(workspace)
+    assert version_paths == tuple(f"{workspace}{ir.VERSIONS_DIRECTORY}/{report['version']}/{os.path.basename(path)}"
+                                  for path in [ir.PREPROCESSOR_PATH, ir.MODEL_PATH])
+    assert hash_artifacts(*version_paths) == hash_artifacts(workspace + ir.PREPROCESSOR_PATH, workspace + ir.MODEL_PATH)
+    joblib.dump(joblib.load(workspace + ir.MODEL_PATH), workspace + ir.MODEL_PATH)
+    assert mi.get_artifact_paths(workspace) == (workspace + ir.PREPROCESSOR_PATH, workspace + ir.MODEL_PATH)
+
+
+def test_worse_candidate_is_not_published(workspace):
+    before = read_artifacts(workspace)
+    split_before = md.load_split_datasets(workspace)
+    report = ir.refresh_model(make_raw_sales(1_500, seed=1), workspace, tolerance=-1.0)
+    assert report["published"] is False
+    assert "version" not in report and "increment" not in report
+    assert read_artifacts(workspace) == before
+    assert not os.path.exists(workspace + ir.VERSIONS_DIRECTORY)
+    assert not os.path.exists(workspace + ir.INCREMENTS_DIRECTORY)
+    assert not os.path.exists(workspace + ir.CURRENT_VERSION_PATH)
+    np.testing.assert_array_equal(md.load_split_datasets(workspace)[1], split_before[1])
+
+
+def test_window_mode_skips_rejected_increments(workspace):
+    ir.refresh_model(make_raw_sales(1_500, seed=1), workspace, tolerance=-1.0)
+    history = ir.load_history(workspace)
+    ir.refresh_model(make_raw_sales(1_500, seed=2), workspace, "window", tolerance=10.0)
+    assert len(ir.load_history(workspace)) > len(history)
+    assert len(os.listdir(workspace + ir.INCREMENTS_DIRECTORY)) == 1
@@ -0,0 +1,54 @@
+import shutil
+import numpy as np
+import utils.data_preprocessing as dp
+import utils.encoders as encoders
+import utils.model_development as md
+
+
+def get_fingerprint(prefix: str, **options) -> str:
+    return md.get_folds_fingerprint(f"{prefix}data/ANALYSED_Melbourne_Housing_Market", **{
+        "n_splits": 3, "random_state": 42, **options})
+
+
+def test_cached_folds_are_reused(workspace, monkeypatch):
+    folds, columns = md.prepare_cv_folds(3, prefix=workspace)
+    assert len(folds) == 3
+
+    def fail_build_preprocessor(X, top_n=None):
+        raise AssertionError("cached folds should have been reused")
+
+    monkeypatch.setattr(dp, "build_preprocessor", fail_build_preprocessor)
+    assert md.prepare_cv_folds(3, prefix=workspace) == (folds, columns)
+
+
+def test_fold_fingerprint_follows_the_preprocessing_code(workspace, tmp_path, monkeypatch):
+    fingerprint = get_fingerprint(workspace)
+    assert get_fingerprint(workspace) == fingerprint
+    assert get_fingerprint(workspace, n_splits=4) != fingerprint
+    assert get_fingerprint(workspace, top_n={"Suburb": 8}) != fingerprint
+    edited_module = tmp_path / "encoders.py"
+    shutil.copyfile(encoders.__file__, edited_module)
+    with open(edited_module, "a") as file:
+        file.write("\n# edited\n")
+    monkeypatch.setattr(encoders, "__file__", str(edited_module))
+    assert get_fingerprint(workspace) != fingerprint
+
+
+def test_folds_cover_every_row_once(workspace):
+    folds, columns = md.prepare_cv_folds(3, prefix=workspace)
+    n_rows = len(md.load_dataset(f"{workspace}data/ANALYSED_Melbourne_Housing_Market"))
+    validation_sizes = [len(np.load(paths["y_validation"])) for paths in folds]
+    assert sum(validation_sizes) == n_rows
+    for paths, fold_columns, validation_size in zip(folds, columns, validation_sizes):
+        assert len(np.load(paths["y_train"])) == n_rows - validation_size
+        assert np.load(paths["X_train"]).shape[1] == len(fold_columns)
+
+
+def test_cross_validation_reports_every_fold(workspace):
+    results = md.cross_validate_models(["Ridge", "DecisionTreeRegressor"], n_splits=3, workers=1, prefix=workspace)
+    assert results.notna().all().all()
+    assert (results["fit_seconds"] > 0).all()
+    summary = md.summarize_cross_validation(results)
+    assert list(summary.index) == ["Ridge", "DecisionTreeRegressor"]
+    assert (summary["rmse_ci_low"] <= summary["rmse"]).all()
+    assert (summary["rmse"] <= summary["rmse_ci_high"]).all()
@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+import utils.model_interface as mi
+from benchmarks.compiled_model_benchmark import make_model_inputs
+
+
+@pytest.fixture
+def base_input(served_model):
+    return make_model_inputs(1, seed=3).iloc[0]
+
+
+def test_sweep_matches_single_predictions(base_input):
+    sweep = mi.sweep_predictions(base_input, {"BuildingArea": [80.0, 160.0, 240.0]})
+    for _, point in sweep.iterrows():
+        user_input = base_input.copy()
+        user_input["BuildingArea"] = point["BuildingArea"]
+        assert point["PredictedPrice"] == pytest.approx(mi.predict_from_input(user_input))
+
+
+def test_staged_sweep_ends_at_the_full_ensemble(base_input):
+    sweep = mi.sweep_predictions(base_input, {"Rooms": [2, 3, 4]}, stages=[1, mi.model.n_estimators_])
+    np.testing.assert_allclose(sweep[f"PredictedPrice@{mi.model.n_estimators_}"], sweep["PredictedPrice"])
+    assert not np.allclose(sweep["PredictedPrice@1"], sweep["PredictedPrice"])
+
+
+@pytest.mark.parametrize("stage_offset", [0, 1])
+def test_stages_outside_the_ensemble_are_rejected(base_input, stage_offset):
+    stages = [0] if stage_offset == 0 else [mi.model.n_estimators_ + stage_offset]
+    with pytest.raises(ValueError, match="Stages must be between"):
+        mi.sweep_predictions(base_input, {"Rooms": [2, 3]}, stages=stages)
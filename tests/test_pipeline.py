@@ -0,0 +1,67 @@
+import os
+import shutil
+import pytest
+import utils.feature_engineering as fe
+import utils.pipeline as pipeline
+
+STAGE_NAMES = pipeline.DATA_STAGES + ["GradientBoostingRegressor"]
+
+
+def select_stages(config: dict = None) -> list:
+    return [stage for stage in pipeline.build_stages(config) if stage.name in STAGE_NAMES]
+
+
+def get_statuses(report) -> dict:
+    return report["status"].to_dict()
+
+
+def test_stage_sources_include_the_runner_and_transitive_imports():
+    stages = {stage.name: stage for stage in pipeline.build_stages()}
+    sources = {name: [path.rpartition("/")[2] for path in pipeline.get_source_files(stage.function)]
+               for name, stage in stages.items()}
+    assert all(files[0] == "pipeline.py" for files in sources.values())
+    assert {"exploratory_data_analysis.py", "feature_engineering.py", "encoders.py"} <= set(sources["analysis"])
+    assert {"model_development.py", "data_preprocessing.py"} <= set(sources["evaluation"])
+    assert "model_interface.py" in sources["ui_metadata"]
+    assert "feature_engineering.py" not in sources["cleaning"]
+
+
+def test_unchanged_stages_are_cached(workspace):
+    first = pipeline.run_pipeline(select_stages(), workspace, workers=1)
+    assert set(get_statuses(first).values()) == {"built"}
+    second = pipeline.run_pipeline(select_stages(), workspace, workers=1)
+    assert set(get_statuses(second).values()) == {"cached"}
+
+
+def test_changed_parameters_rebuild_only_downstream_stages(workspace):
+    pipeline.run_pipeline(select_stages(), workspace, workers=1)
+    report = pipeline.run_pipeline(select_stages({"GradientBoostingRegressor": {"n_estimators": 10}}), workspace,
+                                   workers=1)
+    assert get_statuses(report) == {**{name: "cached" for name in pipeline.DATA_STAGES},
+                                    "GradientBoostingRegressor": "built"}
+
+
+def test_changed_module_source_invalidates_dependent_stages(workspace, tmp_path, monkeypatch):
+    pipeline.run_pipeline(select_stages(), workspace, workers=1)
+    edited_module = tmp_path / "feature_engineering.py"
+    shutil.copyfile(fe.__file__, edited_module)
+    with open(edited_module, "a") as file:
+        file.write("\n# edited\n")
+    monkeypatch.setattr(fe, "__file__", str(edited_module))
+    report = pipeline.run_pipeline(select_stages(), workspace, workers=1)
+    assert get_statuses(report)["cleaning"] == "cached"
+    assert get_statuses(report)["feature_engineering"] == "built"
+
+
+def test_missing_outputs_are_rebuilt(workspace):
+    pipeline.run_pipeline(select_stages(), workspace, workers=1)
+    stage = next(stage for stage in select_stages() if stage.name == "GradientBoostingRegressor")
+    os.remove(pipeline.resolve_path(workspace + stage.outputs[0]))
+    assert not stage.is_built(workspace)
+    report = pipeline.run_pipeline(select_stages(), workspace, workers=1)
+    assert get_statuses(report)["GradientBoostingRegressor"] == "built"
+
+
+def test_unknown_stage_in_config_is_rejected():
+    with pytest.raises(ValueError, match="Unknown pipeline stages"):
+        pipeline.build_stages({"cleanin": {}})
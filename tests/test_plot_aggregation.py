@@ -0,0 +1,49 @@
+import matplotlib
+import numpy as np
+import pandas as pd
+import pytest
+import utils.plot_aggregation as pa
+from utils.storage import load_dataset
+
+matplotlib.use("Agg")
+
+PLOT_CASES = [("Price", None, None), ("RegionName", None, None), ("Price", None, "RegionName"),
+              ("Longitude", "Latitude", None), ("Rooms", "Price", None), ("Rooms", "Price", "RegionName"),
+              ("RegionName", "Price", None), ("Price", "Rooms", None), ("Suburb", "Price", None)]
+
+
+@pytest.fixture(scope="module")
+def analysed(built_workspace):
+    return load_dataset(f"{built_workspace}data/ANALYSED_Melbourne_Housing_Market")
+
+
+@pytest.mark.parametrize("plot_type", pa.PLOT_TYPES)
+@pytest.mark.parametrize("x, y, hue", PLOT_CASES)
+def test_aggregated_plots_render(analysed, plot_type, x, y, hue):
+    if y is None and plot_type not in ["histplot", "boxplot", "violinplot"]:
+        pytest.skip(f"{plot_type} needs a y column")
+    figure = pa.render_figure(analysed, x, y, hue, plot_type, max_rows=500)
+    assert figure.startswith(b"\x89PNG")
+
+
+@pytest.mark.parametrize("n_rows", [1, 2, 5, 40])
+def test_violin_densities_match_their_coordinates(n_rows):
+    df = pd.DataFrame({"group": "small", "value": np.random.default_rng(0).normal(size=n_rows)})
+    for statistics in pa.violin_statistics(df, "value", ["group"]):
+        assert statistics["vals"].shape == statistics["coords"].shape == (pa.VIOLIN_POINTS,)
+        assert np.isfinite(statistics["vals"]).all()
+
+
+def test_violin_density_integrates_to_one():
+    df = pd.DataFrame({"value": np.random.default_rng(0).normal(size=10_000)})
+    statistics = pa.violin_statistics(df, "value", [])[0]
+    step = statistics["coords"][1] - statistics["coords"][0]
+    assert statistics["vals"].sum() * step == pytest.approx(1)
+
+
+def test_figure_cache_reuses_rendered_bytes(analysed, monkeypatch):
+    pa.clear_figure_cache()
+    first = pa.get_figure(analysed, "v1", "Rooms", "Price", plot_type="boxplot", max_rows=500)
+    monkeypatch.setattr(pa, "render_figure", lambda *args: pytest.fail("rendered a cached figure"))
+    assert pa.get_figure(analysed, "v1", "Rooms", "Price", plot_type="boxplot", max_rows=500) is first
+    pa.clear_figure_cache()
@@ -0,0 +1,61 @@
+import joblib
+import numpy as np
+import pandas as pd
+import utils.model_interface as mi
+from utils.prediction_cache import PredictionCache, canonicalize_input
+from benchmarks.compiled_model_benchmark import make_model_inputs
+
+COLUMNS = ["SaleDate", "Rooms", "Suburb"]
+
+
+def test_equivalent_inputs_share_a_key():
+    first = {"SaleDate": "2017-03-04", "Rooms": 3, "Suburb": "Kew "}
+    second = {"SaleDate": pd.Timestamp("2017-03-04 00:00"), "Rooms": np.float32(3.00001), "Suburb": "Kew"}
+    assert canonicalize_input(first, COLUMNS) == canonicalize_input(second, COLUMNS)
+    assert canonicalize_input(first, COLUMNS) != canonicalize_input(dict(first, Rooms=3.001), COLUMNS)
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = PredictionCache(max_size=2)
+    cache.put("a", 1.0)
+    cache.put("b", 2.0)
+    assert cache.get("a") == 1.0
+    cache.put("c", 3.0)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1.0, 3.0)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_binding_new_artifacts_invalidates_entries(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = PredictionCache(path=path)
+    cache.bind("model-1")
+    cache.put("a", 1.0)
+    cache.close()
+    reopened = PredictionCache(path=path)
+    reopened.bind("model-1")
+    assert reopened.get("a") == 1.0
+    reopened.bind("model-2")
+    assert reopened.get("a") is None
+    reopened.close()
+
+
+def test_cached_predictions_match_and_follow_the_model(workspace):
+    mi.load_preprocessor_and_model(workspace)
+    mi.enable_prediction_cache(max_size=100)
+    try:
+        user_inputs = make_model_inputs(50, seed=2)
+        uncached = mi.score_batch(user_inputs)
+        np.testing.assert_array_equal(mi.predict_batch(user_inputs), uncached)
+        np.testing.assert_array_equal(mi.predict_batch(user_inputs), uncached)
+        assert mi.prediction_cache.stats()["hits"] == len(user_inputs)
+        model = mi.model
+        model.set_params(learning_rate=model.learning_rate / 2)
+        joblib.dump(model, f"{workspace}raw/GradientBoostingRegressor.pkl")
+        mi.load_preprocessor_and_model(workspace)
+        assert mi.prediction_cache.stats()["size"] == 0
+        refreshed = mi.predict_batch(user_inputs)
+        np.testing.assert_array_equal(refreshed, mi.score_batch(user_inputs))
+        assert not np.allclose(refreshed, uncached)
+    finally:
+        mi.disable_prediction_cache()
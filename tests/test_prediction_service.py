@@ -0,0 +1,78 @@
+import asyncio
+import json
+import numpy as np
+import pytest
+import utils.model_interface as mi
+import utils.prediction_service as ps
+from benchmarks.compiled_model_benchmark import make_model_inputs
+
+
+def make_records(n_rows: int) -> list:
+    inputs = make_model_inputs(n_rows, seed=0)
+    inputs["SaleDate"] = inputs["SaleDate"].dt.strftime("%Y-%m-%d")
+    return json.loads(inputs.to_json(orient="records"))
+
+
+async def post_concurrently(payloads: list, window_ms: float = 50.0) -> list:
+    batcher = ps.MicroBatcher(window_ms=window_ms)
+    batcher.start()
+    try:
+        responses = await asyncio.gather(*[ps.handle_request(batcher, "POST", "/predict", json.dumps(payload).encode())
+                                           for payload in payloads])
+    finally:
+        batcher.task.cancel()
+    return responses, batcher
+
+
+@pytest.mark.parametrize("field, value", [("LandSize", "abc"), ("LandSize", None), ("LandSize", True),
+                                          ("SaleDate", "not a date"), ("Suburb", 3073), ("Rooms", "NaN")])
+def test_parse_records_rejects_bad_types(served_model, field, value):
+    record = make_records(1)[0]
+    record[field] = value
+    with pytest.raises(ValueError, match=field):
+        ps.parse_records(json.dumps(record).encode())
+
+
+def test_parse_records_coerces_types(served_model):
+    record = make_records(1)[0]
+    record["LandSize"] = "150"
+    parsed = ps.parse_records(json.dumps([record]).encode())[0]
+    assert parsed["LandSize"] == 150.0
+    assert parsed["SaleDate"].year == int(record["SaleDate"][:4])
+
+
+@pytest.mark.parametrize("body", [b"[]", b"{", json.dumps({"Rooms": 3}).encode()])
+def test_invalid_requests_are_bad_requests(served_model, body):
+    batcher = ps.MicroBatcher()
+    status, payload = asyncio.run(ps.handle_request(batcher, "POST", "/predict", body))
+    assert status == 400
+    assert "error" in payload
+
+
+def test_one_invalid_record_does_not_fail_the_batch(served_model):
+    records = make_records(4)
+    bad_record = dict(records[0], LandSize="abc")
+    responses, batcher = asyncio.run(post_concurrently([records[1], bad_record, records[2:]]))
+    assert [status for status, _ in responses] == [200, 400, 200]
+    expected = mi.predict_batch(ps.make_batch([(ps.parse_records(json.dumps(records[1]).encode()), None)]))
+    assert responses[0][1]["predictions"] == pytest.approx(expected.tolist())
+    assert batcher.errors == 0
+
+
+def test_scoring_failure_is_isolated_to_its_request(served_model, monkeypatch):
+    predict_batch = mi.predict_batch
+
+    def failing_predict_batch(user_inputs):
+        if (user_inputs["LandSize"] == 999_999).any():
+            raise RuntimeError("poisoned row")
+        return predict_batch(user_inputs)
+
+    monkeypatch.setattr(mi, "predict_batch", failing_predict_batch)
+    records = make_records(3)
+    poisoned = dict(records[0], LandSize=999_999)
+    responses, batcher = asyncio.run(post_concurrently([records[1], poisoned, records[2]]))
+    assert [status for status, _ in responses] == [200, 500, 200]
+    assert "poisoned row" in responses[1][1]["error"]
+    assert batcher.errors == 1
+    assert sum(batcher.batch_sizes.values()) == 1
+    assert all(np.isfinite(responses[index][1]["predictions"]).all() for index in [0, 2])
@@ -0,0 +1,64 @@
+import json
+import os
+import pytest
+import utils.data_cleaning as dc
+import utils.profiling as profiling
+import utils.storage as storage
+
+
+@pytest.fixture
+def trace_path(tmp_path):
+    path = str(tmp_path / "trace.json")
+    profiling.enable_profiling(path)
+    yield path
+    profiling.disable_profiling()
+
+
+def load_events(path: str) -> dict:
+    with open(path) as file:
+        events = json.load(file)["traceEvents"]
+    return {event["name"]: event for event in events}
+
+
+def test_trace_records_nested_spans_with_rows(trace_path, raw_sales):
+    dc.clean_dataset(raw_sales.copy())
+    events = load_events(profiling.save_trace())
+    outer, inner = events["data_cleaning.clean_dataset"], events["data_cleaning.clean_chunk"]
+    assert all(event["ph"] == "X" for event in events.values())
+    assert outer["ts"] <= inner["ts"] and inner["ts"] + inner["dur"] <= outer["ts"] + outer["dur"]
+    assert outer["args"]["rows_in"] == len(raw_sales)
+    assert outer["args"]["rows_out"] < len(raw_sales)
+    assert outer["args"]["peak_mb"] >= inner["args"]["peak_mb"] > 0
+
+
+def test_per_value_helpers_are_not_instrumented(trace_path, raw_sales):
+    assert not hasattr(dc.normalize_text, "__wrapped__")
+    assert hasattr(dc.replace_non_alpha_num_chars, "__wrapped__")
+    dc.clean_dataset(raw_sales.copy())
+    events = load_events(profiling.save_trace())
+    assert "data_cleaning.normalize_text" not in events
+
+
+def test_profiler_reads_are_not_reported_as_io(trace_path, raw_sales, tmp_path):
+    dc.clean_dataset(raw_sales.copy())
+    file_path = storage.save_dataset(raw_sales, str(tmp_path / "sales"), "csv")
+    events = load_events(profiling.save_trace())
+    assert events["data_cleaning.replace_non_alpha_num_chars"]["args"]["read_bytes"] == 0
+    assert events["data_cleaning.clean_dataset"]["args"]["read_bytes"] == 0
+    assert events["storage.save_dataset"]["args"]["written_bytes"] >= os.path.getsize(file_path)
+
+
+def test_disabled_profiling_records_nothing(tmp_path, raw_sales):
+    profiling.enable_profiling(str(tmp_path / "trace.json"))
+    assert profiling.disable_profiling() == []
+    dc.clean_dataset(raw_sales.head(200).copy())
+    assert profiling.tracer is None
+    assert profiling.save_trace() is None
+
+
+def test_summary_aggregates_calls(trace_path, raw_sales):
+    for _ in range(2):
+        dc.clean_dataset(raw_sales.head(500).copy())
+    summary = profiling.summarize_trace(profiling.save_trace())
+    assert summary.at["data_cleaning.clean_dataset", "calls"] == 2
+    assert summary["wall_ms"].is_monotonic_decreasing
@@ -0,0 +1,32 @@
+import numpy as np
+import utils.sketches as sketches
+from utils.storage import save_dataset
+
+
+def make_sketch(values: np.ndarray, n_chunks: int = 4) -> sketches.DistinctSketch:
+    sketch = sketches.DistinctSketch()
+    for chunk in np.array_split(values, n_chunks):
+        part = sketches.DistinctSketch()
+        part.update(chunk)
+        sketch.merge(part)
+    return sketch
+
+
+def test_small_cardinalities_are_exact():
+    values = np.array([f"suburb_{index % 351}" for index in range(20_000)], dtype=object)
+    assert make_sketch(values).estimate() == 351
+
+
+def test_large_cardinalities_stay_within_the_hyperloglog_bound():
+    values = np.arange(200_000).astype(str).astype(object)
+    sketch = make_sketch(values)
+    assert sketch.hashes is None
+    assert abs(sketch.estimate() / 200_000 - 1) < 5 * 1.04 / np.sqrt(2 ** sketches.DISTINCT_PRECISION)
+
+
+def test_streaming_cardinality_matches_the_data(raw_sales, tmp_path):
+    path = str(tmp_path / "sales")
+    save_dataset(raw_sales, path, "csv")
+    description = sketches.get_streaming_description(path, chunk_size=500, workers=1)
+    for column in ["Suburb", "SellerG", "CouncilArea", "Address"]:
+        assert description.at["Cardinality", column] == raw_sales[column].nunique()
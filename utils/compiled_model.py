@@ -0,0 +1,223 @@
+import argparse
+import os
+import time
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import GradientBoostingRegressor
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler, OneHotEncoder, OrdinalEncoder
+import joblib
+import utils.feature_engineering as fe
+from utils.prediction_cache import hash_artifacts
+from utils.profiling import not_profiled
+from utils.storage import load_dataset
+
+TREE_LEAF = -1
+COMPILED_MODEL_PATH = "raw/compiled_model.npz"
+
+
+def export_compiled_model(preprocessor, model: GradientBoostingRegressor) -> dict:
+    compiled = {"transformer_names": [], "transformer_kinds": [], "top_n_columns": []}
+    if isinstance(preprocessor, Pipeline):
+        top_n_encoder, preprocessor = preprocessor.named_steps["top_n"], preprocessor[-1]
+        for column in top_n_encoder.vocabulary_:
+            compiled["top_n_columns"].append(column)
+            compiled[f"top_n__{column}"] = np.array(top_n_encoder.get_categories(column), dtype=str)
+            compiled[f"top_n__{column}__other"] = np.array(top_n_encoder.other)
+    compiled["top_n_columns"] = np.array(compiled["top_n_columns"], dtype=str)
+    for name, transformer, columns in preprocessor.transformers_:
+        if name == "remainder" or len(columns) == 0:
+            continue
+        compiled["transformer_names"].append(name)
+        compiled[f"{name}__columns"] = np.array(columns, dtype=str)
+        if isinstance(transformer, StandardScaler):
+            compiled["transformer_kinds"].append("scaler")
+            compiled[f"{name}__mean"] = transformer.mean_ if transformer.with_mean else np.zeros(len(columns))
+            compiled[f"{name}__scale"] = transformer.scale_ if transformer.with_std else np.ones(len(columns))
+        elif isinstance(transformer, (OneHotEncoder, OrdinalEncoder)):
+            compiled["transformer_kinds"].append("one_hot" if isinstance(transformer, OneHotEncoder) else "ordinal")
+            compiled[f"{name}__categories"] = np.concatenate(transformer.categories_).astype(str)
+            compiled[f"{name}__offsets"] = np.cumsum([0] + [len(values) for values in transformer.categories_])
+        else:
+            raise ValueError(f"Cannot compile transformer {name}: {transformer.__class__.__name__}")
+    compiled["transformer_names"] = np.array(compiled["transformer_names"], dtype=str)
+    compiled["transformer_kinds"] = np.array(compiled["transformer_kinds"], dtype=str)
+
+    trees = [estimator.tree_ for estimator in model.estimators_[:, 0]]
+    depth = max(tree.max_depth for tree in trees)
+    if 2 ** depth - 1 > 64:
+        raise ValueError(f"Cannot compile trees deeper than 6 levels, got {depth}")
+    compiled["tree_depth"] = np.array(depth)
+    compiled["tree_feature"] = np.zeros((len(trees), 2 ** depth - 1), dtype="intp")
+    compiled["tree_threshold"] = np.full((len(trees), 2 ** depth - 1), np.inf, dtype="float32")
+    compiled["tree_leaf_value"] = np.zeros((len(trees), 2 ** depth))
+    for index, tree in enumerate(trees):
+        fill_perfect_tree(compiled, index, tree, depth)
+    compiled["learning_rate"] = np.array(model.learning_rate)
+    compiled["init_value"] = np.array(
+        0.0 if model.init_ == "zero" else model.init_.predict(np.zeros((1, model.n_features_in_)))[0])
+    return compiled
+
+
+@not_profiled
+def fill_perfect_tree(compiled: dict, index: int, tree, depth: int) -> None:
+    n_internal = 2 ** depth - 1
+    stack = [(0, 0, 0)]
+    while stack:
+        node, position, level = stack.pop()
+        if tree.children_left[node] == TREE_LEAF:
+            first_leaf, last_leaf = position, position
+            for _ in range(depth - level):
+                first_leaf, last_leaf = 2 * first_leaf + 1, 2 * last_leaf + 2
+            leaves = slice(first_leaf - n_internal, last_leaf - n_internal + 1)
+            compiled["tree_leaf_value"][index, leaves] = tree.value[node, 0, 0]
+            continue
+        threshold = np.float32(tree.threshold[node])
+        if threshold > tree.threshold[node]:
+            threshold = np.nextafter(threshold, np.float32(-np.inf))
+        compiled["tree_feature"][index, position] = tree.feature[node]
+        compiled["tree_threshold"][index, position] = threshold
+        stack.append((tree.children_left[node], 2 * position + 1, level + 1))
+        stack.append((tree.children_right[node], 2 * position + 2, level + 1))
+
+
+def save_compiled_model(compiled: dict, path: str) -> None:
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, "wb") as file:
+        np.savez(file, **compiled)
+    os.replace(temporary_path, path)
+
+
+def load_compiled_model(path: str) -> dict:
+    with np.load(path) as arrays:
+        return {key: arrays[key] for key in arrays.files}
+
+
+def load_or_export_compiled_model(preprocessor, model: GradientBoostingRegressor, path: str,
+                                  artifact_hash: str) -> dict:
+    if os.path.exists(path):
+        compiled = load_compiled_model(path)
+        if str(compiled.get("artifact_hash")) == artifact_hash:
+            return compiled
+    compiled = export_compiled_model(preprocessor, model)
+    compiled["artifact_hash"] = np.array(artifact_hash)
+    save_compiled_model(compiled, path)
+    return compiled
+
+
+def engineer_compiled_features(columns: dict) -> dict:
+    columns = dict(columns)
+    sale_date = np.asarray(columns["SaleDate"], dtype="datetime64[D]")
+    sale_month_start = sale_date.astype("datetime64[M]")
+    columns["SaleYear"] = sale_date.astype("datetime64[Y]").astype("int64") + 1970
+    columns["SaleMonth"] = sale_month_start.astype("int64") % 12 + 1
+    columns["SaleDay"] = (sale_date - sale_month_start).astype("int64") + 1
+    columns["SaleQuarter"] = (columns["SaleMonth"] - 1) // 3 + 1
+    columns["SaleDayOfWeek"] = (sale_date.astype("int64") + 3) % 7
+    building_area = np.asarray(columns["BuildingArea"], dtype="float64")
+    land_size = np.asarray(columns["LandSize"], dtype="float64")
+    columns["PropertyAge"] = columns["SaleYear"] - np.asarray(columns["YearBuilt"], dtype="float64")
+    columns["AvgRoomSize"] = building_area / np.asarray(columns["Rooms"], dtype="float64")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        columns["BuildingToLandRatio"] = np.where(land_size == 0, 1.0, building_area / land_size)
+    return columns
+
+
+def encode_categories(categories: np.ndarray, values) -> np.ndarray:
+    values = np.asarray(values, dtype=object)
+    if len(values) * len(categories) > 100_000:
+        return pd.Index(categories).get_indexer(values)
+    matches = values[:, None] == categories
+    return np.where(matches.any(axis=1), matches.argmax(axis=1), -1)
+
+
+def apply_compiled_top_n(compiled: dict, columns: dict) -> dict:
+    columns = dict(columns)
+    for column in compiled.get("top_n_columns", ()):
+        categories = compiled[f"top_n__{column}"]
+        codes = encode_categories(categories, columns[column])
+        other = compiled[f"top_n__{column}__other"]
+        columns[column] = np.where(codes >= 0, categories[codes], other).astype(object)
+    return columns
+
+
+def transform_compiled(compiled: dict, columns: dict) -> np.ndarray:
+    columns = apply_compiled_top_n(compiled, columns)
+    blocks = []
+    for name, kind in zip(compiled["transformer_names"], compiled["transformer_kinds"]):
+        block_columns = compiled[f"{name}__columns"]
+        if kind == "scaler":
+            values = np.column_stack([np.asarray(columns[column], dtype="float64") for column in block_columns])
+            blocks.append((values - compiled[f"{name}__mean"]) / compiled[f"{name}__scale"])
+            continue
+        categories, offsets = compiled[f"{name}__categories"], compiled[f"{name}__offsets"]
+        codes = [encode_categories(categories[offsets[index]:offsets[index + 1]], columns[column])
+                 for index, column in enumerate(block_columns)]
+        codes = np.column_stack(codes)
+        if kind == "ordinal":
+            blocks.append(codes.astype("float64"))
+        else:
+            one_hot = np.zeros((len(codes), offsets[-1]))
+            rows, column_indices = np.nonzero(codes >= 0)
+            one_hot[rows, offsets[column_indices] + codes[rows, column_indices]] = 1.0
+            blocks.append(one_hot)
+    return np.hstack(blocks)
+
+
+def predict_compiled(compiled: dict, X: np.ndarray, chunk_size: int = 2_000) -> np.ndarray:
+    X_columns = np.ascontiguousarray(np.asarray(X, dtype="float32").T)
+    feature, threshold = compiled["tree_feature"], compiled["tree_threshold"]
+    leaf_value = compiled["tree_leaf_value"]
+    n_internal = feature.shape[1]
+    code_dtype = next(dtype for dtype in ("uint8", "uint16", "uint32", "uint64")
+                      if np.dtype(dtype).itemsize * 8 >= n_internal)
+    predictions = np.empty(X_columns.shape[1])
+    for start in range(0, X_columns.shape[1], chunk_size):
+        X_chunk = X_columns[:, start:start + chunk_size]
+        codes = np.zeros((len(feature), X_chunk.shape[1]), dtype=code_dtype)
+        for position in range(n_internal):
+            goes_right = X_chunk[feature[:, position]] > threshold[:, position, None]
+            codes |= goes_right.astype(code_dtype) << np.array(position, dtype=code_dtype)
+        positions = np.zeros(codes.shape, dtype=code_dtype)
+        for _ in range(int(compiled["tree_depth"])):
+            positions = 2 * positions + 1 + ((codes >> positions) & 1)
+        leaves = positions.astype("intp") - n_internal
+        predictions[start:start + chunk_size] = np.take_along_axis(leaf_value, leaves, axis=1).sum(axis=0)
+    return compiled["init_value"] + compiled["learning_rate"] * predictions
+
+
+def predict_batch_compiled(compiled: dict, user_inputs: pd.DataFrame) -> np.ndarray:
+    columns = engineer_compiled_features({column: user_inputs[column].to_numpy() for column in user_inputs.columns})
+    return predict_compiled(compiled, transform_compiled(compiled, columns))
+
+
+def predict_from_input_compiled(compiled: dict, user_input: pd.Series) -> float:
+    columns = engineer_compiled_features({column: np.array([value]) for column, value in user_input.items()})
+    return predict_compiled(compiled, transform_compiled(compiled, columns))[0]
+
+
+def check_parity(compiled: dict, preprocessor, model: GradientBoostingRegressor, user_inputs: pd.DataFrame,
+                 rtol: float = 1e-9) -> float:
+    X = pd.DataFrame(preprocessor.transform(fe.engineer_features(user_inputs)),
+                     columns=preprocessor.get_feature_names_out())
+    expected = model.predict(X)
+    actual = predict_batch_compiled(compiled, user_inputs)
+    if not np.allclose(actual, expected, rtol=rtol, atol=0):
+        raise AssertionError(f"Compiled model diverges from sklearn by up to {np.abs(actual - expected).max()}")
+    return np.abs(actual - expected).max()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the preprocessor and model into flat NumPy arrays.")
+    parser.add_argument("--prefix", default="../", help="path prefix of the raw/ and data/ directories")
+    args = parser.parse_args()
+    artifact_paths = [f"{args.prefix}raw/preprocessor.pkl", f"{args.prefix}raw/GradientBoostingRegressor.pkl"]
+    preprocessor, model = map(joblib.load, artifact_paths)
+    compiled = load_or_export_compiled_model(preprocessor, model, args.prefix + COMPILED_MODEL_PATH,
+                                             hash_artifacts(*artifact_paths))
+    user_inputs = load_dataset(f"{args.prefix}data/CLEANED_Melbourne_Housing_Market")
+    user_inputs = user_inputs.drop(columns=["Price", "Address", "SaleMethod", "UnitType"])
+    start = time.perf_counter()
+    max_difference = check_parity(compiled, preprocessor, model, user_inputs)
+    print(f"Compiled model matches sklearn on {len(user_inputs)} raw rows (max difference {max_difference:.3g}) "
+          f"in {time.perf_counter() - start:.2f}s")
@@ -1,9 +1,23 @@
+import re
+import numpy as np
 import pandas as pd
 from sklearn.impute import SimpleImputer
+from utils.memory import compact_dataset, copy_frame
+from utils.profiling import not_profiled
+from utils.storage import save_dataset
+
+NON_ALPHA_NUM_CHAR = re.compile(r"\W")
+
+
+@not_profiled
+def normalize_text(value: str) -> str:
+    if not isinstance(value, str):
+        return np.nan
+    return NON_ALPHA_NUM_CHAR.sub("_", value.strip().title()).strip("_")
 
 
 def correct_column_names(df_input: pd.DataFrame) -> pd.DataFrame:
-    df = df_input.copy()
+    df = copy_frame(df_input)
     df.rename(columns={"Type": "UnitType", "Method": "SaleMethod", "SellerG": "RealEstateAgent", "Date": "SaleDate",
                        "Distance": "DistanceToCBD", "Bedroom2": "Bedrooms", "Bathroom": "Bathrooms", "Car": "CarSpots",
                        "Landsize": "LandSize", "Lattitude": "Latitude", "Longtitude": "Longitude",
@@ -12,7 +26,7 @@ def correct_column_names(df_input: pd.DataFrame) -> pd.DataFrame:
 
 
 def convert_floats_to_ints(df_input: pd.DataFrame) -> pd.DataFrame:
-    df = df_input.copy()
+    df = copy_frame(df_input)
     should_be_float_columns = ["DistanceToCBD", "BuildingArea", "Latitude", "Longitude"]
     should_be_int_columns = [column for column in df.select_dtypes(include="number").columns if
                              column not in should_be_float_columns]
@@ -21,8 +35,16 @@ def convert_floats_to_ints(df_input: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
+def replace_non_alpha_num_chars(df_input: pd.DataFrame) -> pd.DataFrame:
+    df = copy_frame(df_input)
+    for column in df.select_dtypes(include="object").columns:
+        normalized_values = {value: normalize_text(value) for value in df[column].dropna().unique()}
+        df[column] = df[column].map(normalized_values).where(df[column].notna(), df[column])
+    return df
+
+
 def format_df_cells(df_input: pd.DataFrame) -> pd.DataFrame:
-    df = df_input.copy()
+    df = copy_frame(df_input)
 
     def format_unit_type_cells(input_df_input: pd.DataFrame) -> pd.DataFrame:
         input_df = input_df_input
@@ -49,22 +71,6 @@ def format_df_cells(df_input: pd.DataFrame) -> pd.DataFrame:
         input_df["CouncilArea"] = input_df["CouncilArea"].str.replace(" Council", "")
         return input_df
 
-    def replace_non_alpha_num_chars(input_df_input: pd.DataFrame) -> pd.DataFrame:
-        input_df = input_df_input.copy()
-
-        def get_non_alpha_num_chars(input_input_df_input: pd.DataFrame) -> set:
-            input_input_df = input_input_df_input.copy()
-            text_data = input_input_df.select_dtypes(include="object").astype(str).values.ravel()
-            return {char for cell in text_data for char in cell if not char.isalnum()}
-
-        non_alpha_num_chars = get_non_alpha_num_chars(input_df)
-        for column in input_df.select_dtypes(include="object").columns:
-            input_df[column] = input_df[column].str.strip().str.title()
-            for non_alpha_num_char in non_alpha_num_chars:
-                input_df[column] = input_df[column].str.replace(non_alpha_num_char, "_")
-            input_df[column] = input_df[column].str.strip("_")
-        return input_df
-
     df = format_unit_type_cells(df)
     df = format_sale_method_cells(df)
     df = format_sale_date_cells(df)
@@ -74,16 +80,16 @@ def format_df_cells(df_input: pd.DataFrame) -> pd.DataFrame:
 
 
 def reorder_df_columns(df_input: pd.DataFrame) -> pd.DataFrame:
-    df = df_input.copy()
-    df = df[sorted(df.select_dtypes(include="object").columns.tolist()) + sorted(
-        df.select_dtypes(exclude="object").columns.tolist())]
+    df = copy_frame(df_input)
+    df = df[sorted(df.select_dtypes(include=["object", "category"]).columns.tolist()) + sorted(
+        df.select_dtypes(exclude=["object", "category"]).columns.tolist())]
     columns = ["SaleDate"] + [column for column in df.columns if column not in ["SaleDate", "Price"]] + ["Price"]
     df = df[columns]
     return df
 
 
 def estimate_nulls(df_input: pd.DataFrame, remove_price=False) -> pd.DataFrame:
-    df = df_input.copy()
+    df = copy_frame(df_input)
     if remove_price:
         df.dropna(subset=["Price"], inplace=True)
     imputer = SimpleImputer(strategy="median")
@@ -97,18 +103,46 @@ def estimate_nulls(df_input: pd.DataFrame, remove_price=False) -> pd.DataFrame:
     return df
 
 
-def drop_duplicates(df_input: pd.DataFrame) -> pd.DataFrame:
-    df = df_input.copy()
+def fill_nulls(df_input: pd.DataFrame, remove_price=False) -> pd.DataFrame:
+    df = copy_frame(df_input.dropna(subset=["Price"]) if remove_price else df_input)
+    for column in df.columns[df.isna().any()]:
+        if pd.api.types.is_datetime64_any_dtype(df[column]):
+            continue
+        if pd.api.types.is_numeric_dtype(df[column]):
+            df[column] = df[column].fillna(df[column].median())
+        else:
+            df[column] = df[column].fillna(df[column].mode().iloc[0])
+    return df
+
+
+def drop_duplicates(df_input: pd.DataFrame, hashed: bool = False) -> pd.DataFrame:
+    if hashed:
+        return df_input[~pd.util.hash_pandas_object(df_input, index=False).duplicated().to_numpy()]
+    df = copy_frame(df_input)
     df.drop_duplicates(inplace=True)
     return df
 
 
+def clean_chunk(df_input: pd.DataFrame, compact: bool = False) -> pd.DataFrame:
+    df = correct_column_names(df_input)
+    if not compact:
+        df = convert_floats_to_ints(df)
+    df = format_df_cells(df)
+    return compact_dataset(df) if compact else df
+
+
+def finalize_cleaning(df_input: pd.DataFrame, compact: bool = False) -> pd.DataFrame:
+    df = reorder_df_columns(df_input)
+    df = fill_nulls(df, remove_price=True) if compact else estimate_nulls(df, remove_price=True)
+    df = drop_duplicates(df, hashed=compact)
+    return compact_dataset(df) if compact else df
+
+
+def clean_dataset(df_input: pd.DataFrame, compact: bool = False) -> pd.DataFrame:
+    return finalize_cleaning(clean_chunk(df_input, compact), compact)
+
+
 if __name__ == "__main__":
     dataset = pd.read_csv("../data/Melbourne_Housing_Market.csv")
-    dataset = correct_column_names(dataset)
-    dataset = convert_floats_to_ints(dataset)
-    dataset = format_df_cells(dataset)
-    dataset = reorder_df_columns(dataset)
-    dataset = estimate_nulls(dataset, remove_price=True)
-    dataset = drop_duplicates(dataset)
-    dataset.to_csv("../data/CLEANED_Melbourne_Housing_Market.csv", index=False)
+    dataset = clean_dataset(dataset)
+    save_dataset(dataset, "../data/CLEANED_Melbourne_Housing_Market")
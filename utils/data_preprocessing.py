@@ -1,35 +1,60 @@
+import os
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.compose import ColumnTransformer
+from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import StandardScaler, OneHotEncoder, OrdinalEncoder
 import joblib
+from utils.encoders import TopNEncoder
+from utils.storage import load_dataset, save_dataset
 
-if __name__ == "__main__":
-    df = pd.read_csv("../data/ANALYSED_Melbourne_Housing_Market.csv")
-    df["SaleDate"] = pd.to_datetime(df["SaleDate"])
-    y = df["Price"]
-    X = df.drop(columns=["Price"])
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+TOP_N_CATEGORIES = {"RealEstateAgent": 32, "Suburb": 32}
+
+
+def build_preprocessor(X: pd.DataFrame, top_n: dict = None) -> Pipeline:
+    top_n = TOP_N_CATEGORIES if top_n is None else top_n
+    categorical_features = X.select_dtypes(include=["object", "category"]).columns
+    # The top-N step leaves at most n categories plus "Other", so the cardinality is known without fitting it.
+    cardinality = {column: min(X[column].nunique(), top_n[column] + 1) if column in top_n else X[column].nunique()
+                   for column in categorical_features}
     numerical_features = X.select_dtypes(include="number").columns
-    low_card_cat_features = [column for column in X.select_dtypes(include="object").columns if
-                             X[column].nunique() <= 10]
-    high_card_cat_features = [column for column in X.select_dtypes(include="object").columns if
-                              X[column].nunique() > 10]
+    low_card_cat_features = [column for column in categorical_features if cardinality[column] <= 10]
+    high_card_cat_features = [column for column in categorical_features if cardinality[column] > 10]
 
-    preprocessor = ColumnTransformer(transformers=[
+    column_transformer = ColumnTransformer(transformers=[
         ("scaler", StandardScaler(), numerical_features),
         ("low_card_encoder", OneHotEncoder(handle_unknown="ignore"), low_card_cat_features),
         ("high_card_encoder", OrdinalEncoder(handle_unknown="use_encoded_value", unknown_value=-1),
          high_card_cat_features)
     ])
+    return Pipeline([("top_n", TopNEncoder(top_n)), ("columns", column_transformer)])
+
+
+def preprocess_dataset(df: pd.DataFrame, test_size: float = 0.2, random_state: int = 42, top_n: dict = None) -> tuple:
+    y = df["Price"]
+    X = df.drop(columns=["Price"])
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=random_state)
+    preprocessor = build_preprocessor(X, top_n)
     X_train = preprocessor.fit_transform(X_train)
     X_test = preprocessor.transform(X_test)
-    joblib.dump(preprocessor, "../raw/preprocessor.pkl")
     X_train_df = pd.DataFrame(X_train, columns=preprocessor.get_feature_names_out())
     X_test_df = pd.DataFrame(X_test, columns=preprocessor.get_feature_names_out())
     y_train_df = pd.DataFrame(y_train)
     y_test_df = pd.DataFrame(y_test)
-    X_train_df.to_csv("../data/split_data/X_train.csv", index=False)
-    X_test_df.to_csv("../data/split_data/X_test.csv", index=False)
-    y_train_df.to_csv("../data/split_data/y_train.csv", header=False, index=False)
-    y_test_df.to_csv("../data/split_data/y_test.csv", header=False, index=False)
+    return preprocessor, X_train_df, X_test_df, y_train_df, y_test_df
+
+
+def save_split_datasets(X_train_df: pd.DataFrame, X_test_df: pd.DataFrame, y_train_df: pd.DataFrame,
+                        y_test_df: pd.DataFrame, prefix: str = "../") -> None:
+    os.makedirs(f"{prefix}data/split_data", exist_ok=True)
+    save_dataset(X_train_df, f"{prefix}data/split_data/X_train")
+    save_dataset(X_test_df, f"{prefix}data/split_data/X_test")
+    save_dataset(y_train_df, f"{prefix}data/split_data/y_train", header=False)
+    save_dataset(y_test_df, f"{prefix}data/split_data/y_test", header=False)
+
+
+if __name__ == "__main__":
+    df = load_dataset("../data/ANALYSED_Melbourne_Housing_Market")
+    preprocessor, X_train_df, X_test_df, y_train_df, y_test_df = preprocess_dataset(df)
+    joblib.dump(preprocessor, "../raw/preprocessor.pkl")
+    save_split_datasets(X_train_df, X_test_df, y_train_df, y_test_df)
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.utils.validation import check_is_fitted
+
+
+def top_n_categories(vocabulary: list, other: str = "Other") -> list:
+    return list(vocabulary) if other in vocabulary else list(vocabulary) + [other]
+
+
+def encode_top_n(values: pd.Series, vocabulary: list, other: str = "Other") -> pd.Series:
+    categories = top_n_categories(vocabulary, other)
+    other_code = categories.index(other)
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        mapping = pd.Index(categories).get_indexer(values.cat.categories)
+        mapping[mapping == -1] = other_code
+        codes = values.cat.codes.to_numpy()
+        codes = np.where(codes >= 0, mapping[codes], other_code)
+    else:
+        codes = pd.Index(categories).get_indexer(values)
+        codes[codes == -1] = other_code
+    return pd.Series(pd.Categorical.from_codes(codes, categories=categories), index=values.index, name=values.name)
+
+
+class TopNEncoder(BaseEstimator, TransformerMixin):
+    def __init__(self, top_n: dict = None, other: str = "Other"):
+        self.top_n = top_n
+        self.other = other
+
+    def fit(self, X: pd.DataFrame, y=None):
+        self.feature_names_in_ = np.asarray(X.columns, dtype=object)
+        self.n_features_in_ = len(self.feature_names_in_)
+        self.vocabulary_ = {}
+        self.counts_ = {}
+        for column, n in (self.top_n or {}).items():
+            counts = X[column].value_counts()
+            self.counts_[column] = counts[counts > 0]
+            self.vocabulary_[column] = list(self.counts_[column].head(n).index)
+        return self
+
+    def partial_fit(self, X: pd.DataFrame, y=None):
+        if not hasattr(self, "vocabulary_"):
+            return self.fit(X, y)
+        counts_ = getattr(self, "counts_", {})
+        for column, n in (self.top_n or {}).items():
+            counts = X[column].value_counts()
+            counts = counts[counts > 0]
+            seen = counts_[column].index if column in counts_ else pd.Index([])
+            if column in counts_:
+                counts = counts_[column].add(counts, fill_value=0).sort_values(ascending=False, kind="stable")
+            counts_[column] = counts
+            # Only categories first seen in this batch join the vocabulary, so rows encoded before keep their codes.
+            vocabulary = self.vocabulary_.setdefault(column, [])
+            vocabulary.extend(category for category in counts.head(n).index
+                              if category not in vocabulary and category not in seen)
+        self.counts_ = counts_
+        return self
+
+    def transform(self, X: pd.DataFrame) -> pd.DataFrame:
+        check_is_fitted(self, "vocabulary_")
+        X = X.copy(deep=False)
+        for column, vocabulary in self.vocabulary_.items():
+            if column in X.columns:
+                X[column] = encode_top_n(X[column], vocabulary, self.other)
+        return X
+
+    def get_feature_names_out(self, input_features=None) -> np.ndarray:
+        check_is_fitted(self, "vocabulary_")
+        return np.asarray(self.feature_names_in_ if input_features is None else input_features, dtype=object)
+
+    def get_categories(self, column: str) -> list:
+        return top_n_categories(self.vocabulary_[column], self.other)
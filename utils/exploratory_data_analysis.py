@@ -1,15 +1,59 @@
+import numpy as np
 import pandas as pd
 from utils.feature_engineering import remove_column
+from utils.encoders import TopNEncoder
+from utils.memory import copy_frame
+from utils.storage import load_dataset, save_dataset
 import matplotlib.pyplot as plt
 import seaborn as sns
 
 
+DESCRIBE_STATISTICS = ["count", "mean", "std", "min", "25%", "50%", "75%", "max"]
+
+
+def get_numeric_statistics(df_input: pd.DataFrame) -> pd.DataFrame:
+    numeric = df_input.select_dtypes(include="number")
+    quantiles = numeric.quantile([0.25, 0.5, 0.75])
+    statistics = pd.DataFrame({
+        "count": numeric.count(), "mean": numeric.mean(), "std": numeric.std(), "min": numeric.min(),
+        "25%": quantiles.loc[0.25], "50%": quantiles.loc[0.5], "75%": quantiles.loc[0.75], "max": numeric.max(),
+        "skew": numeric.skew(), "kurtosis": numeric.kurtosis()
+    }, index=numeric.columns)
+    statistics["IQR"] = statistics["75%"] - statistics["25%"]
+    statistics["IQRLower"] = statistics["25%"] - 1.5 * statistics["IQR"]
+    statistics["IQRUpper"] = statistics["75%"] + 1.5 * statistics["IQR"]
+    return statistics
+
+
+def get_outlier_mask(df_input: pd.DataFrame, method: str = "iqr", statistics: pd.DataFrame = None) -> pd.DataFrame:
+    numeric = df_input.select_dtypes(include="number")
+    if statistics is None:
+        statistics = get_numeric_statistics(numeric)
+    if method == "iqr":
+        return numeric.lt(statistics["IQRLower"]) | numeric.gt(statistics["IQRUpper"])
+    if method == "zscore":
+        zscore = (numeric - statistics["mean"]) / statistics["std"]
+        return (zscore < -3) | (zscore > 3)
+    return pd.DataFrame(False, index=numeric.index, columns=numeric.columns)
+
+
+def get_column_outlier_mask(values: pd.Series, method: str = "iqr") -> pd.Series:
+    if method == "iqr":
+        q1, q3 = values.quantile(0.25), values.quantile(0.75)
+        iqr = q3 - q1
+        return (values < q1 - 1.5 * iqr) | (values > q3 + 1.5 * iqr)
+    if method == "zscore":
+        zscore = (values - values.mean()) / values.std()
+        return (zscore < -3) | (zscore > 3)
+    return pd.Series(False, index=values.index)
+
+
 def remove_outliers(df_input: pd.DataFrame, method="IQR") -> pd.DataFrame:
-    df = df_input.copy()
-    for col in df.select_dtypes(include="number").columns:
-        outliers = get_outliers(df, col, method)
-        df = df[~df.index.isin(outliers.index)]
-    return df
+    numeric = df_input.select_dtypes(include="number")
+    keep = np.ones(len(numeric), dtype=bool)
+    for col in numeric.columns:
+        keep[keep] = ~get_column_outlier_mask(numeric[col][keep], method).to_numpy()
+    return df_input[keep]
 
 
 def safe_round(val: float) -> float:
@@ -20,36 +64,21 @@ def safe_round(val: float) -> float:
 
 
 def get_outliers(df_input: pd.DataFrame, col: str, method: str = "iqr") -> pd.DataFrame:
-    df = df_input.copy()
-    outliers = pd.DataFrame()
-    if method == "iqr":
-        q1, q3 = df[col].quantile(0.25), df[col].quantile(0.75)
-        iqr = q3 - q1
-        lower_bound, upper_bound = q1 - 1.5 * iqr, q3 + 1.5 * iqr
-        outliers = df[(df[col] < lower_bound) | (df[col] > upper_bound)].copy()
-    elif method == "zscore":
-        zscore = (df[col] - df[col].mean()) / df[col].std()
-        outliers = df[(zscore < -3) | (zscore > 3)].copy()
-    return outliers
+    return df_input[get_column_outlier_mask(df_input[col], method)]
 
 
 def get_custom_description(df_input: pd.DataFrame) -> pd.DataFrame:
-    df = df_input.copy()
-    description = df.describe(include="all").T
+    statistics = get_numeric_statistics(df_input)
+    other = df_input.select_dtypes(exclude="number")
+    description = pd.concat([other.describe(include="all").T, statistics[DESCRIBE_STATISTICS].astype(object)])
+    description = description.reindex(df_input.columns)
     description["MajorityPercentage"] = description["freq"] / description["count"]
     description["Range"] = description["max"] - description["min"]
     description["IQR"] = description["75%"] - description["25%"]
-    description["Skewness"] = df.select_dtypes(include="number").skew()
-    description["Kurtosis"] = df.select_dtypes(include="number").kurtosis()
-    description["IQROutliers"] = df.select_dtypes(include="number").apply(
-        lambda col: len(get_outliers(df, col.name, method="iqr")))
-    description["ZScoreOutliers"] = df.select_dtypes(include="number").apply(
-        lambda col: len(get_outliers(df, col.name, method="zscore")))
-    description = remove_column(description, "count")
-    description = remove_column(description, "freq")
-    description = remove_column(description, "25%")
-    description = remove_column(description, "50%")
-    description = remove_column(description, "75%")
+    description["Skewness"] = statistics["skew"]
+    description["Kurtosis"] = statistics["kurtosis"]
+    description["IQROutliers"] = get_outlier_mask(df_input, "iqr", statistics).sum()
+    description["ZScoreOutliers"] = get_outlier_mask(df_input, "zscore", statistics).sum()
     description = description.rename(
         columns={"unique": "Cardinality", "top": "Majority", "mean": "Mean", "min": "Min", "max": "Max", "std": "STD"})
     description = description.map(safe_round)
@@ -60,11 +89,7 @@ def get_custom_description(df_input: pd.DataFrame) -> pd.DataFrame:
 
 
 def top_n_filter(df_input: pd.DataFrame, col: str, n: int = 10) -> pd.DataFrame:
-    df = df_input.copy()
-    column_value_counts = df[col].value_counts()
-    top_n_values = column_value_counts.head(n).index
-    df[col] = df[col].apply(lambda value: value if value in top_n_values else "Other")
-    return df
+    return TopNEncoder({col: n}).fit_transform(df_input)
 
 
 def plot_univariates(*funcs, **kwargs) -> None:
@@ -77,9 +102,10 @@ def plot_univariates(*funcs, **kwargs) -> None:
 
 
 def plot_pie_chart(df_input: pd.DataFrame, col: str, show=True, ax=None) -> None:
-    df = df_input.copy()
+    df = copy_frame(df_input)
     df = top_n_filter(df, col)
     values = df[col].value_counts()
+    values = values[values > 0]
     if ax is None:
         ax = plt.gca()
     ax.pie(values, labels=values.index, autopct='%1.1f%%')
@@ -89,7 +115,7 @@ def plot_pie_chart(df_input: pd.DataFrame, col: str, show=True, ax=None) -> None
 
 
 def plot_bivariates(df_input: pd.DataFrame, x_column: str, plot, *y_columns) -> None:
-    df = df_input.copy()
+    df = copy_frame(df_input)
     if x_column in df.select_dtypes(exclude="number").columns:
         df = top_n_filter(df, x_column, 5)
     _, axes = plt.subplots((len(y_columns) + 1) // 2, 2, figsize=(10, int(2.5 * len(y_columns))))
@@ -104,7 +130,7 @@ def plot_bivariates(df_input: pd.DataFrame, x_column: str, plot, *y_columns) ->
 
 
 def scatter_with_hues(df_input: pd.DataFrame, x_column: str, y_column: str, *hues) -> None:
-    df = df_input.copy()
+    df = copy_frame(df_input)
     _, axes = plt.subplots((len(hues) + 1) // 2, 2, figsize=(10, int(2.5 * len(hues))))
     axes = axes.ravel()
     for index, hue_column in enumerate(hues):
@@ -115,14 +141,16 @@ def scatter_with_hues(df_input: pd.DataFrame, x_column: str, y_column: str, *hue
     plt.show()
 
 
+def analyse_dataset(df_input: pd.DataFrame, outlier_method: str = "zscore") -> pd.DataFrame:
+    df = remove_column(df_input, "StreetName")
+    df = remove_column(df, "SaleMethod")
+    df = remove_column(df, "StreetType")
+    df = remove_column(df, "UnitType")
+    df = remove_outliers(df, outlier_method)
+    return df
+
+
 if __name__ == "__main__":
-    dataset = pd.read_csv("../data/ENGINEERED_Melbourne_Housing_Market.csv")
-    dataset["SaleDate"] = pd.to_datetime(dataset["SaleDate"])
-    dataset = remove_column(dataset, "StreetName")
-    dataset = remove_column(dataset, "SaleMethod")
-    dataset = remove_column(dataset, "StreetType")
-    dataset = remove_column(dataset, "UnitType")
-    dataset = top_n_filter(dataset, "RealEstateAgent", 32)
-    dataset = top_n_filter(dataset, "Suburb", 32)
-    dataset = remove_outliers(dataset, "zscore")
-    dataset.to_csv("../data/ANALYSED_Melbourne_Housing_Market.csv", index=False)
+    dataset = load_dataset("../data/ENGINEERED_Melbourne_Housing_Market")
+    dataset = analyse_dataset(dataset)
+    save_dataset(dataset, "../data/ANALYSED_Melbourne_Housing_Market")
@@ -1,10 +1,41 @@
 import pandas as pd
 import numpy as np
 from utils.data_cleaning import reorder_df_columns
+from utils.memory import copy_frame
+from utils.storage import load_dataset, save_dataset
+
+STREET_TYPE_ABBREVIATIONS = {"St": "Street", "Rd": "Road", "Av": "Avenue", "Ct": "Court", "Dr": "Drive",
+                             "Cr": "Crescent", "Gr": "Grove", "Pl": "Place", "Pde": "Parade", "Cl": "Close",
+                             "Wy": "Way", "La": "Lane", "Bvd": "Boulevard", "Tce": "Terrace", "Cct": "Circuit",
+                             "Hwy": "Highway", "Avenue": "Avenue", "Ri": "Rise", "Wk": "Walk", "Mw": "Meander Way",
+                             "Boulevard": "Boulevard", "Sq": "Square", "Parade": "Parade", "Esplanade": "Esplanade",
+                             "N": "North", "Qd": "Quay", "Cir": "Circle", "Vw": "View", "S": "South",
+                             "Crescent": "Crescent", "Prm": "Promenade", "Gdns": "Gardens", "W": "West",
+                             "Strand": "Strand", "Grove": "Grove", "Ridge": "Ridge", "Vs": "Views", "Ch": "Chase",
+                             "Fairway": "Fairway", "Righi": "Right", "E": "East", "Grn": "Green", "Wyn": "Way",
+                             "Gln": "Glen", "Esp": "Esplanade", "Bnd": "Bend", "Mews": "Mews", "Rdg": "Ridge",
+                             "Pky": "Parkway", "Gra": "Grange", "Rt": "Route", "Res": "Reserve", "Wky": "Way",
+                             "East": "East", "Lk": "Lake", "Nk": "Nook", "Gwy": "Gateway", "Mall": "Mall",
+                             "Highway": "Highway", "Ambl": "Ambleside", "Terrace": "Terrace", "Pt": "Point",
+                             "Parkway": "Parkway", "Street": "Street", "Corso": "Corso", "Outlook": "Outlook",
+                             "Media": "Media", "Hub": "Hub", "Crofts": "Crofts", "Victoria": "Victoria",
+                             "Nth": "North", "Athol": "Athol", "Nook": "Nook", "Rise": "Rise",
+                             "Greenway": "Greenway", "Views": "Views", "street": "Street", "Hl": "Hill",
+                             "Glade": "Glade", "Cove": "Cove", "Qy": "Quay", "Lairidge": "Lairidge",
+                             "Scala": "Scala", "Broadway": "Broadway", "Road": "Road", "Prst": "Prestwick",
+                             "Grand": "Grand", "Loop": "Loop", "Eyrie": "Eyrie", "Dell": "Dell", "Gve": "Grove",
+                             "Pkt": "Pocket", "Al": "Alley", "West": "West", "Hts": "Heights", "Aveue": "Avenue",
+                             "Summit": "Summit", "Ave": "Avenue", "Woodland": "Woodland", "Edg": "Edge",
+                             "Skyline": "Skyline", "Out": "Outlook", "Range": "Range", "Hth": "Heath",
+                             "Atrium": "Atrium", "Gables": "Gables", "Mears": "Mears", "App": "Approach",
+                             "Brk": "Brook", "Spur": "Spur", "Court": "Court", "Pass": "Pass", "Gld": "Gold",
+                             "Crse": "Course", "Ps": "Passage", "Entrance": "Entrance", "Heights": "Heights",
+                             "Boulevarde": "Boulevarde", "Circuit": "Circuit", "Parks": "Parks",
+                             "Ridgeway": "Ridgeway", "Panorama": "Panorama", "Briars": "Briars"}
 
 
 def remove_column(df_input: pd.DataFrame, col: str) -> pd.DataFrame:
-    df = df_input.copy()
+    df = copy_frame(df_input)
     df.drop(columns=[col], inplace=True)
     return df
 
@@ -25,35 +56,7 @@ def separate_address(row: pd.Series) -> pd.Series:
 
 
 def get_full_street_type(row: pd.Series) -> str:
-    street_type_abbreviations = {"St": "Street", "Rd": "Road", "Av": "Avenue", "Ct": "Court", "Dr": "Drive",
-                                 "Cr": "Crescent", "Gr": "Grove", "Pl": "Place", "Pde": "Parade", "Cl": "Close",
-                                 "Wy": "Way", "La": "Lane", "Bvd": "Boulevard", "Tce": "Terrace", "Cct": "Circuit",
-                                 "Hwy": "Highway", "Avenue": "Avenue", "Ri": "Rise", "Wk": "Walk", "Mw": "Meander Way",
-                                 "Boulevard": "Boulevard", "Sq": "Square", "Parade": "Parade", "Esplanade": "Esplanade",
-                                 "N": "North", "Qd": "Quay", "Cir": "Circle", "Vw": "View", "S": "South",
-                                 "Crescent": "Crescent", "Prm": "Promenade", "Gdns": "Gardens", "W": "West",
-                                 "Strand": "Strand", "Grove": "Grove", "Ridge": "Ridge", "Vs": "Views", "Ch": "Chase",
-                                 "Fairway": "Fairway", "Righi": "Right", "E": "East", "Grn": "Green", "Wyn": "Way",
-                                 "Gln": "Glen", "Esp": "Esplanade", "Bnd": "Bend", "Mews": "Mews", "Rdg": "Ridge",
-                                 "Pky": "Parkway", "Gra": "Grange", "Rt": "Route", "Res": "Reserve", "Wky": "Way",
-                                 "East": "East", "Lk": "Lake", "Nk": "Nook", "Gwy": "Gateway", "Mall": "Mall",
-                                 "Highway": "Highway", "Ambl": "Ambleside", "Terrace": "Terrace", "Pt": "Point",
-                                 "Parkway": "Parkway", "Street": "Street", "Corso": "Corso", "Outlook": "Outlook",
-                                 "Media": "Media", "Hub": "Hub", "Crofts": "Crofts", "Victoria": "Victoria",
-                                 "Nth": "North", "Athol": "Athol", "Nook": "Nook", "Rise": "Rise",
-                                 "Greenway": "Greenway", "Views": "Views", "street": "Street", "Hl": "Hill",
-                                 "Glade": "Glade", "Cove": "Cove", "Qy": "Quay", "Lairidge": "Lairidge",
-                                 "Scala": "Scala", "Broadway": "Broadway", "Road": "Road", "Prst": "Prestwick",
-                                 "Grand": "Grand", "Loop": "Loop", "Eyrie": "Eyrie", "Dell": "Dell", "Gve": "Grove",
-                                 "Pkt": "Pocket", "Al": "Alley", "West": "West", "Hts": "Heights", "Aveue": "Avenue",
-                                 "Summit": "Summit", "Ave": "Avenue", "Woodland": "Woodland", "Edg": "Edge",
-                                 "Skyline": "Skyline", "Out": "Outlook", "Range": "Range", "Hth": "Heath",
-                                 "Atrium": "Atrium", "Gables": "Gables", "Mears": "Mears", "App": "Approach",
-                                 "Brk": "Brook", "Spur": "Spur", "Court": "Court", "Pass": "Pass", "Gld": "Gold",
-                                 "Crse": "Course", "Ps": "Passage", "Entrance": "Entrance", "Heights": "Heights",
-                                 "Boulevarde": "Boulevarde", "Circuit": "Circuit", "Parks": "Parks",
-                                 "Ridgeway": "Ridgeway", "Panorama": "Panorama", "Briars": "Briars"}
-    return street_type_abbreviations.get(row["StreetType"], "Street")
+    return STREET_TYPE_ABBREVIATIONS.get(row["StreetType"], "Street")
 
 
 def calc_property_age(row: pd.Series) -> np.float64:
@@ -71,15 +74,52 @@ def calc_building_to_land_ratio(row: pd.Series) -> np.float64:
         return np.float64(1.0)
 
 
+def separate_dates(df: pd.DataFrame) -> pd.DataFrame:
+    sale_date = pd.to_datetime(df["SaleDate"]).dt
+    return pd.DataFrame({"SaleYear": sale_date.year, "SaleMonth": sale_date.month, "SaleDay": sale_date.day,
+                         "SaleQuarter": sale_date.quarter, "SaleDayOfWeek": sale_date.dayofweek},
+                        index=df.index).astype("int64")
+
+
+def separate_addresses(df: pd.DataFrame) -> pd.DataFrame:
+    address_parts = df["Address"].str.split("_")
+    return pd.DataFrame({"StreetName": address_parts.str[-2], "StreetType": address_parts.str[-1]}, index=df.index)
+
+
+def get_full_street_types(df: pd.DataFrame) -> pd.Series:
+    return df["StreetType"].map(STREET_TYPE_ABBREVIATIONS).fillna("Street")
+
+
+def calc_property_ages(df: pd.DataFrame) -> pd.Series:
+    return pd.to_datetime(df["SaleDate"]).dt.year - df["YearBuilt"]
+
+
+def calc_avg_room_sizes(df: pd.DataFrame) -> pd.Series:
+    return df["BuildingArea"] / df["Rooms"]
+
+
+def calc_building_to_land_ratios(df: pd.DataFrame) -> pd.Series:
+    land_size = df["LandSize"].astype("float64")
+    ratios = df["BuildingArea"].astype("float64") / land_size.where(land_size != 0)
+    return ratios.mask(land_size == 0, 1.0)
+
+
+def engineer_features(df_input: pd.DataFrame) -> pd.DataFrame:
+    df = copy_frame(df_input)
+    df["SaleDate"] = pd.to_datetime(df["SaleDate"])
+    df[["SaleYear", "SaleMonth", "SaleDay", "SaleQuarter", "SaleDayOfWeek"]] = separate_dates(df)
+    if "Address" in df.columns:
+        df[["StreetName", "StreetType"]] = separate_addresses(df)
+        df["StreetType"] = get_full_street_types(df)
+        df = remove_column(df, "Address")
+    df["PropertyAge"] = calc_property_ages(df)
+    df["AvgRoomSize"] = calc_avg_room_sizes(df)
+    df["BuildingToLandRatio"] = calc_building_to_land_ratios(df)
+    return df
+
+
 if __name__ == "__main__":
-    dataset = pd.read_csv("../data/CLEANED_Melbourne_Housing_Market.csv")
-    dataset["SaleDate"] = pd.to_datetime(dataset["SaleDate"])
-    dataset[["SaleYear", "SaleMonth", "SaleDay", "SaleQuarter", "SaleDayOfWeek"]] = dataset.apply(separate_date, axis=1)
-    dataset[["StreetName", "StreetType"]] = dataset.apply(separate_address, axis=1)
-    dataset["StreetType"] = dataset.apply(get_full_street_type, axis=1)
-    dataset = remove_column(dataset, "Address")
-    dataset["PropertyAge"] = dataset.apply(calc_property_age, axis=1)
-    dataset["AvgRoomSize"] = dataset.apply(calc_avg_room_size, axis=1)
-    dataset["BuildingToLandRatio"] = dataset.apply(calc_building_to_land_ratio, axis=1)
+    dataset = load_dataset("../data/CLEANED_Melbourne_Housing_Market")
+    dataset = engineer_features(dataset)
     dataset = reorder_df_columns(dataset)
-    dataset.to_csv("../data/ENGINEERED_Melbourne_Housing_Market.csv", index=False)
+    save_dataset(dataset, "../data/ENGINEERED_Melbourne_Housing_Market")
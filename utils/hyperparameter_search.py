@@ -0,0 +1,201 @@
+import argparse
+import itertools
+import math
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+import joblib
+import utils.model_development as md
+
+SEARCH_SPACES = {
+    "GradientBoostingRegressor": {
+        "learning_rate": [0.05, 0.1, 0.2, 0.3],
+        "max_depth": [2, 3, 4, 5],
+        "subsample": [0.7, 0.85, 1.0],
+        "min_samples_leaf": [1, 5, 20],
+    },
+    "KNeighborsRegressor": {
+        "n_neighbors": [3, 5, 9, 15, 25, 40],
+        "weights": ["uniform", "distance"],
+        "metric": ["manhattan", "euclidean"],
+    },
+    "RandomForestRegressor": {
+        "max_depth": [None, 8, 16, 32],
+        "min_samples_leaf": [1, 2, 5, 10],
+        "max_features": [1.0, 0.5, "sqrt"],
+    },
+    "DecisionTreeRegressor": {
+        "max_depth": [None, 6, 10, 16],
+        "min_samples_leaf": [1, 5, 20, 50],
+    },
+    "Ridge": {"alpha": [0.01, 0.1, 1.0, 10.0, 100.0]},
+    "ElasticNet": {"alpha": [0.01, 0.1, 1.0], "l1_ratio": [0.1, 0.5, 0.9]},
+}
+BOOSTING_STAGES = {"GradientBoostingRegressor": 300}
+SEARCH_DIRECTORY = "raw/search"
+
+
+def sample_candidates(search_space: dict, n_candidates: int, seed: int = 42) -> list:
+    grid = [dict(zip(search_space, values)) for values in itertools.product(*search_space.values())]
+    random.Random(seed).shuffle(grid)
+    return grid[:n_candidates]
+
+
+def count_rungs(limit: int, eta: int, base: int = 1) -> int:
+    n_rungs = 1
+    while base * eta ** n_rungs <= limit:
+        n_rungs += 1
+    return n_rungs
+
+
+def halving_schedule(n_candidates: int, max_resource: int, min_resource: int, eta: int = 3) -> list:
+    n_rungs = min(count_rungs(n_candidates, eta), count_rungs(max_resource, eta, min_resource))
+    return [int(max_resource / eta ** (n_rungs - 1 - rung)) for rung in range(n_rungs)]
+
+
+def evaluate_candidate(model_name: str, params: dict, paths: dict, columns: list, resource: int,
+                       model=None) -> tuple:
+    arrays = md.load_shared_arrays(paths)
+    n_rows = len(arrays["y_train"]) if model_name in BOOSTING_STAGES else resource
+    X_train = pd.DataFrame(arrays["X_train"][:n_rows], columns=columns, copy=False)
+    X_validation = pd.DataFrame(arrays["X_validation"], columns=columns, copy=False)
+    start = time.perf_counter()
+    if model_name in BOOSTING_STAGES:
+        model = model or md.build_model(model_name, **params, warm_start=True)
+        model.set_params(n_estimators=resource)
+    else:
+        model = md.build_model(model_name, **params)
+    model.fit(X_train, arrays["y_train"][:n_rows])
+    fit_seconds = time.perf_counter() - start
+    scores = md.score_predictions(arrays["y_validation"], model.predict(X_validation))
+    return model if model_name in BOOSTING_STAGES else None, scores, fit_seconds
+
+
+def fit_model(model_name: str, params: dict, X_train: pd.DataFrame, y_train: np.array):
+    return md.build_model(model_name, **params).fit(X_train, y_train)
+
+
+def map_with_deadline(function, arguments: list, deadline: float, workers: int = None) -> dict:
+    pool = multiprocessing.Pool(workers)
+    try:
+        pending = [pool.apply_async(function, args) for args in arguments]
+        results = {}
+        for index, result in enumerate(pending):
+            result.wait(max(0.0, deadline - time.perf_counter()))
+            if result.ready():
+                results[index] = result.get()
+        return results
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def successive_halving(model_name: str, X_train: pd.DataFrame, y_train: np.array, search_space: dict = None,
+                       n_candidates: int = 27, eta: int = 3, budget_seconds: float = 600.0, metric: str = "rmse",
+                       validation_size: float = 0.2, workers: int = None, seed: int = 42) -> tuple:
+    deadline = time.perf_counter() + budget_seconds
+    candidates = sample_candidates(search_space or SEARCH_SPACES[model_name], n_candidates, seed)
+    order = np.random.default_rng(seed).permutation(len(X_train))
+    n_validation = int(len(order) * validation_size)
+    validation, train = order[:n_validation], order[n_validation:]
+    if model_name in BOOSTING_STAGES:
+        schedule = halving_schedule(len(candidates), BOOSTING_STAGES[model_name], 10, eta)
+    else:
+        schedule = halving_schedule(len(candidates), len(train), min(len(train), 500), eta)
+    history = pd.DataFrame(columns=["candidate", "rung", "resource", metric, "fit_seconds", "params"])
+    survivors = {index: None for index in range(len(candidates))}
+    with tempfile.TemporaryDirectory() as directory:
+        X = X_train.to_numpy()
+        paths = md.share_arrays({"X_train": X[train], "y_train": y_train[train], "X_validation": X[validation],
+                                 "y_validation": y_train[validation]}, directory)
+        for rung, resource in enumerate(schedule):
+            indices = list(survivors)
+            results = map_with_deadline(evaluate_candidate, [(model_name, candidates[index], paths,
+                                                              list(X_train.columns), resource, survivors[index])
+                                                             for index in indices], deadline, workers)
+            scores = {}
+            for position, (model, result, fit_seconds) in results.items():
+                index = indices[position]
+                survivors[index] = model
+                scores[index] = result[metric]
+                history.loc[len(history)] = [index, rung, resource, result[metric], fit_seconds, candidates[index]]
+            if len(results) < len(indices) or not scores:
+                break
+            ranked = sorted(scores, key=scores.get, reverse=metric in md.HIGHER_IS_BETTER)
+            survivors = {index: survivors[index] for index in ranked[:max(1, math.ceil(len(ranked) / eta))]}
+    if history.empty:
+        raise TimeoutError(f"No {model_name} candidate finished within {budget_seconds}s")
+    last_rung = history[history["rung"] == history["rung"].max()]
+    best = last_rung.sort_values(metric, ascending=metric not in md.HIGHER_IS_BETTER).iloc[0]
+    best_params = dict(candidates[int(best["candidate"])])
+    if model_name in BOOSTING_STAGES:
+        best_params["n_estimators"] = int(best["resource"])
+    return best_params, history
+
+
+def is_better(score: float, reference: float, metric: str) -> bool:
+    return score > reference if metric in md.HIGHER_IS_BETTER else score < reference
+
+
+def publish_model(model, model_name: str, X_test: pd.DataFrame, y_test: np.array, metric: str = "rmse",
+                  prefix: str = "../") -> tuple:
+    os.makedirs(prefix + SEARCH_DIRECTORY, exist_ok=True)
+    candidate_path = f"{prefix}{SEARCH_DIRECTORY}/{model_name}.pkl"
+    production_path = f"{prefix}raw/{model_name}.pkl"
+    joblib.dump(model, candidate_path)
+    scores = pd.DataFrame({"search": md.score_predictions(y_test, model.predict(X_test))})
+    if os.path.exists(production_path):
+        scores["current"] = md.score_predictions(y_test, joblib.load(production_path).predict(X_test))
+    published = "current" not in scores or is_better(scores.at[metric, "search"], scores.at[metric, "current"],
+                                                      metric)
+    if published:
+        shutil.copyfile(candidate_path, f"{production_path}.tmp")
+        os.replace(f"{production_path}.tmp", production_path)
+    return scores, published
+
+
+def search_model(model_name: str, X_train: pd.DataFrame, X_test: pd.DataFrame, y_train: np.array, y_test: np.array,
+                 prefix: str = "../", budget_seconds: float = 600.0, refit_share: float = 0.2, metric: str = "rmse",
+                 workers: int = None, **search_options) -> tuple:
+    deadline = time.perf_counter() + budget_seconds
+    best_params, history = successive_halving(model_name, X_train, y_train, budget_seconds=budget_seconds * (
+        1 - refit_share), metric=metric, workers=workers, **search_options)
+    os.makedirs(f"{prefix}data/search", exist_ok=True)
+    history.to_csv(f"{prefix}data/search/{model_name}.csv", index=False)
+    refit = map_with_deadline(fit_model, [(model_name, best_params, X_train, y_train)], deadline, 1)
+    if not refit:
+        raise TimeoutError(f"Refitting the best {model_name} did not finish within the {budget_seconds}s budget")
+    scores, published = publish_model(refit[0], model_name, X_test, y_test, metric, prefix)
+    return best_params, scores, history, published
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tune estimators with successive halving under a time budget.")
+    parser.add_argument("--prefix", default="../", help="path prefix of the data/ and raw/ directories")
+    parser.add_argument("--models", nargs="+", choices=list(SEARCH_SPACES),
+                        default=["GradientBoostingRegressor", "KNeighborsRegressor"])
+    parser.add_argument("--candidates", type=int, default=27, help="candidates sampled per model")
+    parser.add_argument("--eta", type=int, default=3, help="fraction of candidates kept per rung is 1/eta")
+    parser.add_argument("--budget-seconds", type=float, default=600.0,
+                        help="wall-clock budget per model, including the final refit")
+    parser.add_argument("--refit-share", type=float, default=0.2,
+                        help="share of the budget kept for refitting the best candidate on the full training split")
+    parser.add_argument("--metric", default="rmse", choices=md.EVALUATION_METRICS)
+    parser.add_argument("--workers", type=int, help="candidates evaluated at once")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    X_train, X_test, y_train, y_test = md.load_split_datasets(args.prefix)
+    for model_name in args.models:
+        start = time.perf_counter()
+        best_params, scores, history, published = search_model(
+            model_name, X_train, X_test, y_train, y_test, args.prefix, args.budget_seconds, args.refit_share,
+            args.metric, args.workers, n_candidates=args.candidates, eta=args.eta, seed=args.seed)
+        print(f"{model_name}: {len(history)} fits in {time.perf_counter() - start:.1f}s, best {best_params}")
+        print(scores.to_string())
+        print(f"Published to {args.prefix}raw/{model_name}.pkl" if published else
+              f"Kept the current model; the search result is in {args.prefix}{SEARCH_DIRECTORY}/{model_name}.pkl")
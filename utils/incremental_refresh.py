@@ -0,0 +1,193 @@
+import argparse
+import copy
+import json
+import os
+import shutil
+import time
+import numpy as np
+import pandas as pd
+import joblib
+from sklearn.base import clone
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+import utils.data_cleaning as dc
+import utils.feature_engineering as fe
+import utils.exploratory_data_analysis as eda
+import utils.data_preprocessing as dp
+import utils.model_development as md
+from utils.model_interface import CURRENT_VERSION_PATH, MODEL_PATH, PREPROCESSOR_PATH
+from utils.model_interface import get_artifact_paths, get_column_transformer
+from utils.storage import find_dataset, load_dataset, save_dataset
+
+INCREMENTS_DIRECTORY = "data/increments"
+VERSIONS_DIRECTORY = "raw/versions"
+SPLIT_DATASETS = ["X_train", "X_test", "y_train", "y_test"]
+REFRESH_MODES = ["warm_start", "window"]
+HOLDOUT_ROWS = 5_000
+
+
+def prepare_increment(df_input: pd.DataFrame) -> pd.DataFrame:
+    df = dc.clean_dataset(df_input)
+    df = dc.reorder_df_columns(fe.engineer_features(df))
+    return eda.analyse_dataset(df)
+
+
+def save_increment(df: pd.DataFrame, prefix: str = "../") -> str:
+    os.makedirs(prefix + INCREMENTS_DIRECTORY, exist_ok=True)
+    n_increments = len({os.path.splitext(name)[0] for name in os.listdir(prefix + INCREMENTS_DIRECTORY)})
+    return save_dataset(df, f"{prefix}{INCREMENTS_DIRECTORY}/ANALYSED_{n_increments:04d}")
+
+
+def load_history(prefix: str = "../") -> pd.DataFrame:
+    frames = [load_dataset(f"{prefix}data/ANALYSED_Melbourne_Housing_Market")]
+    if os.path.isdir(prefix + INCREMENTS_DIRECTORY):
+        for name in sorted({os.path.splitext(name)[0] for name in os.listdir(prefix + INCREMENTS_DIRECTORY)}):
+            frames.append(load_dataset(f"{prefix}{INCREMENTS_DIRECTORY}/{name}"))
+    return pd.concat(frames, ignore_index=True)
+
+
+def update_preprocessor(preprocessor, X: pd.DataFrame) -> dict:
+    if isinstance(preprocessor, Pipeline):
+        top_n_encoder = preprocessor.named_steps["top_n"]
+        top_n_encoder.partial_fit(X)
+        X = top_n_encoder.transform(X)
+    column_transformer = get_column_transformer(preprocessor)
+    feature_names = list(column_transformer.get_feature_names_out())
+    scalings = {}
+    for name, transformer, columns in column_transformer.transformers_:
+        if name == "scaler" and len(columns):
+            old_mean, old_scale = transformer.mean_.copy(), transformer.scale_.copy()
+            transformer.partial_fit(X[columns])
+            for index, column in enumerate(columns):
+                scalings[feature_names.index(f"{name}__{column}")] = (old_mean[index], old_scale[index],
+                                                                      transformer.mean_[index],
+                                                                      transformer.scale_[index])
+        elif name == "high_card_encoder" and len(columns):
+            for index, column in enumerate(columns):
+                known = set(transformer.categories_[index])
+                values = X[column].cat.categories if isinstance(X[column].dtype, pd.CategoricalDtype) else X[
+                    column].dropna().unique()
+                transformer.categories_[index] = np.append(transformer.categories_[index],
+                                                           [category for category in values if category not in known])
+    return scalings
+
+
+def rescale_thresholds(model, scalings: dict) -> None:
+    for estimator in np.ravel(model.estimators_):
+        tree = estimator.tree_
+        for index, (old_mean, old_scale, new_mean, new_scale) in scalings.items():
+            nodes = tree.feature == index
+            tree.threshold[nodes] = (tree.threshold[nodes] * old_scale + old_mean - new_mean) / new_scale
+
+
+def transform_features(preprocessor, X: pd.DataFrame) -> pd.DataFrame:
+    return pd.DataFrame(preprocessor.transform(X), columns=preprocessor.get_feature_names_out(), index=X.index)
+
+
+def rescale_features(X: pd.DataFrame, scalings: dict) -> pd.DataFrame:
+    X = X.copy()
+    for index, (old_mean, old_scale, new_mean, new_scale) in scalings.items():
+        X.isetitem(index, (X.iloc[:, index] * old_scale + old_mean - new_mean) / new_scale)
+    return X
+
+
+def append_split(split: tuple, scalings: dict, preprocessor, X_train_new: pd.DataFrame, X_test_new: pd.DataFrame,
+                 y_train_new: np.ndarray, y_test_new: np.ndarray) -> tuple:
+    X_train, X_test, y_train, y_test = split
+    return (pd.concat([rescale_features(X_train, scalings), transform_features(preprocessor, X_train_new)],
+                      ignore_index=True),
+            pd.concat([rescale_features(X_test, scalings), transform_features(preprocessor, X_test_new)],
+                      ignore_index=True),
+            np.concatenate([y_train, y_train_new]), np.concatenate([y_test, y_test_new]))
+
+
+def replace_file(source: str, destination: str) -> None:
+    shutil.copy2(source, destination + ".tmp")
+    os.replace(destination + ".tmp", destination)
+
+
+def publish_version(preprocessor, model, split: tuple, report: dict, prefix: str = "../") -> str:
+    os.makedirs(prefix + VERSIONS_DIRECTORY, exist_ok=True)
+    version = f"v{len(os.listdir(prefix + VERSIONS_DIRECTORY)) + 1:04d}"
+    directory = f"{VERSIONS_DIRECTORY}/{version}"
+    os.makedirs(prefix + directory)
+    artifact_paths = [f"{directory}/{os.path.basename(path)}" for path in [PREPROCESSOR_PATH, MODEL_PATH]]
+    for artifact, path in zip([preprocessor, model], artifact_paths):
+        joblib.dump(artifact, prefix + path)
+    with open(f"{prefix}{directory}/report.json", "w") as file:
+        json.dump({**report, "version": version}, file, indent=4, default=str)
+    X_train, X_test, y_train, y_test = split
+    dp.save_split_datasets(X_train, X_test, pd.DataFrame(y_train), pd.DataFrame(y_test), f"{prefix}{directory}/")
+    with open(f"{prefix}{CURRENT_VERSION_PATH}.tmp", "w") as file:
+        json.dump({"version": version, "artifacts": artifact_paths}, file, indent=4)
+    os.replace(f"{prefix}{CURRENT_VERSION_PATH}.tmp", prefix + CURRENT_VERSION_PATH)
+    for name in SPLIT_DATASETS:
+        split_path, _ = find_dataset(f"{prefix}{directory}/data/split_data/{name}")
+        os.replace(split_path, f"{prefix}data/split_data/{os.path.basename(split_path)}")
+    shutil.rmtree(f"{prefix}{directory}/data")
+    for path, served_path in zip(artifact_paths, [PREPROCESSOR_PATH, MODEL_PATH]):
+        replace_file(prefix + path, prefix + served_path)
+    return version
+
+
+def refresh_model(new_sales: pd.DataFrame, prefix: str = "../", mode: str = "warm_start", extra_stages: int = 50,
+                  window: int = 50_000, holdout_size: float = 0.2, holdout_rows: int = HOLDOUT_ROWS,
+                  tolerance: float = 0.0, random_state: int = 42) -> dict:
+    if mode not in REFRESH_MODES:
+        raise ValueError(f"Unknown refresh mode {mode}; expected one of {', '.join(REFRESH_MODES)}")
+    start = time.perf_counter()
+    increment = prepare_increment(new_sales)
+    X_new, y_new = increment.drop(columns=["Price"]), increment["Price"].to_numpy()
+    X_new_train, X_new_holdout, y_new_train, y_new_holdout = train_test_split(X_new, y_new, test_size=holdout_size,
+                                                                              random_state=random_state)
+    preprocessor, model = map(joblib.load, get_artifact_paths(prefix))
+    candidate_preprocessor = copy.deepcopy(preprocessor)
+    scalings = update_preprocessor(candidate_preprocessor, X_new_train)
+    if mode == "warm_start":
+        candidate = copy.deepcopy(model)
+        rescale_thresholds(candidate, scalings)
+        candidate.set_params(warm_start=True, n_estimators=candidate.n_estimators_ + extra_stages)
+        candidate.fit(transform_features(candidate_preprocessor, X_new_train), y_new_train)
+    else:
+        history = load_history(prefix).sort_values("SaleDate", kind="stable").tail(max(window - len(y_new_train), 0))
+        X_window = pd.concat([history.drop(columns=["Price"]), X_new_train], ignore_index=True)
+        candidate = clone(model).set_params(warm_start=False)
+        candidate.fit(transform_features(candidate_preprocessor, X_window),
+                      np.concatenate([history["Price"].to_numpy(), y_new_train]))
+    split = md.load_split_datasets(prefix)
+    X_holdout, y_holdout = split[1].tail(holdout_rows), np.concatenate([split[3][-holdout_rows:], y_new_holdout])
+    current_predictions = model.predict(pd.concat([X_holdout, transform_features(preprocessor, X_new_holdout)],
+                                                  ignore_index=True))
+    candidate_predictions = candidate.predict(pd.concat(
+        [rescale_features(X_holdout, scalings), transform_features(candidate_preprocessor, X_new_holdout)],
+        ignore_index=True))
+    current_scores = md.score_predictions(y_holdout, current_predictions)
+    candidate_scores = md.score_predictions(y_holdout, candidate_predictions)
+    report = {"mode": mode, "new_rows": len(new_sales), "increment_rows": len(increment),
+              "holdout_rows": len(y_holdout), "n_estimators": int(candidate.n_estimators_),
+              "current": current_scores, "candidate": candidate_scores,
+              "published": bool(candidate_scores["rmse"] <= current_scores["rmse"] * (1 + tolerance))}
+    if report["published"]:
+        split = append_split(split, scalings, candidate_preprocessor, X_new_train, X_new_holdout, y_new_train,
+                             y_new_holdout)
+        report["version"] = publish_version(candidate_preprocessor, candidate, split, report, prefix)
+        report["increment"] = save_increment(increment, prefix)
+    report["seconds"] = time.perf_counter() - start
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fold new raw sales into the served model without full retraining.")
+    parser.add_argument("new_sales", help="CSV of new raw sales with the Melbourne_Housing_Market.csv columns")
+    parser.add_argument("--prefix", default="../", help="path prefix of the data/ and raw/ directories")
+    parser.add_argument("--mode", choices=REFRESH_MODES, default="warm_start",
+                        help="add boosting stages fitted on the new rows, or refit on the most recent sales")
+    parser.add_argument("--extra-stages", type=int, default=50, help="boosting stages added in warm_start mode")
+    parser.add_argument("--window", type=int, default=50_000, help="most recent sales refitted in window mode")
+    parser.add_argument("--holdout-rows", type=int, default=HOLDOUT_ROWS,
+                        help="most recent stored test rows that both models are scored on, besides the new holdout")
+    parser.add_argument("--tolerance", type=float, default=0.0, help="relative holdout rmse increase still published")
+    args = parser.parse_args()
+    refresh = refresh_model(pd.read_csv(args.new_sales), args.prefix, args.mode, args.extra_stages, args.window,
+                            holdout_rows=args.holdout_rows, tolerance=args.tolerance)
+    print(json.dumps(refresh, indent=4, default=str))
@@ -0,0 +1,90 @@
+import os
+import resource
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+from utils.storage import encode_categoricals, find_dataset, iter_dataset, pa
+
+STAGE_MEMORY_OVERHEAD = 4.0
+
+
+def enable_compact_mode() -> None:
+    pd.set_option("mode.copy_on_write", True)
+
+
+def copy_frame(df_input: pd.DataFrame) -> pd.DataFrame:
+    return df_input.copy(deep=not pd.get_option("mode.copy_on_write"))
+
+
+def downcast_numeric(df_input: pd.DataFrame) -> pd.DataFrame:
+    df = copy_frame(df_input)
+    for column in df.select_dtypes(include="number").columns:
+        values = df[column]
+        if pd.api.types.is_bool_dtype(values) or values.hasnans:
+            continue
+        if pd.api.types.is_float_dtype(values) and not np.array_equal(values, np.trunc(values)):
+            continue
+        df[column] = pd.to_numeric(values.astype("int64"), downcast="integer")
+    return df
+
+
+def compact_dataset(df_input: pd.DataFrame) -> pd.DataFrame:
+    return encode_categoricals(downcast_numeric(df_input))
+
+
+def concat_frames(frames) -> pd.DataFrame:
+    frames = list(frames)
+    categorical_columns = [column for column in frames[0].columns
+                           if any(isinstance(frame[column].dtype, pd.CategoricalDtype) for frame in frames)]
+    df = pd.concat([frame.drop(columns=categorical_columns) for frame in frames], ignore_index=True)
+    for column in categorical_columns:
+        parts = [frame[column] if isinstance(frame[column].dtype, pd.CategoricalDtype)
+                 else frame[column].astype(object).astype("category") for frame in frames]
+        df[column] = union_categoricals(parts, sort_categories=True, ignore_order=True)
+    return df[frames[0].columns]
+
+
+def estimate_dataset_memory(path: str, sample_rows: int = 1_000) -> tuple:
+    file_path, fmt = find_dataset(path)
+    sample = next(iter_dataset(path, sample_rows))
+    bytes_per_row = sample.memory_usage(deep=True).sum() / max(len(sample), 1)
+    if fmt == "csv":
+        with open(file_path, "rb") as file:
+            file.readline()
+            sample_bytes = sum(len(file.readline()) for _ in range(len(sample)))
+        n_rows = os.path.getsize(file_path) / max(sample_bytes / max(len(sample), 1), 1)
+    elif fmt == "feather":
+        n_rows = pa.ipc.open_file(pa.memory_map(file_path)).read_all().num_rows
+    else:
+        n_rows = pa.parquet.ParquetFile(file_path).metadata.num_rows
+    return bytes_per_row, n_rows
+
+
+def plan_chunk_size(path: str, memory_budget_mb: float = None, overhead: float = STAGE_MEMORY_OVERHEAD) -> int:
+    if memory_budget_mb is None:
+        return None
+    bytes_per_row, n_rows = estimate_dataset_memory(path)
+    budget = memory_budget_mb * 2 ** 20
+    if bytes_per_row * n_rows * overhead <= budget:
+        return None
+    return max(1_000, int(budget / (bytes_per_row * overhead)))
+
+
+def reset_peak_rss() -> bool:
+    try:
+        with open("/proc/self/clear_refs", "w") as file:
+            file.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def get_peak_rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as file:
+            for line in file:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
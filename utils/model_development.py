@@ -1,6 +1,17 @@
+import argparse
+import concurrent.futures
+import hashlib
+import json
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
 import pandas as pd
 import numpy as np
+from scipy import stats
 from sklearn.base import BaseEstimator
+from sklearn.model_selection import KFold
 from sklearn.metrics import mean_absolute_error, mean_squared_error, root_mean_squared_error
 from sklearn.metrics import r2_score, mean_absolute_percentage_error
 import joblib
@@ -9,47 +20,224 @@ from sklearn.svm import SVR
 from sklearn.tree import DecisionTreeRegressor
 from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
 from sklearn.neighbors import KNeighborsRegressor
+import utils.data_preprocessing as dp
+import utils.encoders as encoders
+from utils.prediction_cache import hash_artifacts
+from utils.storage import find_dataset, load_dataset
 
+EVALUATION_METRICS = ["mae", "mse", "rmse", "r2", "mape"]
+HIGHER_IS_BETTER = {"r2"}
+CV_FOLDS_DIRECTORY = "data/cv_folds"
 
-def load_split_datasets() -> tuple:
-    X_train = pd.read_csv("../data/split_data/X_train.csv")
-    X_test = pd.read_csv("../data/split_data/X_test.csv")
-    y_train = pd.read_csv("../data/split_data/y_train.csv", header=None).to_numpy().ravel()
-    y_test = pd.read_csv("../data/split_data/y_test.csv", header=None).to_numpy().ravel()
+MODEL_ROSTER = {
+    "LinearRegression": (LinearRegression, {"n_jobs": -1}),
+    "Ridge": (Ridge, {"random_state": 42}),
+    "ElasticNet": (ElasticNet, {"alpha": 0.1}),
+    "SVR": (SVR, {"kernel": "linear"}),
+    "DecisionTreeRegressor": (DecisionTreeRegressor, {}),
+    "RandomForestRegressor": (RandomForestRegressor, {"random_state": 42, "n_jobs": -1}),
+    "GradientBoostingRegressor": (GradientBoostingRegressor, {"learning_rate": 0.2, "random_state": 42}),
+    "KNeighborsRegressor": (KNeighborsRegressor, {"n_neighbors": 9, "weights": "distance", "metric": "manhattan",
+                                                  "n_jobs": -1}),
+    "BayesianRidge": (BayesianRidge, {}),
+    "ARDRegression": (ARDRegression, {}),
+}
+
+
+def build_model(model_name: str, **params) -> BaseEstimator:
+    model_class, default_params = MODEL_ROSTER[model_name]
+    return model_class(**{**default_params, **params})
+
+
+def load_split_datasets(prefix: str = "../") -> tuple:
+    X_train = load_dataset(f"{prefix}data/split_data/X_train")
+    X_test = load_dataset(f"{prefix}data/split_data/X_test")
+    y_train = load_dataset(f"{prefix}data/split_data/y_train", header=None).to_numpy().ravel()
+    y_test = load_dataset(f"{prefix}data/split_data/y_test", header=None).to_numpy().ravel()
     return X_train, X_test, y_train, y_test
 
 
+def score_predictions(y_test: np.array, y_pred: np.array) -> dict:
+    return {
+        "mae": mean_absolute_error(y_test, y_pred),
+        "mse": mean_squared_error(y_test, y_pred),
+        "rmse": root_mean_squared_error(y_test, y_pred),
+        "r2": r2_score(y_test, y_pred),
+        "mape": mean_absolute_percentage_error(y_test, y_pred),
+    }
+
+
 def train_model(X_train: pd.DataFrame, X_test: pd.DataFrame, y_train: np.array, y_test: np.array, model: BaseEstimator,
-                evaluation: pd.DataFrame = None, save: bool = False) -> pd.DataFrame:
+                evaluation: pd.DataFrame = None, save: bool = False, prefix: str = "../") -> pd.DataFrame:
     model.fit(X_train, y_train)
     y_pred = model.predict(X_test)
     model_name = model.__class__.__name__
     if evaluation is not None:
-        evaluation.at[model_name, "mae"] = mean_absolute_error(y_test, y_pred)
-        evaluation.at[model_name, "mse"] = mean_squared_error(y_test, y_pred)
-        evaluation.at[model_name, "rmse"] = root_mean_squared_error(y_test, y_pred)
-        evaluation.at[model_name, "r2"] = r2_score(y_test, y_pred)
-        evaluation.at[model_name, "mape"] = mean_absolute_percentage_error(y_test, y_pred)
+        for metric, value in score_predictions(y_test, y_pred).items():
+            evaluation.at[model_name, metric] = value
     if save:
-        joblib.dump(model, f"../raw/{model_name}.pkl")
+        joblib.dump(model, f"{prefix}raw/{model_name}.pkl")
     return evaluation
 
 
-if __name__ == "__main__":
-    X_train, X_test, y_train, y_test = load_split_datasets()
-    evaluation = pd.DataFrame(columns=["mae", "mse", "rmse", "r2", "mape"])
+def share_arrays(arrays: dict, directory: str) -> dict:
+    paths = {}
+    for name, array in arrays.items():
+        paths[name] = os.path.join(directory, f"{name}.npy")
+        np.save(paths[name], np.ascontiguousarray(array, dtype="float64"))
+    return paths
+
+
+def load_shared_arrays(paths: dict) -> dict:
+    return {name: np.load(path, mmap_mode="r") for name, path in paths.items()}
+
+
+def measure_latency(model: BaseEstimator, X: pd.DataFrame, n_rows: int = 100) -> float:
+    latencies = []
+    for index in range(min(n_rows, len(X))):
+        start = time.perf_counter()
+        model.predict(X.iloc[index:index + 1])
+        latencies.append(time.perf_counter() - start)
+    return float(np.median(latencies))
+
+
+def benchmark_model(model_name: str, paths: dict, columns: list, prefix: str = "../", latency_rows: int = 100,
+                    **params) -> dict:
+    arrays = load_shared_arrays(paths)
+    X_train = pd.DataFrame(arrays["X_train"], columns=columns, copy=False)
+    X_test = pd.DataFrame(arrays["X_test"], columns=columns, copy=False)
+    model = build_model(model_name, **params)
+    start = time.perf_counter()
+    model.fit(X_train, arrays["y_train"])
+    fit_seconds = time.perf_counter() - start
+    result = score_predictions(arrays["y_test"], model.predict(X_test))
+    artifact_path = f"{prefix}raw/{model_name}.pkl"
+    joblib.dump(model, artifact_path)
+    result["fit_seconds"] = fit_seconds
+    result["latency_ms"] = measure_latency(model, X_test, latency_rows) * 1000
+    result["peak_memory_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    result["artifact_mb"] = os.path.getsize(artifact_path) / 2 ** 20
+    return result
+
+
+def train_models(X_train: pd.DataFrame, X_test: pd.DataFrame, y_train: np.array, y_test: np.array,
+                 model_names: list = None, workers: int = None, prefix: str = "../",
+                 params: dict = None) -> pd.DataFrame:
+    model_names = model_names or list(MODEL_ROSTER)
+    params = params or {}
+    evaluation = pd.DataFrame(columns=EVALUATION_METRICS + ["fit_seconds", "latency_ms", "peak_memory_mb",
+                                                            "artifact_mb"], dtype="float64")
     evaluation.index.name = "Model"
-    train_model(X_train, X_test, y_train, y_test, LinearRegression(n_jobs=-1), evaluation=evaluation, save=True)
-    train_model(X_train, X_test, y_train, y_test, Ridge(random_state=42), evaluation=evaluation, save=True)
-    train_model(X_train, X_test, y_train, y_test, ElasticNet(alpha=0.1), evaluation=evaluation, save=True)
-    train_model(X_train, X_test, y_train, y_test, SVR(kernel="linear"), evaluation=evaluation, save=True)
-    train_model(X_train, X_test, y_train, y_test, DecisionTreeRegressor(), evaluation=evaluation, save=True)
-    train_model(X_train, X_test, y_train, y_test, RandomForestRegressor(random_state=42, n_jobs=-1),
-                evaluation=evaluation, save=True)
-    train_model(X_train, X_test, y_train, y_test, GradientBoostingRegressor(learning_rate=0.2, random_state=42),
-                evaluation=evaluation, save=True)
-    train_model(X_train, X_test, y_train, y_test,
-                KNeighborsRegressor(n_neighbors=9, weights="distance", metric="manhattan", n_jobs=-1),
-                evaluation=evaluation, save=True)
-    train_model(X_train, X_test, y_train, y_test, BayesianRidge(), evaluation=evaluation, save=True)
-    train_model(X_train, X_test, y_train, y_test, ARDRegression(), evaluation=evaluation, save=True)
+    with tempfile.TemporaryDirectory() as directory:
+        paths = share_arrays({"X_train": X_train, "X_test": X_test, "y_train": y_train, "y_test": y_test}, directory)
+        with concurrent.futures.ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"),
+                                                    max_tasks_per_child=1) as executor:
+            futures = {executor.submit(benchmark_model, model_name, paths, list(X_train.columns), prefix,
+                                       **params.get(model_name, {})): model_name for model_name in model_names}
+            for future in concurrent.futures.as_completed(futures):
+                evaluation.loc[futures[future]] = future.result()
+    return evaluation.loc[model_names]
+
+
+def get_folds_fingerprint(dataset_path: str, n_splits: int, random_state: int, top_n: dict = None) -> str:
+    digest = hashlib.sha256(hash_artifacts(find_dataset(dataset_path)[0], __file__, dp.__file__,
+                                                   encoders.__file__).encode())
+    digest.update(json.dumps({"n_splits": n_splits, "random_state": random_state, "top_n": top_n},
+                             sort_keys=True).encode())
+    return digest.hexdigest()[:16]
+
+
+def prepare_cv_folds(n_splits: int = 5, random_state: int = 42, prefix: str = "../", top_n: dict = None) -> tuple:
+    dataset_path = f"{prefix}data/ANALYSED_Melbourne_Housing_Market"
+    directory = os.path.join(f"{prefix}{CV_FOLDS_DIRECTORY}",
+                             get_folds_fingerprint(dataset_path, n_splits, random_state, top_n))
+    names = ["X_train", "X_validation", "y_train", "y_validation"]
+    folds = [{name: os.path.join(directory, f"fold_{fold}_{name}.npy") for name in names} for fold in range(n_splits)]
+    columns_path = os.path.join(directory, "columns.json")
+    if os.path.exists(columns_path) and all(os.path.exists(path) for paths in folds for path in paths.values()):
+        with open(columns_path) as file:
+            return folds, json.load(file)
+    os.makedirs(directory, exist_ok=True)
+    df = load_dataset(dataset_path)
+    X, y = df.drop(columns=["Price"]), df["Price"].to_numpy()
+    splitter = KFold(n_splits, shuffle=True, random_state=random_state)
+    columns = []
+    for fold, (train_index, validation_index) in enumerate(splitter.split(X)):
+        preprocessor = dp.build_preprocessor(X.iloc[train_index], top_n)
+        X_train = preprocessor.fit_transform(X.iloc[train_index])
+        share_arrays({f"fold_{fold}_X_train": X_train,
+                      f"fold_{fold}_X_validation": preprocessor.transform(X.iloc[validation_index]),
+                      f"fold_{fold}_y_train": y[train_index], f"fold_{fold}_y_validation": y[validation_index]},
+                     directory)
+        columns.append(list(preprocessor.get_feature_names_out()))
+    with open(columns_path, "w") as file:
+        json.dump(columns, file)
+    return folds, columns
+
+
+def cross_validate_fold(model_name: str, paths: dict, columns: list, **params) -> dict:
+    arrays = load_shared_arrays(paths)
+    X_train = pd.DataFrame(arrays["X_train"], columns=columns, copy=False)
+    X_validation = pd.DataFrame(arrays["X_validation"], columns=columns, copy=False)
+    model = build_model(model_name, **params)
+    start = time.perf_counter()
+    model.fit(X_train, arrays["y_train"])
+    fit_seconds = time.perf_counter() - start
+    result = score_predictions(arrays["y_validation"], model.predict(X_validation))
+    result["fit_seconds"] = fit_seconds
+    return result
+
+
+def cross_validate_models(model_names: list = None, n_splits: int = 5, workers: int = None, prefix: str = "../",
+                          params: dict = None, random_state: int = 42, top_n: dict = None) -> pd.DataFrame:
+    model_names = model_names or list(MODEL_ROSTER)
+    params = params or {}
+    folds, columns = prepare_cv_folds(n_splits, random_state, prefix, top_n)
+    results = pd.DataFrame(columns=EVALUATION_METRICS + ["fit_seconds"], dtype="float64",
+                           index=pd.MultiIndex.from_product([model_names, range(n_splits)], names=["Model", "Fold"]))
+    with concurrent.futures.ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        futures = {executor.submit(cross_validate_fold, model_name, paths, columns[fold],
+                                   **params.get(model_name, {})): (model_name, fold)
+                   for model_name in model_names for fold, paths in enumerate(folds)}
+        for future in concurrent.futures.as_completed(futures):
+            results.loc[futures[future]] = future.result()
+    return results
+
+
+def summarize_cross_validation(results: pd.DataFrame, confidence: float = 0.95) -> pd.DataFrame:
+    grouped = results.groupby(level="Model", sort=False)
+    mean, sem, n_folds = grouped.mean(), grouped.sem(), grouped.size()
+    half_width = sem.mul(stats.t.ppf((1 + confidence) / 2, n_folds - 1), axis=0)
+    summary = pd.concat({"mean": mean, "ci_low": mean - half_width, "ci_high": mean + half_width}, axis=1)
+    summary = summary.swaplevel(axis=1)[[(metric, statistic) for metric in mean.columns
+                                         for statistic in ["mean", "ci_low", "ci_high"]]]
+    summary.columns = [f"{metric}_{statistic}" if statistic != "mean" else metric for metric, statistic in
+                       summary.columns]
+    return summary
+
+
+def rank_models(evaluation: pd.DataFrame, metric: str = "rmse", latency_budget_ms: float = None) -> pd.DataFrame:
+    leaderboard = evaluation
+    if latency_budget_ms is not None:
+        leaderboard = leaderboard[leaderboard["latency_ms"] <= latency_budget_ms]
+    return leaderboard.sort_values(metric, ascending=metric not in HIGHER_IS_BETTER)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the model roster in parallel and print a leaderboard.")
+    parser.add_argument("--prefix", default="../", help="path prefix of the data/ and raw/ directories")
+    parser.add_argument("--models", nargs="+", choices=list(MODEL_ROSTER), help="subset of the roster to train")
+    parser.add_argument("--workers", type=int, help="models fitted at once; fit times are only comparable with 1")
+    parser.add_argument("--metric", default="rmse", choices=EVALUATION_METRICS)
+    parser.add_argument("--latency-budget-ms", type=float, help="drop models slower than this per single-row predict")
+    parser.add_argument("--cv", type=int, metavar="FOLDS", help="rank by k-fold cross-validation instead of the split")
+    args = parser.parse_args()
+    if args.cv:
+        evaluation = summarize_cross_validation(cross_validate_models(args.models, args.cv, args.workers, args.prefix))
+        evaluation.to_csv(f"{args.prefix}data/model_cv_evaluation.csv")
+        print(evaluation.sort_values(args.metric, ascending=args.metric not in HIGHER_IS_BETTER).to_string())
+    else:
+        X_train, X_test, y_train, y_test = load_split_datasets(args.prefix)
+        evaluation = train_models(X_train, X_test, y_train, y_test, args.models, args.workers, args.prefix)
+        evaluation.to_csv(f"{args.prefix}data/model_evaluation.csv")
+        print(rank_models(evaluation, args.metric, args.latency_budget_ms).to_string())
@@ -1,42 +1,217 @@
+import argparse
+import json
+import os
+import time
+import numpy as np
 import pandas as pd
 import utils.feature_engineering as fe
+import utils.compiled_model as cm
+import utils.profiling as profiling
+from utils.prediction_cache import PredictionCache, hash_artifacts
 import joblib
+from sklearn.compose import ColumnTransformer
+from sklearn.pipeline import Pipeline
+from utils.storage import load_dataset
+
+INPUT_COLUMNS = ["Latitude", "Longitude", "SaleDate", "YearBuilt", "RegionName", "Suburb", "CouncilArea",
+                 "DistanceToCBD", "Postcode", "NeighbouringProperties", "RealEstateAgent", "LandSize", "BuildingArea",
+                 "Rooms", "Bedrooms", "Bathrooms", "CarSpots"]
+PREPROCESSOR_PATH = "raw/preprocessor.pkl"
+MODEL_PATH = "raw/GradientBoostingRegressor.pkl"
+CURRENT_VERSION_PATH = "raw/current_version.json"
 
 preprocessor = None
 model = None
+feature_names = None
+compiled_model = None
+artifact_hash = None
+prediction_cache = None
+
 
+def get_artifact_paths(prefix: str = "") -> tuple:
+    artifact_paths = (prefix + PREPROCESSOR_PATH, prefix + MODEL_PATH)
+    try:
+        with open(prefix + CURRENT_VERSION_PATH) as file:
+            published = os.fstat(file.fileno()).st_mtime_ns
+            current_version = json.load(file)
+    except FileNotFoundError:
+        return artifact_paths
+    # A refresh switches this pointer before copying the version into raw/ with the version's older mtimes, so raw/
+    # is only newer than the pointer once a full pipeline run or a search has replaced the artifacts there.
+    if any(os.stat(path).st_mtime_ns > published for path in artifact_paths):
+        return artifact_paths
+    return tuple(prefix + path for path in current_version["artifacts"])
 
-def load_preprocessor_and_model(prefix: str = ""):
+
+def load_preprocessor_and_model(prefix: str = "", compiled: bool = False):
     global preprocessor
     global model
-    preprocessor = joblib.load(f"{prefix}raw/preprocessor.pkl")
-    model = joblib.load(f"{prefix}raw/GradientBoostingRegressor.pkl")
+    global feature_names
+    global compiled_model
+    global artifact_hash
+    artifact_paths = get_artifact_paths(prefix)
+    preprocessor = joblib.load(artifact_paths[0])
+    model = joblib.load(artifact_paths[1])
+    feature_names = preprocessor.get_feature_names_out()
+    artifact_hash = hash_artifacts(*artifact_paths)
+    compiled_model = cm.load_or_export_compiled_model(preprocessor, model, prefix + cm.COMPILED_MODEL_PATH,
+                                                      artifact_hash) if compiled else None
+    if prediction_cache is not None:
+        prediction_cache.bind(artifact_hash)
+
+
+def enable_prediction_cache(max_size: int = 10_000, precision: int = 4, path: str = None) -> PredictionCache:
+    global prediction_cache
+    if prediction_cache is not None and (prediction_cache.max_size, prediction_cache.precision,
+                                         prediction_cache.path) == (max_size, precision, path):
+        return prediction_cache
+    disable_prediction_cache()
+    prediction_cache = PredictionCache(max_size, precision, path)
+    if artifact_hash is not None:
+        prediction_cache.bind(artifact_hash)
+    return prediction_cache
+
+
+def disable_prediction_cache() -> None:
+    global prediction_cache
+    if prediction_cache is not None:
+        prediction_cache.close()
+    prediction_cache = None
+
+
+def get_column_transformer(fitted_preprocessor=None) -> ColumnTransformer:
+    fitted_preprocessor = preprocessor if fitted_preprocessor is None else fitted_preprocessor
+    return fitted_preprocessor[-1] if isinstance(fitted_preprocessor, Pipeline) else fitted_preprocessor
+
+
+def get_category_options(column: str) -> list:
+    for _, transformer, columns in get_column_transformer().transformers_:
+        if column in list(columns):
+            return sorted(transformer.categories_[list(columns).index(column)])
+    raise KeyError(f"{column} is not a categorical model input")
+
+
+def transform_inputs(user_inputs: pd.DataFrame) -> pd.DataFrame:
+    user_inputs_df = fe.engineer_features(user_inputs)
+    return pd.DataFrame(preprocessor.transform(user_inputs_df), columns=feature_names, index=user_inputs.index)
+
+
+def score_batch(user_inputs: pd.DataFrame) -> np.ndarray:
+    if compiled_model is not None:
+        return cm.predict_batch_compiled(compiled_model, user_inputs)
+    return model.predict(transform_inputs(user_inputs))
+
+
+def predict_batch(user_inputs: pd.DataFrame) -> np.ndarray:
+    if prediction_cache is None:
+        return score_batch(user_inputs)
+    keys = [prediction_cache.make_key(record, INPUT_COLUMNS) for record in user_inputs.to_dict(orient="records")]
+    predictions = np.array([prediction_cache.get(key) for key in keys], dtype="float64")
+    missing = np.isnan(predictions)
+    if missing.any():
+        predictions[missing] = score_batch(user_inputs[missing])
+        for key, prediction in zip(np.array(keys)[missing], predictions[missing]):
+            prediction_cache.put(key, prediction)
+    return predictions
 
 
 def predict_from_input(user_input: pd.Series) -> str:
-    separated_date = fe.separate_date(user_input)
-    for metric, value in separated_date.items():
-        user_input[metric] = value
-    user_input["PropertyAge"] = fe.calc_property_age(user_input)
-    user_input["AvgRoomSize"] = fe.calc_avg_room_size(user_input)
-    user_input["BuildingToLandRatio"] = fe.calc_building_to_land_ratio(user_input)
-    user_input_df = user_input.to_frame().T
-    user_input = preprocessor.transform(user_input_df)
-    feature_names = preprocessor.get_feature_names_out()
-    user_input_df = pd.DataFrame(user_input, columns=feature_names)
-    prediction = model.predict(user_input_df)
-    return prediction[0]
+    key = prediction_cache.make_key(user_input, INPUT_COLUMNS) if prediction_cache is not None else None
+    if key is not None and (prediction := prediction_cache.get(key)) is not None:
+        return prediction
+    if compiled_model is not None:
+        prediction = cm.predict_from_input_compiled(compiled_model, user_input)
+    else:
+        prediction = score_batch(user_input.to_frame().T.infer_objects())[0]
+    if key is not None:
+        prediction_cache.put(key, prediction)
+    return prediction
+
+
+def make_sweep_inputs(base_input: pd.Series, sweeps: dict) -> pd.DataFrame:
+    if not 1 <= len(sweeps) <= 2:
+        raise ValueError("A sweep varies one or two input fields")
+    unknown = set(sweeps) - set(INPUT_COLUMNS)
+    if unknown:
+        raise KeyError(f"Unknown input fields: {', '.join(sorted(unknown))}")
+    grid = pd.MultiIndex.from_product(list(sweeps.values()), names=list(sweeps)).to_frame(index=False)
+    for column in INPUT_COLUMNS:
+        if column not in sweeps:
+            grid[column] = base_input[column]
+    if "SaleDate" in grid.columns:
+        grid["SaleDate"] = pd.to_datetime(grid["SaleDate"])
+    return grid[INPUT_COLUMNS].infer_objects()
+
+
+def sweep_predictions(base_input: pd.Series, sweeps: dict, stages: list = None) -> pd.DataFrame:
+    user_inputs = make_sweep_inputs(base_input, sweeps)
+    sweep = user_inputs[list(sweeps)].copy()
+    if not stages:
+        sweep["PredictedPrice"] = score_batch(user_inputs)
+        return sweep
+    if not hasattr(model, "staged_predict"):
+        raise TypeError(f"{type(model).__name__} has no staged predictions")
+    out_of_range = sorted(stage for stage in set(stages) if not 1 <= stage <= model.n_estimators_)
+    if out_of_range:
+        raise ValueError(f"Stages must be between 1 and {model.n_estimators_}, got {out_of_range}")
+    # Staged predictions always come from the sklearn model, also when the compiled engine is loaded: both evaluate
+    # the same trees, and the compiled arrays keep only the summed ensemble.
+    for stage, predictions in enumerate(model.staged_predict(transform_inputs(user_inputs)), start=1):
+        if stage in stages:
+            sweep[f"PredictedPrice@{stage}"] = predictions
+    sweep["PredictedPrice"] = predictions
+    return sweep
+
+
+def predict_csv(input_path: str, output_path: str, chunk_size: int = 10_000) -> pd.Series:
+    n_rows = 0
+    start = time.perf_counter()
+    for index, chunk in enumerate(pd.read_csv(input_path, chunksize=chunk_size)):
+        chunk["PredictedPrice"] = predict_batch(chunk)
+        chunk.to_csv(output_path, mode="w" if index == 0 else "a", header=index == 0, index=False)
+        n_rows += len(chunk)
+    seconds = time.perf_counter() - start
+    return pd.Series({"rows": n_rows, "seconds": seconds, "rows_per_second": n_rows / seconds if seconds else np.nan})
 
 
 if __name__ == "__main__":
-    first_row = pd.read_csv("../data/CLEANED_Melbourne_Housing_Market.csv").iloc[0]
-    first_row = first_row.drop(["Address", "SaleMethod", "UnitType"])
-    first_row["SaleDate"] = pd.to_datetime(first_row["SaleDate"])
-    real_price = first_row["Price"]
-    first_row = first_row.drop("Price")
-    load_preprocessor_and_model("../")
-    predict = predict_from_input(first_row)
-    print("Row:")
-    print(first_row)
-    print(f"was predicted to be: {predict}")
-    print(f"It is in fact {real_price}.")
+    parser = argparse.ArgumentParser(description="Score a CSV of properties in fixed-size chunks.")
+    parser.add_argument("input_path", nargs="?", help="CSV with the model input columns; omit to score a demo row")
+    parser.add_argument("output_path", nargs="?", default="predictions.csv")
+    parser.add_argument("--chunk-size", type=int, default=10_000)
+    parser.add_argument("--prefix", default="../", help="path prefix of the raw/ artifacts directory")
+    parser.add_argument("--compiled", action="store_true", help="score with the NumPy tree-ensemble evaluator")
+    parser.add_argument("--sweep", nargs=4, metavar=("FIELD", "START", "STOP", "POINTS"),
+                        help="sweep one numeric field of the demo row instead of scoring it once")
+    parser.add_argument("--profile", metavar="TRACE_PATH",
+                        help="record per-function timings, rows, memory and I/O into a trace-event JSON file")
+    parser.add_argument("--profile-memory", choices=profiling.MEMORY_MODES, default="rss",
+                        help="peak memory per span from the process RSS or from tracemalloc, which is much slower")
+    args = parser.parse_args()
+    if args.profile:
+        profiling.enable_profiling(args.profile, args.profile_memory)
+    load_preprocessor_and_model(args.prefix, args.compiled)
+    if args.sweep is not None:
+        field, sweep_start, sweep_stop, n_points = args.sweep
+        first_row = load_dataset(f"{args.prefix}data/CLEANED_Melbourne_Housing_Market").iloc[0]
+        start = time.perf_counter()
+        sweep = sweep_predictions(first_row, {field: np.linspace(float(sweep_start), float(sweep_stop),
+                                                                 int(n_points))})
+        print(sweep.to_string(index=False, max_rows=20))
+        print(f"Swept {len(sweep)} points in {(time.perf_counter() - start) * 1000:.1f} ms")
+    elif args.input_path is not None:
+        throughput = predict_csv(args.input_path, args.output_path, args.chunk_size)
+        print(f"Scored {int(throughput['rows'])} rows in {throughput['seconds']:.2f}s "
+              f"({throughput['rows_per_second']:,.0f} rows/sec) into {args.output_path}")
+    else:
+        first_row = load_dataset(f"{args.prefix}data/CLEANED_Melbourne_Housing_Market").iloc[0]
+        first_row = first_row.drop(["Address", "SaleMethod", "UnitType"])
+        real_price = first_row["Price"]
+        first_row = first_row.drop("Price")
+        predict = predict_from_input(first_row)
+        print("Row:")
+        print(first_row)
+        print(f"was predicted to be: {predict}")
+        print(f"It is in fact {real_price}.")
+    if args.profile:
+        print(f"Trace written to {profiling.save_trace()}")
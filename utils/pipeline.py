@@ -0,0 +1,329 @@
+import argparse
+import concurrent.futures
+import hashlib
+import importlib
+import inspect
+import json
+import os
+import sys
+import time
+import pandas as pd
+import joblib
+import utils.data_cleaning as dc
+import utils.feature_engineering as fe
+import utils.exploratory_data_analysis as eda
+import utils.data_preprocessing as dp
+import utils.model_development as md
+import utils.model_interface as mi
+import utils.memory as memory
+import utils.profiling as profiling
+import utils.price_tiles as tiles
+import utils.spatial_index as spatial
+import utils.storage as storage
+import utils.ui_metadata as ui
+from utils.prediction_cache import hash_artifacts
+
+SPLIT_DATASETS = ["data/split_data/X_train", "data/split_data/X_test", "data/split_data/y_train",
+                  "data/split_data/y_test"]
+FINGERPRINTS_PATH = ".pipeline/fingerprints.json"
+DATA_STAGES = ["cleaning", "feature_engineering", "analysis", "preprocessing"]
+CHUNKED_STAGES = ["cleaning", "feature_engineering"]
+
+
+class Stage:
+    def __init__(self, name: str, function, inputs: list, outputs: list, params: dict = None, modules: list = ()):
+        self.name = name
+        self.function = function
+        self.inputs = inputs
+        self.outputs = outputs
+        self.params = params or {}
+        self.modules = modules
+
+    def fingerprint(self, prefix: str) -> str:
+        files = get_source_files(self.function, self.modules) + [resolve_path(prefix + path) for path in self.inputs]
+        digest = hashlib.sha256(hash_artifacts(*files).encode())
+        digest.update(json.dumps(self.params, sort_keys=True, default=str).encode())
+        return digest.hexdigest()
+
+    def is_built(self, prefix: str) -> bool:
+        try:
+            for path in self.outputs:
+                resolve_path(prefix + path)
+        except FileNotFoundError:
+            return False
+        return True
+
+
+def get_referenced_names(code) -> set:
+    names = set(code.co_names)
+    for constant in code.co_consts:
+        if inspect.iscode(constant):
+            names |= get_referenced_names(constant)
+    return names
+
+
+def get_referenced_modules(function) -> list:
+    function = inspect.unwrap(function)
+    modules = []
+    for name in sorted(get_referenced_names(function.__code__)):
+        if name.startswith("utils."):
+            modules.append(importlib.import_module(name))
+        elif inspect.ismodule(function.__globals__.get(name)):
+            modules.append(function.__globals__[name])
+    return modules
+
+
+def get_module_dependencies(modules: list) -> list:
+    found = {}
+    pending = list(modules)
+    while pending:
+        module = pending.pop()
+        if not module.__name__.startswith("utils.") or module.__name__ in found:
+            continue
+        found[module.__name__] = module
+        for value in vars(module).values():
+            if inspect.isfunction(value) and value.__module__ == module.__name__:
+                pending.extend(get_referenced_modules(value))
+            module_name = value.__name__ if inspect.ismodule(value) else getattr(value, "__module__", None)
+            if isinstance(module_name, str) and module_name in sys.modules:
+                pending.append(sys.modules[module_name])
+    return [found[name] for name in sorted(found)]
+
+
+def get_source_files(function, modules: list = ()) -> list:
+    modules = get_referenced_modules(function) + list(modules)
+    return [function.__code__.co_filename] + [module.__file__ for module in get_module_dependencies(modules)]
+
+
+def resolve_path(path: str) -> str:
+    if os.path.exists(path):
+        return path
+    file_path, _ = storage.find_dataset(path)
+    return file_path
+
+
+def run_stage(function, prefix: str, params: dict, name: str = None, profile: bool = False,
+              profile_memory: str = "rss") -> tuple:
+    memory.reset_peak_rss()
+    if profile:
+        profiling.enable_profiling(memory_mode=profile_memory)
+    with pd.option_context("mode.copy_on_write", pd.get_option("mode.copy_on_write")), \
+            profiling.profile_span(name or function.__name__, "stage", **params) as span:
+        function(prefix, **params)
+    return max(memory.get_peak_rss_mb(), span.get("peak_mb", 0.0)), profiling.disable_profiling() if profile else []
+
+
+def run_cleaning(prefix: str, compact: bool = False, memory_budget_mb: float = None) -> None:
+    if compact:
+        memory.enable_compact_mode()
+    path = f"{prefix}data/Melbourne_Housing_Market"
+    chunk_size = memory.plan_chunk_size(path, memory_budget_mb)
+    if chunk_size is None:
+        dataset = dc.clean_dataset(pd.read_csv(f"{path}.csv"), compact)
+    else:
+        chunks = pd.read_csv(f"{path}.csv", chunksize=chunk_size)
+        dataset = dc.finalize_cleaning(memory.concat_frames(dc.clean_chunk(chunk, compact) for chunk in chunks),
+                                       compact)
+    storage.save_dataset(dataset, f"{prefix}data/CLEANED_Melbourne_Housing_Market")
+
+
+def run_feature_engineering(prefix: str, compact: bool = False, memory_budget_mb: float = None) -> None:
+    if compact:
+        memory.enable_compact_mode()
+    path = f"{prefix}data/CLEANED_Melbourne_Housing_Market"
+    chunk_size = memory.plan_chunk_size(path, memory_budget_mb)
+    if chunk_size is None:
+        dataset = fe.engineer_features(storage.load_dataset(path))
+        dataset = memory.compact_dataset(dataset) if compact else dataset
+    else:
+        chunks = (fe.engineer_features(chunk) for chunk in storage.iter_dataset(path, chunk_size))
+        dataset = memory.concat_frames(map(memory.compact_dataset, chunks) if compact else chunks)
+    storage.save_dataset(dc.reorder_df_columns(dataset), f"{prefix}data/ENGINEERED_Melbourne_Housing_Market")
+
+
+def run_analysis(prefix: str, compact: bool = False, **params) -> None:
+    if compact:
+        memory.enable_compact_mode()
+    dataset = storage.load_dataset(f"{prefix}data/ENGINEERED_Melbourne_Housing_Market")
+    storage.save_dataset(eda.analyse_dataset(dataset, **params), f"{prefix}data/ANALYSED_Melbourne_Housing_Market")
+
+
+def run_preprocessing(prefix: str, compact: bool = False, **params) -> None:
+    if compact:
+        memory.enable_compact_mode()
+    dataset = storage.load_dataset(f"{prefix}data/ANALYSED_Melbourne_Housing_Market")
+    preprocessor, X_train_df, X_test_df, y_train_df, y_test_df = dp.preprocess_dataset(dataset, **params)
+    joblib.dump(preprocessor, f"{prefix}raw/preprocessor.pkl")
+    dp.save_split_datasets(X_train_df, X_test_df, y_train_df, y_test_df, prefix)
+
+
+def run_training(prefix: str, model_name: str, **params) -> None:
+    X_train, X_test, y_train, y_test = md.load_split_datasets(prefix)
+    evaluation = pd.DataFrame(columns=md.EVALUATION_METRICS)
+    evaluation = md.train_model(X_train, X_test, y_train, y_test, md.build_model(model_name, **params),
+                                evaluation=evaluation, save=True, prefix=prefix)
+    os.makedirs(f"{prefix}data/evaluation", exist_ok=True)
+    with open(f"{prefix}data/evaluation/{model_name}.json", "w") as file:
+        json.dump(evaluation.loc[model_name].to_dict(), file, indent=4)
+
+
+def run_evaluation(prefix: str, model_names: list) -> None:
+    evaluation = pd.DataFrame(columns=md.EVALUATION_METRICS)
+    evaluation.index.name = "Model"
+    for model_name in model_names:
+        with open(f"{prefix}data/evaluation/{model_name}.json") as file:
+            evaluation.loc[model_name] = json.load(file)
+    evaluation.to_csv(f"{prefix}data/model_evaluation.csv")
+
+
+def run_spatial_index(prefix: str) -> None:
+    dataset = storage.load_dataset(f"{prefix}data/ANALYSED_Melbourne_Housing_Market",
+                                   spatial.COORDINATE_COLUMNS + spatial.ATTRIBUTE_COLUMNS)
+    spatial.save_spatial_index(spatial.build_spatial_index(dataset), prefix)
+
+
+def run_ui_metadata(prefix: str) -> None:
+    ui.save_ui_metadata(ui.build_ui_metadata(prefix), prefix)
+
+
+def run_price_tiles(prefix: str, **params) -> None:
+    tiles.build_price_tiles(prefix, force=True, **params)
+
+
+def build_stages(config: dict = None) -> list:
+    config = config or {}
+    stages = [
+        Stage("cleaning", run_cleaning, ["data/Melbourne_Housing_Market.csv"],
+              ["data/CLEANED_Melbourne_Housing_Market"], config.get("cleaning")),
+        Stage("feature_engineering", run_feature_engineering, ["data/CLEANED_Melbourne_Housing_Market"],
+              ["data/ENGINEERED_Melbourne_Housing_Market"], config.get("feature_engineering")),
+        Stage("analysis", run_analysis, ["data/ENGINEERED_Melbourne_Housing_Market"],
+              ["data/ANALYSED_Melbourne_Housing_Market"], config.get("analysis")),
+        Stage("preprocessing", run_preprocessing, ["data/ANALYSED_Melbourne_Housing_Market"],
+              ["raw/preprocessor.pkl"] + SPLIT_DATASETS, config.get("preprocessing")),
+    ]
+    for model_name in md.MODEL_ROSTER:
+        stages.append(Stage(model_name, run_training, SPLIT_DATASETS,
+                            [f"raw/{model_name}.pkl", f"data/evaluation/{model_name}.json"],
+                            {"model_name": model_name, **config.get(model_name, {})}))
+    stages.append(Stage("evaluation", run_evaluation,
+                        [f"data/evaluation/{model_name}.json" for model_name in md.MODEL_ROSTER],
+                        ["data/model_evaluation.csv"], {"model_names": list(md.MODEL_ROSTER)}))
+    stages.append(Stage("spatial_index", run_spatial_index, ["data/ANALYSED_Melbourne_Housing_Market"],
+                        [spatial.SPATIAL_INDEX_PATH]))
+    stages.append(Stage("ui_metadata", run_ui_metadata,
+                        ["data/ANALYSED_Melbourne_Housing_Market", "raw/preprocessor.pkl",
+                         "raw/GradientBoostingRegressor.pkl"], [ui.UI_METADATA_PATH]))
+    stages.append(Stage("price_tiles", run_price_tiles,
+                        tiles.MODEL_ARTIFACTS + [spatial.SPATIAL_INDEX_PATH, ui.UI_METADATA_PATH],
+                        [tiles.PRICE_TILES_MANIFEST], config.get("price_tiles")))
+    unknown = set(config) - {stage.name for stage in stages}
+    if unknown:
+        raise ValueError(f"Unknown pipeline stages in config: {', '.join(sorted(unknown))}")
+    return stages
+
+
+def load_fingerprints(prefix: str) -> dict:
+    if not os.path.exists(prefix + FINGERPRINTS_PATH):
+        return {}
+    with open(prefix + FINGERPRINTS_PATH) as file:
+        return json.load(file)
+
+
+def save_fingerprints(fingerprints: dict, prefix: str) -> None:
+    os.makedirs(os.path.dirname(prefix + FINGERPRINTS_PATH), exist_ok=True)
+    with open(prefix + FINGERPRINTS_PATH, "w") as file:
+        json.dump(fingerprints, file, indent=4, sort_keys=True)
+
+
+def run_pipeline(stages: list, prefix: str = "../", workers: int = None, force: bool = False,
+                 profile: bool = False, profile_memory: str = "rss") -> pd.DataFrame:
+    producers = {path: stage.name for stage in stages for path in stage.outputs}
+    dependencies = {stage.name: {producers[path] for path in stage.inputs if path in producers} for stage in stages}
+    fingerprints = load_fingerprints(prefix)
+    report = []
+    pending = {stage.name: stage for stage in stages}
+    running = {}
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        while pending or running:
+            done = {row["Stage"] for row in report}
+            for name in [name for name, stage in pending.items() if dependencies[name] <= done]:
+                stage = pending.pop(name)
+                fingerprint = stage.fingerprint(prefix)
+                if not force and fingerprints.get(name) == fingerprint and stage.is_built(prefix):
+                    report.append({"Stage": name, "status": "cached", "seconds": 0.0, "peak_rss_mb": None})
+                    continue
+                future = executor.submit(run_stage, stage.function, prefix, stage.params, name, profile,
+                                         profile_memory)
+                running[future] = (name, fingerprint, time.perf_counter())
+            if not running:
+                continue
+            finished, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in finished:
+                name, fingerprint, start = running.pop(future)
+                peak_rss_mb, events = future.result()
+                profiling.add_events(events)
+                fingerprints[name] = fingerprint
+                save_fingerprints(fingerprints, prefix)
+                report.append({"Stage": name, "status": "built", "seconds": time.perf_counter() - start,
+                               "peak_rss_mb": peak_rss_mb})
+    return pd.DataFrame(report, columns=["Stage", "status", "seconds", "peak_rss_mb"]).set_index("Stage")
+
+
+def apply_memory_options(config: dict, compact: bool = False, memory_budget_mb: float = None) -> dict:
+    config = {name: dict(params) for name, params in config.items()}
+    if compact:
+        for stage_name in DATA_STAGES:
+            config.setdefault(stage_name, {})["compact"] = True
+    if memory_budget_mb is not None:
+        for stage_name in CHUNKED_STAGES:
+            config.setdefault(stage_name, {})["memory_budget_mb"] = memory_budget_mb
+    return config
+
+
+def parse_overrides(overrides: list, config: dict = None) -> dict:
+    config = {name: dict(params) for name, params in (config or {}).items()}
+    for override in overrides:
+        key, _, value = override.partition("=")
+        stage_name, _, param = key.partition(".")
+        if not param:
+            raise ValueError(f"Expected Stage.param=value, got {override}")
+        try:
+            value = json.loads(value)
+        except json.JSONDecodeError:
+            pass
+        config.setdefault(stage_name, {})[param] = value
+    return config
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the data and training pipeline, rebuilding only stale stages.")
+    parser.add_argument("--prefix", default="../", help="path prefix of the data/ and raw/ directories")
+    parser.add_argument("--config", help="JSON file mapping stage names to parameter overrides")
+    parser.add_argument("--set", dest="overrides", action="append", default=[], metavar="STAGE.PARAM=VALUE",
+                        help="override one stage parameter, e.g. GradientBoostingRegressor.n_estimators=200")
+    parser.add_argument("--workers", type=int, help="number of stages to run concurrently")
+    parser.add_argument("--force", action="store_true", help="rebuild every stage regardless of fingerprints")
+    parser.add_argument("--compact", action="store_true",
+                        help="downcast numbers, keep strings categorical and avoid copies between data stages")
+    parser.add_argument("--memory-budget-mb", type=float,
+                        help="process the cleaning and feature engineering stages in chunks above this estimate")
+    parser.add_argument("--profile", metavar="TRACE_PATH",
+                        help="record per-function timings, rows, memory and I/O into a trace-event JSON file")
+    parser.add_argument("--profile-memory", choices=profiling.MEMORY_MODES, default="rss",
+                        help="peak memory per span from the process RSS or from tracemalloc, which is much slower")
+    args = parser.parse_args()
+    config = {}
+    if args.config:
+        with open(args.config) as config_file:
+            config = json.load(config_file)
+    start = time.perf_counter()
+    config = apply_memory_options(parse_overrides(args.overrides, config), args.compact, args.memory_budget_mb)
+    if args.profile:
+        profiling.enable_profiling(args.profile, args.profile_memory)
+    report = run_pipeline(build_stages(config), args.prefix, args.workers, args.force, args.profile is not None,
+                          args.profile_memory)
+    print(report)
+    if args.profile:
+        print(f"Trace written to {profiling.save_trace()}")
+    print(f"Pipeline finished in {time.perf_counter() - start:.2f}s")
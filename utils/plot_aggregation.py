@@ -0,0 +1,220 @@
+import argparse
+import collections
+import io
+import threading
+import time
+import numpy as np
+import pandas as pd
+import matplotlib
+import matplotlib.pyplot as plt
+import seaborn as sns
+from utils.storage import load_dataset
+
+PLOT_TYPES = ["scatterplot", "lineplot", "boxplot", "barplot", "histplot", "violinplot"]
+MAX_PLOT_ROWS = 20_000
+DENSITY_BINS = 200
+HISTOGRAM_BINS = 50
+VIOLIN_POINTS = 100
+MAX_LINE_POINTS = 200
+MAX_BOX_GROUPS = 20
+SAMPLE_SEED = 42
+FIGURE_CACHE_SIZE = 64
+
+figure_cache = collections.OrderedDict()
+figure_cache_lock = threading.Lock()
+
+
+def is_numeric(df: pd.DataFrame, column: str) -> bool:
+    return column is not None and pd.api.types.is_numeric_dtype(df[column]) and \
+        not pd.api.types.is_bool_dtype(df[column])
+
+
+def sample_rows(df: pd.DataFrame, n_rows: int = MAX_PLOT_ROWS, seed: int = SAMPLE_SEED) -> pd.DataFrame:
+    return df if len(df) <= n_rows else df.sample(n_rows, random_state=seed)
+
+
+def bin_density(df: pd.DataFrame, x: str, y: str, bins: int = DENSITY_BINS) -> tuple:
+    values = df[[x, y]].dropna()
+    counts, x_edges, y_edges = np.histogram2d(values[x].to_numpy(float), values[y].to_numpy(float), bins)
+    return counts.T, x_edges, y_edges
+
+
+def bin_histogram(df: pd.DataFrame, x: str, hue: str = None, bins: int = HISTOGRAM_BINS) -> tuple:
+    columns = [x] if hue is None else [x, hue]
+    values = df[columns].dropna(subset=[x])
+    if not is_numeric(df, x):
+        summary = values.groupby(columns, observed=True).size().rename("count").reset_index()
+        return summary, None
+    edges = np.histogram_bin_edges(values[x].to_numpy(float), bins)
+    centres = (edges[:-1] + edges[1:]) / 2
+    bin_index = np.clip(np.searchsorted(edges, values[x].to_numpy(float), side="right") - 1, 0, len(centres) - 1)
+    keys = [pd.Series(bin_index, index=values.index, name="bin")] + ([] if hue is None else [values[hue]])
+    summary = values[x].groupby(keys, observed=True).size().rename("count").reset_index()
+    summary[x] = centres[summary.pop("bin")]
+    return summary, edges
+
+
+def group_columns(df: pd.DataFrame, x: str, y: str, hue: str = None) -> tuple:
+    hue_groups = [] if hue is None else [hue]
+    if y is None:
+        return (df, x, hue_groups) if is_numeric(df, x) else (df, None, None)
+    if is_numeric(df, x) and not is_numeric(df, y):
+        return df, x, [y] + hue_groups
+    if not is_numeric(df, y):
+        return df, None, None
+    if is_numeric(df, x) and df[x].nunique() > MAX_BOX_GROUPS:
+        df = df.assign(**{x: pd.cut(df[x], MAX_BOX_GROUPS)})
+    return df, y, [x] + hue_groups
+
+
+def box_statistics(df: pd.DataFrame, value: str, groups: list) -> list:
+    values = df[[value] + groups].dropna(subset=[value])
+    keys = [values[group] for group in groups] or [pd.Series(value, index=values.index)]
+    grouped = values[value].groupby(keys, observed=True, sort=True)
+    q1, q3 = grouped.transform("quantile", 0.25), grouped.transform("quantile", 0.75)
+    inside = values[value].where(values[value].between(q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)))
+    summary = pd.DataFrame({"q1": grouped.quantile(0.25), "med": grouped.median(), "q3": grouped.quantile(0.75),
+                            "mean": grouped.mean(), "whislo": inside.groupby(keys, observed=True).min(),
+                            "whishi": inside.groupby(keys, observed=True).max()})
+    return [{"label": label, **row} for label, row in summary.to_dict(orient="index").items()]
+
+
+def violin_statistics(df: pd.DataFrame, value: str, groups: list, n_points: int = VIOLIN_POINTS) -> list:
+    values = df[[value] + groups].dropna(subset=[value])
+    grouped = values.groupby(groups, observed=True, sort=True)[value] if groups else [(value, values[value])]
+    statistics = []
+    for label, group in grouped:
+        group = group.to_numpy(float)
+        low, high = group.min(), group.max()
+        coords = np.linspace(low, high, n_points)
+        counts, _ = np.histogram(group, n_points, (low, high + 1e-12))
+        bandwidth = 1.06 * group.std() * len(group) ** -0.2 if len(group) > 1 else 0.0
+        step = (high - low) / (n_points - 1) if high > low else 1.0
+        kernel_width = bandwidth / step
+        if kernel_width > 0:
+            offsets = np.arange(-int(3 * kernel_width) - 1, int(3 * kernel_width) + 2)
+            counts = np.convolve(counts, np.exp(-0.5 * (offsets / kernel_width) ** 2))[
+                len(offsets) // 2:len(offsets) // 2 + n_points]
+        statistics.append({"label": label, "coords": coords, "vals": counts / max(counts.sum() * step, 1e-12),
+                           "mean": group.mean(), "median": np.median(group), "min": low, "max": high})
+    return statistics
+
+
+def grouped_means(df: pd.DataFrame, x: str, y: str, hue: str = None, max_points: int = MAX_LINE_POINTS) -> tuple:
+    values = df[[x, y] + ([] if hue is None else [hue])].dropna(subset=[x, y])
+    keys = values[x]
+    if is_numeric(df, x) and values[x].nunique() > max_points:
+        edges = np.histogram_bin_edges(values[x].to_numpy(float), max_points)
+        bin_index = np.clip(np.searchsorted(edges, values[x].to_numpy(float), side="right") - 1, 0, max_points - 1)
+        keys = pd.Series(((edges[:-1] + edges[1:]) / 2)[bin_index], index=values.index, name=x)
+    summary = values[y].groupby([keys] + ([] if hue is None else [values[hue]]), observed=True).agg(
+        ["mean", "std", "count"]).reset_index()
+    summary["ci"] = 1.96 * summary["std"].fillna(0) / np.sqrt(summary["count"])
+    return summary.rename(columns={"mean": y})
+
+
+def draw_grouped_statistics(ax, statistics: list, draw) -> None:
+    positions = np.arange(len(statistics))
+    draw(statistics, positions)
+    ax.set_xticks(positions, [" / ".join(map(str, label)) if isinstance(label, tuple) else str(label)
+                              for label in (stats["label"] for stats in statistics)], rotation=30, ha="right")
+
+
+def draw_plot(df: pd.DataFrame, x: str, y: str = None, hue: str = None, plot_type: str = "scatterplot",
+              ax=None, max_rows: int = MAX_PLOT_ROWS) -> str:
+    ax = ax if ax is not None else plt.gca()
+    if len(df) <= max_rows:
+        getattr(sns, plot_type)(data=df, x=x, y=y, hue=hue, ax=ax)
+        return "full"
+    if plot_type in ["scatterplot", "histplot"] and y is not None and hue is None and is_numeric(df, x) \
+            and is_numeric(df, y):
+        counts, x_edges, y_edges = bin_density(df, x, y)
+        mesh = ax.pcolormesh(x_edges, y_edges, np.ma.masked_equal(counts, 0), cmap="viridis",
+                             norm=matplotlib.colors.LogNorm())
+        plt.colorbar(mesh, ax=ax, label="count")
+        ax.set_xlabel(x)
+        ax.set_ylabel(y)
+        return "density"
+    if plot_type == "histplot" and y is None:
+        summary, edges = bin_histogram(df, x, hue)
+        sns.histplot(data=summary, x=x, weights="count", hue=hue, bins=edges.tolist() if edges is not None else "auto",
+                     discrete=edges is None, ax=ax)
+        return "histogram"
+    if plot_type in ["boxplot", "violinplot"]:
+        grouped_df, value, groups = group_columns(df, x, y, hue)
+        if value is not None:
+            if plot_type == "boxplot":
+                draw_grouped_statistics(ax, box_statistics(grouped_df, value, groups),
+                                        lambda statistics, positions: ax.bxp(statistics, positions, showfliers=False,
+                                                                             showmeans=True))
+            else:
+                draw_grouped_statistics(ax, violin_statistics(grouped_df, value, groups),
+                                        lambda statistics, positions: ax.violin(statistics, positions,
+                                                                                showmedians=True))
+            ax.set_ylabel(value)
+            return "quartiles"
+    if plot_type in ["barplot", "lineplot"] and y is not None and is_numeric(df, y):
+        summary = grouped_means(df, x, y, hue)
+        getattr(sns, plot_type)(data=summary, x=x, y=y, hue=hue, errorbar=None, ax=ax)
+        if plot_type == "lineplot":
+            for _, group in summary.groupby(hue, observed=True) if hue is not None else [(None, summary)]:
+                ax.fill_between(group[x], group[y] - group["ci"], group[y] + group["ci"], alpha=0.2)
+        return "means"
+    getattr(sns, plot_type)(data=sample_rows(df, max_rows), x=x, y=y, hue=hue, ax=ax)
+    ax.set_title(f"{max_rows:,} of {len(df):,} rows sampled", fontsize="small")
+    return "sample"
+
+
+def render_figure(df: pd.DataFrame, x: str, y: str = None, hue: str = None, plot_type: str = "scatterplot",
+                  max_rows: int = MAX_PLOT_ROWS) -> bytes:
+    fig, ax = plt.subplots()
+    try:
+        draw_plot(df, x, y, hue, plot_type, ax, max_rows)
+        fig.tight_layout()
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format="png")
+        return buffer.getvalue()
+    finally:
+        plt.close(fig)
+
+
+def get_figure(df: pd.DataFrame, version, x: str, y: str = None, hue: str = None, plot_type: str = "scatterplot",
+               max_rows: int = MAX_PLOT_ROWS) -> bytes:
+    key = (version, x, y, hue, plot_type, max_rows)
+    with figure_cache_lock:
+        if key in figure_cache:
+            figure_cache.move_to_end(key)
+            return figure_cache[key]
+    figure = render_figure(df, x, y, hue, plot_type, max_rows)
+    with figure_cache_lock:
+        figure_cache[key] = figure
+        while len(figure_cache) > FIGURE_CACHE_SIZE:
+            figure_cache.popitem(last=False)
+    return figure
+
+
+def clear_figure_cache() -> None:
+    with figure_cache_lock:
+        figure_cache.clear()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time full and aggregated rendering of one Plot Generator figure.")
+    parser.add_argument("x")
+    parser.add_argument("y", nargs="?")
+    parser.add_argument("--hue")
+    parser.add_argument("--plot-type", choices=PLOT_TYPES, default="scatterplot")
+    parser.add_argument("--path", default="../data/ANALYSED_Melbourne_Housing_Market")
+    parser.add_argument("--scale", type=int, default=1, help="number of times the dataset is repeated")
+    args = parser.parse_args()
+    matplotlib.use("Agg")
+    dataset = load_dataset(args.path)
+    dataset = pd.concat([dataset] * args.scale, ignore_index=True) if args.scale > 1 else dataset
+    for max_rows in [len(dataset), MAX_PLOT_ROWS]:
+        start = time.perf_counter()
+        get_figure(dataset, args.path, args.x, args.y, args.hue, args.plot_type, max_rows)
+        seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        get_figure(dataset, args.path, args.x, args.y, args.hue, args.plot_type, max_rows)
+        print(f"{len(dataset)} rows, max_rows={max_rows}: render {seconds:.2f}s, "
+              f"cached {(time.perf_counter() - start) * 1000:.2f}ms")
@@ -0,0 +1,109 @@
+import collections
+import hashlib
+import json
+import sqlite3
+import threading
+import numpy as np
+import pandas as pd
+from utils.profiling import not_profiled
+
+
+def hash_artifacts(*paths: str) -> str:
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as artifact:
+            for block in iter(lambda: artifact.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+@not_profiled
+def canonicalize_input(user_input, columns: list, precision: int = 4) -> str:
+    values = []
+    for column in columns:
+        value = user_input[column]
+        if column == "SaleDate":
+            value = pd.Timestamp(value).strftime("%Y-%m-%d")
+        elif isinstance(value, (bool, np.bool_)):
+            value = bool(value)
+        elif isinstance(value, (int, float, np.integer, np.floating)):
+            value = round(float(value), precision) + 0.0
+        else:
+            value = str(value).strip()
+        values.append(value)
+    return json.dumps(values)
+
+
+class PredictionCache:
+    def __init__(self, max_size: int = 10_000, precision: int = 4, path: str = None):
+        self.max_size = max_size
+        self.precision = precision
+        self.path = path
+        self.entries = collections.OrderedDict()
+        self.artifact_hash = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+        self.connection = None
+        if path is not None:
+            self.connection = sqlite3.connect(path, check_same_thread=False)
+            self.connection.execute("CREATE TABLE IF NOT EXISTS predictions (key TEXT PRIMARY KEY, value REAL)")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT)")
+            row = self.connection.execute("SELECT value FROM metadata WHERE name = 'artifact_hash'").fetchone()
+            self.artifact_hash = row[0] if row else None
+
+    def bind(self, artifact_hash: str) -> None:
+        with self.lock:
+            if artifact_hash == self.artifact_hash:
+                return
+            self.entries.clear()
+            self.artifact_hash = artifact_hash
+            if self.connection is not None:
+                with self.connection:
+                    self.connection.execute("DELETE FROM predictions")
+                    self.connection.execute("INSERT OR REPLACE INTO metadata VALUES ('artifact_hash', ?)",
+                                            (artifact_hash,))
+
+    def make_key(self, user_input, columns: list) -> str:
+        return canonicalize_input(user_input, columns, self.precision)
+
+    def get(self, key: str):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            row = None
+            if self.connection is not None:
+                row = self.connection.execute("SELECT value FROM predictions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.store(key, row[0])
+            return row[0]
+
+    def put(self, key: str, value: float) -> None:
+        with self.lock:
+            self.store(key, float(value))
+            if self.connection is not None:
+                with self.connection:
+                    self.connection.execute("INSERT OR REPLACE INTO predictions VALUES (?, ?)", (key, float(value)))
+
+    def store(self, key: str, value: float) -> None:
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions, "size": len(self.entries), "max_size": self.max_size}
+
+    def close(self) -> None:
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
@@ -0,0 +1,228 @@
+import argparse
+import asyncio
+import collections
+import json
+import time
+import numpy as np
+import pandas as pd
+import utils.model_interface as mi
+import utils.profiling as profiling
+
+CATEGORICAL_INPUTS = ["RegionName", "Suburb", "CouncilArea", "RealEstateAgent"]
+HTTP_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                500: "Internal Server Error"}
+
+
+class MicroBatcher:
+    def __init__(self, window_ms: float = 5.0, max_batch_size: int = 256, latency_window: int = 10_000):
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.queue = asyncio.Queue()
+        self.latencies = collections.deque(maxlen=latency_window)
+        self.batch_sizes = collections.Counter()
+        self.requests = 0
+        self.errors = 0
+        self.task = None
+
+    def start(self) -> None:
+        self.task = asyncio.create_task(self.run())
+
+    async def predict(self, records: list) -> list:
+        future = asyncio.get_running_loop().create_future()
+        start = time.perf_counter()
+        await self.queue.put((records, future))
+        try:
+            return await future
+        finally:
+            self.requests += 1
+            self.latencies.append(time.perf_counter() - start)
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [await self.queue.get()]
+            n_rows = len(pending[0][0])
+            deadline = loop.time() + self.window
+            while n_rows < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    pending.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+                n_rows += len(pending[-1][0])
+            self.batch_sizes[n_rows] += 1
+            try:
+                predictions = await loop.run_in_executor(None, mi.predict_batch, make_batch(pending))
+            except Exception as error:
+                if len(pending) == 1:
+                    self.resolve(pending[0][1], error=error)
+                else:
+                    await self.score_separately(pending)
+                continue
+            offset = 0
+            for records, future in pending:
+                self.resolve(future, predictions[offset:offset + len(records)].tolist())
+                offset += len(records)
+
+    async def score_separately(self, pending: list) -> None:
+        loop = asyncio.get_running_loop()
+        for records, future in pending:
+            try:
+                predictions = await loop.run_in_executor(None, mi.predict_batch, make_batch([(records, future)]))
+            except Exception as error:
+                self.resolve(future, error=error)
+                continue
+            self.resolve(future, predictions.tolist())
+
+    def resolve(self, future: asyncio.Future, predictions: list = None, error: Exception = None) -> None:
+        if future.done():
+            return
+        if error is None:
+            future.set_result(predictions)
+        else:
+            self.errors += 1
+            future.set_exception(error)
+
+    def metrics(self) -> dict:
+        latencies_ms = np.array(self.latencies) * 1000
+        n_batches = sum(self.batch_sizes.values())
+        n_rows = sum(size * count for size, count in self.batch_sizes.items())
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "batches": n_batches,
+            "mean_batch_size": n_rows / n_batches if n_batches else 0.0,
+            "batch_sizes": {str(size): count for size, count in sorted(self.batch_sizes.items())},
+            "p50_ms": float(np.percentile(latencies_ms, 50)) if len(latencies_ms) else None,
+            "p99_ms": float(np.percentile(latencies_ms, 99)) if len(latencies_ms) else None,
+        }
+
+
+def make_batch(pending: list) -> pd.DataFrame:
+    return pd.DataFrame([record for records, _ in pending for record in records], columns=mi.INPUT_COLUMNS)
+
+
+def coerce_value(column: str, value):
+    if column == "SaleDate":
+        try:
+            value = pd.Timestamp(value)
+        except (TypeError, ValueError):
+            value = pd.NaT
+        if pd.isna(value):
+            raise ValueError(f"{column} is not a date")
+        return value
+    if column in CATEGORICAL_INPUTS:
+        if not isinstance(value, str) or not value.strip():
+            raise ValueError(f"{column} must be a non-empty string")
+        return value
+    try:
+        number = float(value) if not isinstance(value, bool) else np.nan
+    except (TypeError, ValueError):
+        number = np.nan
+    if not np.isfinite(number):
+        raise ValueError(f"{column} must be a finite number")
+    return number
+
+
+def parse_records(body: bytes) -> list:
+    payload = json.loads(body)
+    records = payload if isinstance(payload, list) else [payload]
+    if not records:
+        raise ValueError("Expected at least one record")
+    parsed = []
+    for index, record in enumerate(records):
+        if not isinstance(record, dict):
+            raise ValueError("Expected a JSON object or a list of JSON objects")
+        missing = [column for column in mi.INPUT_COLUMNS if column not in record]
+        if missing:
+            raise ValueError(f"Missing input fields: {', '.join(missing)}")
+        try:
+            parsed.append({column: coerce_value(column, record[column]) for column in mi.INPUT_COLUMNS})
+        except ValueError as error:
+            raise ValueError(f"Record {index}: {error}") from None
+    return parsed
+
+
+async def handle_request(batcher: MicroBatcher, method: str, path: str, body: bytes) -> tuple:
+    if path == "/metrics" and method == "GET":
+        metrics = batcher.metrics()
+        if mi.prediction_cache is not None:
+            metrics["cache"] = mi.prediction_cache.stats()
+        return 200, metrics
+    if path == "/health" and method == "GET":
+        return 200, {"status": "ok"}
+    if path != "/predict":
+        return 404, {"error": f"Unknown path {path}"}
+    if method != "POST":
+        return 405, {"error": "Use POST for /predict"}
+    try:
+        records = parse_records(body)
+    except ValueError as error:
+        return 400, {"error": str(error)}
+    try:
+        return 200, {"predictions": await batcher.predict(records)}
+    except Exception as error:
+        return 500, {"error": str(error)}
+
+
+async def handle_connection(batcher: MicroBatcher, reader: asyncio.StreamReader,
+                            writer: asyncio.StreamWriter) -> None:
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            method, path, _ = request_line.decode("latin-1").split(" ", 2)
+            headers = {}
+            while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get("content-length", 0)))
+            status, payload = await handle_request(batcher, method, path, body)
+            response = json.dumps(payload).encode()
+            keep_alive = headers.get("connection", "keep-alive").lower() != "close"
+            writer.write(f"HTTP/1.1 {status} {HTTP_REASONS[status]}\r\nContent-Type: application/json\r\n"
+                         f"Content-Length: {len(response)}\r\n"
+                         f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + response)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_service(host: str = "127.0.0.1", port: int = 8000, window_ms: float = 5.0,
+                        max_batch_size: int = 256) -> tuple:
+    batcher = MicroBatcher(window_ms, max_batch_size)
+    batcher.start()
+    server = await asyncio.start_server(lambda reader, writer: handle_connection(batcher, reader, writer), host, port)
+    return server, batcher
+
+
+async def serve(host: str, port: int, window_ms: float, max_batch_size: int) -> None:
+    server, _ = await start_service(host, port, window_ms, max_batch_size)
+    print(f"Serving predictions on http://{host}:{server.sockets[0].getsockname()[1]}/predict")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve price predictions over HTTP with request micro-batching.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--window-ms", type=float, default=5.0, help="time to wait for more requests per batch")
+    parser.add_argument("--max-batch-size", type=int, default=256)
+    parser.add_argument("--prefix", default="../", help="path prefix of the raw/ artifacts directory")
+    parser.add_argument("--compiled", action="store_true", help="score with the NumPy tree-ensemble evaluator")
+    parser.add_argument("--cache-size", type=int, default=0, help="number of predictions to memoize, 0 disables")
+    parser.add_argument("--cache-path", help="SQLite file that persists memoized predictions")
+    args = parser.parse_args()
+    profiling.enable_from_environment()
+    mi.load_preprocessor_and_model(args.prefix, args.compiled)
+    if args.cache_size:
+        mi.enable_prediction_cache(args.cache_size, path=args.cache_path)
+    asyncio.run(serve(args.host, args.port, args.window_ms, args.max_batch_size))
@@ -0,0 +1,157 @@
+import argparse
+import concurrent.futures
+import hashlib
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+import utils.model_interface as mi
+import utils.spatial_index as spatial
+from utils.prediction_cache import hash_artifacts
+from utils.ui_metadata import load_ui_metadata
+
+PRICE_TILES_DIRECTORY = "data/price_tiles"
+PRICE_TILES_MANIFEST = f"{PRICE_TILES_DIRECTORY}/manifest.json"
+MODEL_ARTIFACTS = ["raw/preprocessor.pkl", "raw/GradientBoostingRegressor.pkl"]
+BASE_RESOLUTION = 32
+N_LEVELS = 4
+BASE_ZOOM = 10
+CHUNK_SIZE = 4_096
+COLORMAP = "viridis"
+REFERENCE_PROPERTY = {
+    "SaleDate": "2017-06-01",
+    "YearBuilt": 1970,
+    "RegionName": "Southern_Metropolitan",
+    "Suburb": "Other",
+    "CouncilArea": "Boroondara_City",
+    "DistanceToCBD": 10.0,
+    "Postcode": 3000,
+    "NeighbouringProperties": 7_000,
+    "RealEstateAgent": "Other",
+    "LandSize": 500,
+    "BuildingArea": 140,
+    "Rooms": 3,
+    "Bedrooms": 3,
+    "Bathrooms": 1,
+    "CarSpots": 1,
+}
+
+
+def load_tile_model(prefix: str, compiled: bool) -> None:
+    mi.load_preprocessor_and_model(prefix, compiled)
+
+
+def predict_chunk(user_inputs: pd.DataFrame) -> np.ndarray:
+    return mi.score_batch(user_inputs)
+
+
+def make_grid_inputs(bounds: dict, resolution: int, reference: dict, spatial_index=None) -> pd.DataFrame:
+    latitudes = np.linspace(*bounds["Latitude"], resolution)
+    longitudes = np.linspace(*bounds["Longitude"], resolution)
+    lat_grid, lng_grid = np.meshgrid(latitudes, longitudes, indexing="ij")
+    grid = pd.DataFrame({"Latitude": lat_grid.ravel(), "Longitude": lng_grid.ravel()})
+    for column, value in reference.items():
+        grid[column] = pd.to_datetime(value) if column == "SaleDate" else value
+    if spatial_index is not None:
+        neighbours = spatial_index.nearest_attributes(grid["Latitude"], grid["Longitude"])
+        for column in spatial.SUGGESTED_COLUMNS:
+            if column in neighbours.columns:
+                grid[column] = neighbours[column].to_numpy()
+    return grid[mi.INPUT_COLUMNS]
+
+
+def predict_grid(grid: pd.DataFrame, prefix: str = "", workers: int = None, chunk_size: int = CHUNK_SIZE,
+                 compiled: bool = False) -> np.ndarray:
+    chunks = [grid.iloc[start:start + chunk_size] for start in range(0, len(grid), chunk_size)]
+    if (workers or os.cpu_count()) <= 1:
+        load_tile_model(prefix, compiled)
+        return np.concatenate([predict_chunk(chunk) for chunk in chunks])
+    with concurrent.futures.ProcessPoolExecutor(workers, initializer=load_tile_model,
+                                                initargs=(prefix, compiled)) as executor:
+        return np.concatenate(list(executor.map(predict_chunk, chunks)))
+
+
+def build_pyramid(prices: np.ndarray, n_levels: int = N_LEVELS) -> list:
+    levels = [prices]
+    for _ in range(n_levels - 1):
+        finer = levels[0]
+        rows, columns = finer.shape[0] // 2, finer.shape[1] // 2
+        levels.insert(0, finer[:rows * 2, :columns * 2].reshape(rows, 2, columns, 2).mean(axis=(1, 3)))
+    return levels
+
+
+def get_tiles_fingerprint(prefix: str, bounds: dict, reference: dict, base_resolution: int, n_levels: int) -> str:
+    settings = json.dumps({"bounds": bounds, "reference": reference, "base_resolution": base_resolution,
+                           "n_levels": n_levels}, sort_keys=True)
+    artifacts = [prefix + path for path in MODEL_ARTIFACTS + [spatial.SPATIAL_INDEX_PATH]
+                 if os.path.exists(prefix + path)]
+    return hashlib.sha256((hash_artifacts(*artifacts) + settings).encode()).hexdigest()
+
+
+def load_tiles_manifest(prefix: str = "") -> dict:
+    if not os.path.exists(prefix + PRICE_TILES_MANIFEST):
+        return None
+    with open(prefix + PRICE_TILES_MANIFEST) as file:
+        return json.load(file)
+
+
+def save_level(prices: np.ndarray, path: str, vmin: float, vmax: float) -> None:
+    np.save(f"{path}.npy", prices)
+    plt.imsave(f"{path}.png", prices[::-1], cmap=COLORMAP, vmin=vmin, vmax=vmax)
+
+
+def build_price_tiles(prefix: str = "", reference: dict = None, base_resolution: int = BASE_RESOLUTION,
+                      n_levels: int = N_LEVELS, workers: int = None, compiled: bool = False,
+                      force: bool = False) -> dict:
+    reference = {**REFERENCE_PROPERTY, **(reference or {})}
+    bounds = {column: load_ui_metadata(prefix)["bounds"][column] for column in spatial.COORDINATE_COLUMNS}
+    fingerprint = get_tiles_fingerprint(prefix, bounds, reference, base_resolution, n_levels)
+    manifest = load_tiles_manifest(prefix)
+    if not force and manifest is not None and manifest["fingerprint"] == fingerprint:
+        return manifest
+    spatial_index = spatial.load_spatial_index(prefix) if os.path.exists(prefix + spatial.SPATIAL_INDEX_PATH) \
+        else None
+    resolution = base_resolution * 2 ** (n_levels - 1)
+    grid = make_grid_inputs(bounds, resolution, reference, spatial_index)
+    prices = predict_grid(grid, prefix, workers, compiled=compiled).reshape(resolution, resolution)
+    vmin, vmax = np.percentile(prices, [2, 98])
+    os.makedirs(prefix + PRICE_TILES_DIRECTORY, exist_ok=True)
+    levels = []
+    for level, level_prices in enumerate(build_pyramid(prices, n_levels)):
+        path = f"{PRICE_TILES_DIRECTORY}/level_{level}"
+        save_level(level_prices, prefix + path, vmin, vmax)
+        levels.append({"zoom": BASE_ZOOM + level, "resolution": level_prices.shape[0], "image": f"{path}.png",
+                       "prices": f"{path}.npy"})
+    manifest = {"fingerprint": fingerprint, "bounds": bounds, "reference": reference, "colormap": COLORMAP,
+                "vmin": float(vmin), "vmax": float(vmax), "levels": levels}
+    with open(prefix + PRICE_TILES_MANIFEST, "w") as file:
+        json.dump(manifest, file, indent=4)
+    return manifest
+
+
+def select_level(manifest: dict, zoom: float) -> dict:
+    candidates = [level for level in manifest["levels"] if level["zoom"] <= zoom]
+    return candidates[-1] if candidates else manifest["levels"][0]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Predict a price raster pyramid over the supported map area.")
+    parser.add_argument("--prefix", default="../", help="path prefix of the data/ and raw/ directories")
+    parser.add_argument("--reference", help="JSON file overriding fields of the reference property")
+    parser.add_argument("--base-resolution", type=int, default=BASE_RESOLUTION, help="grid cells per side at zoom 10")
+    parser.add_argument("--levels", type=int, default=N_LEVELS, help="zoom levels, each doubling the resolution")
+    parser.add_argument("--workers", type=int, help="processes scoring grid chunks")
+    parser.add_argument("--compiled", action="store_true", help="score with the NumPy tree-ensemble evaluator")
+    parser.add_argument("--force", action="store_true", help="rebuild even if the model artifacts are unchanged")
+    args = parser.parse_args()
+    reference_overrides = None
+    if args.reference:
+        with open(args.reference) as reference_file:
+            reference_overrides = json.load(reference_file)
+    start = time.perf_counter()
+    tiles = build_price_tiles(args.prefix, reference_overrides, args.base_resolution, args.levels, args.workers,
+                              args.compiled, args.force)
+    print(f"{len(tiles['levels'])} levels up to {tiles['levels'][-1]['resolution']}x"
+          f"{tiles['levels'][-1]['resolution']} ready in {time.perf_counter() - start:.2f}s")
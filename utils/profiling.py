@@ -0,0 +1,268 @@
+import argparse
+import atexit
+import contextlib
+import functools
+import importlib
+import inspect
+import json
+import os
+import pkgutil
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+import pandas as pd
+from utils.memory import reset_peak_rss
+
+TRACE_ENV_VAR = "PROFILE_TRACE"
+MEMORY_ENV_VAR = "PROFILE_MEMORY"
+EXCLUDED_MODULES = ["utils.pipeline", "utils.profiling"]
+MEMORY_MODES = ["rss", "tracemalloc", "none"]
+MIN_EVENT_US = 50
+
+tracer = None
+instrumented = {}
+proc_bytes_read = 0
+proc_bytes_written = 0
+
+
+class Tracer:
+    def __init__(self, path: str = None, memory_mode: str = "rss", min_event_us: float = MIN_EVENT_US):
+        if memory_mode not in MEMORY_MODES:
+            raise ValueError(f"Unknown memory mode {memory_mode}; expected one of {', '.join(MEMORY_MODES)}")
+        self.path = path
+        self.memory_mode = memory_mode
+        self.min_event_us = min_event_us
+        self.events = []
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        if memory_mode == "tracemalloc" and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def stack(self) -> list:
+        if not hasattr(self.local, "stack"):
+            self.local.stack = []
+        return self.local.stack
+
+    def begin(self) -> dict:
+        stack = self.stack()
+        start_memory, peak = read_memory(self.memory_mode)
+        if stack:
+            stack[-1]["child_peak"] = max(stack[-1]["child_peak"], peak)
+        if peak > start_memory:
+            reset_peak_memory(self.memory_mode)
+        span = {"start_memory": start_memory, "child_peak": 0, "profiler_io": (proc_bytes_read, proc_bytes_written),
+                "io": read_io_counters(), "cpu": time.process_time_ns(), "ts": time.perf_counter_ns()}
+        stack.append(span)
+        return span
+
+    def end(self, span: dict, name: str, category: str, args: dict) -> None:
+        duration_us = (time.perf_counter_ns() - span["ts"]) / 1000
+        cpu_ms = (time.process_time_ns() - span["cpu"]) / 1e6
+        stack = self.stack()
+        stack.pop()
+        peak = max(read_memory(self.memory_mode)[1], span["child_peak"])
+        if stack:
+            stack[-1]["child_peak"] = max(stack[-1]["child_peak"], peak)
+        if self.memory_mode != "none":
+            args.update({"peak_mb": peak / 2 ** 20, "peak_delta_mb": (peak - span["start_memory"]) / 2 ** 20})
+        if duration_us < self.min_event_us:
+            return
+        profiler_io = (proc_bytes_read - span["profiler_io"][0], proc_bytes_written - span["profiler_io"][1])
+        read_bytes, written_bytes = read_io_counters()
+        args.update({"cpu_ms": cpu_ms, "read_bytes": read_bytes - span["io"][0] - profiler_io[0],
+                     "written_bytes": written_bytes - span["io"][1] - profiler_io[1]})
+        event = {"name": name, "cat": category, "ph": "X", "ts": span["ts"] / 1000, "dur": duration_us,
+                 "pid": os.getpid(), "tid": threading.get_ident(), "args": args}
+        with self.lock:
+            self.events.append(event)
+
+
+def read_memory(memory_mode: str) -> tuple:
+    if memory_mode == "tracemalloc":
+        return tracemalloc.get_traced_memory()
+    if memory_mode == "none":
+        return 0, 0
+    try:
+        status = dict(line.split(":", 1) for line in read_proc_file("/proc/self/status").splitlines())
+        return int(status["VmRSS"].split()[0]) * 1024, int(status["VmHWM"].split()[0]) * 1024
+    except (OSError, KeyError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        return peak, peak
+
+
+def reset_peak_memory(memory_mode: str) -> None:
+    global proc_bytes_written
+    if memory_mode == "tracemalloc":
+        tracemalloc.reset_peak()
+    elif memory_mode == "rss" and reset_peak_rss():
+        proc_bytes_written += 1
+
+
+def read_proc_file(path: str) -> str:
+    global proc_bytes_read
+    with open(path, "rb") as file:
+        content = file.read()
+    proc_bytes_read += len(content)
+    return content.decode()
+
+
+def read_io_counters() -> tuple:
+    try:
+        counters = dict(line.split(":") for line in read_proc_file("/proc/self/io").splitlines())
+        return int(counters["rchar"]), int(counters["wchar"])
+    except (OSError, KeyError, ValueError):
+        return 0, 0
+
+
+def count_rows(value) -> int:
+    if isinstance(value, tuple) and value:
+        value = value[0]
+    shape = getattr(value, "shape", None)
+    return int(shape[0]) if shape else None
+
+
+def profiled(function=None, *, name: str = None, category: str = None):
+    def decorate(function):
+        module_name = function.__module__
+        if module_name == "__main__":
+            module_name = getattr(sys.modules["__main__"].__spec__, "name", module_name)
+        label = name or f"{module_name.rpartition('.')[2]}.{function.__qualname__}"
+        span_category = category or module_name
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if tracer is None:
+                return function(*args, **kwargs)
+            span = tracer.begin()
+            result = None
+            try:
+                result = function(*args, **kwargs)
+                return result
+            finally:
+                tracer.end(span, label, span_category,
+                           {"rows_in": next((rows for rows in map(count_rows, args) if rows is not None), None),
+                            "rows_out": count_rows(result)})
+        return wrapper
+    return decorate(function) if function is not None else decorate
+
+
+def not_profiled(function):
+    function.__profiled__ = False
+    return function
+
+
+@contextlib.contextmanager
+def profile_span(name: str, category: str = "span", **args):
+    if tracer is None:
+        yield args
+        return
+    span = tracer.begin()
+    try:
+        yield args
+    finally:
+        tracer.end(span, name, category, args)
+
+
+def get_profiled_modules() -> list:
+    import utils
+    return [module.name for module in pkgutil.iter_modules(utils.__path__, "utils.")
+            if module.name not in EXCLUDED_MODULES]
+
+
+def resolve_module(module_name: str):
+    main = sys.modules.get("__main__")
+    if getattr(getattr(main, "__spec__", None), "name", None) == module_name:
+        return main
+    return importlib.import_module(module_name)
+
+
+def is_profilable(module, name: str, value) -> bool:
+    return inspect.isfunction(value) and not name.startswith("_") and value.__module__ == module.__name__ \
+        and getattr(value, "__profiled__", True) and not hasattr(value, "__wrapped__") \
+        and not inspect.isgeneratorfunction(value) and not inspect.iscoroutinefunction(value)
+
+
+def instrument_modules(module_names: list = None) -> int:
+    for module_name in module_names or get_profiled_modules():
+        module = resolve_module(module_name)
+        for name, value in list(vars(module).items()):
+            if is_profilable(module, name, value):
+                instrumented[value] = profiled(value)
+    for module in list(sys.modules.values()):
+        module_name = getattr(module, "__name__", "")
+        if module_name.partition(".")[0] not in ["utils", "benchmarks", "__main__"] or module_name in EXCLUDED_MODULES:
+            continue
+        for name, value in list(vars(module).items()):
+            if inspect.isfunction(value) and value in instrumented:
+                setattr(module, name, instrumented[value])
+    return len(instrumented)
+
+
+def enable_profiling(path: str = None, memory_mode: str = "rss", min_event_us: float = MIN_EVENT_US) -> Tracer:
+    global tracer
+    disable_profiling()
+    instrument_modules()
+    tracer = Tracer(path, memory_mode, min_event_us)
+    return tracer
+
+
+def disable_profiling() -> list:
+    global tracer
+    if tracer is None:
+        return []
+    events = tracer.events
+    if tracer.memory_mode == "tracemalloc" and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    tracer = None
+    return events
+
+
+def add_events(events: list) -> None:
+    if tracer is not None:
+        with tracer.lock:
+            tracer.events.extend(events)
+
+
+def save_trace(path: str = None) -> str:
+    if tracer is None:
+        return None
+    path = path or tracer.path
+    with tracer.lock:
+        events = sorted(tracer.events, key=lambda event: event["ts"])
+    with open(path, "w") as file:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms",
+                   "otherData": {"command": " ".join(sys.argv)}}, file)
+    return path
+
+
+def enable_from_environment() -> Tracer:
+    if tracer is None and os.environ.get(TRACE_ENV_VAR):
+        enable_profiling(os.environ[TRACE_ENV_VAR], os.environ.get(MEMORY_ENV_VAR, "rss"))
+        atexit.register(save_trace)
+    return tracer
+
+
+def summarize_trace(path: str) -> pd.DataFrame:
+    with open(path) as file:
+        events = pd.DataFrame(json.load(file)["traceEvents"])
+    events = events[events["ph"] == "X"]
+    args = pd.DataFrame(list(events["args"]), index=events.index)
+    events = pd.concat([events[["name", "cat", "dur"]], args], axis=1)
+    aggregations = {"calls": ("dur", "size"), "wall_ms": ("dur", lambda durations: durations.sum() / 1000),
+                    "cpu_ms": ("cpu_ms", "sum"), "rows_in": ("rows_in", "max"), "rows_out": ("rows_out", "max"),
+                    "peak_mb": ("peak_mb", "max"), "peak_delta_mb": ("peak_delta_mb", "max"),
+                    "read_bytes": ("read_bytes", "sum"), "written_bytes": ("written_bytes", "sum")}
+    summary = events.groupby("name").agg(**{column: aggregation for column, aggregation in aggregations.items()
+                                            if aggregation[0] in events.columns})
+    return summary.sort_values("wall_ms", ascending=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize a trace-event file written with profiling enabled.")
+    parser.add_argument("trace_path", help="JSON trace from --profile or the PROFILE_TRACE environment variable")
+    parser.add_argument("--top", type=int, default=25, help="number of slowest spans to show")
+    args = parser.parse_args()
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print(summarize_trace(args.trace_path).head(args.top).round(2))
@@ -0,0 +1,339 @@
+import argparse
+import concurrent.futures
+import os
+import time
+import numpy as np
+import pandas as pd
+from utils.exploratory_data_analysis import safe_round
+from utils.storage import iter_dataset
+
+# Error bounds of the streaming description against get_custom_description on the same data:
+# - Mean, STD, Skewness, Kurtosis, Min, Max and Range are exact up to floating point rounding.
+# - Quartiles (and the IQR and its outlier bounds) come from a KLL sketch. Their normalized rank error is below
+#   QUANTILE_RANK_ERROR with high probability and is zero while a column has fewer than QUANTILE_CAPACITY values.
+# - Cardinality is exact (up to 64-bit hash collisions) while a column has at most DISTINCT_EXACT_CAPACITY distinct
+#   values. Above that it comes from HyperLogLog with 2 ** DISTINCT_PRECISION registers, relative standard error
+#   1.04 / sqrt(2 ** DISTINCT_PRECISION) (0.8%).
+# - Majority and MajorityPercentage come from Misra-Gries counters. They are exact while a column has at most
+#   HEAVY_HITTER_CAPACITY distinct values, otherwise the majority count is under-estimated by at most
+#   count / (HEAVY_HITTER_CAPACITY + 1).
+# - IQROutliers and ZScoreOutliers are exact counts against the sketched bounds.
+QUANTILE_CAPACITY = 2048
+QUANTILE_RANK_ERROR = 0.005
+DISTINCT_PRECISION = 14
+DISTINCT_EXACT_CAPACITY = 4096
+HEAVY_HITTER_CAPACITY = 1024
+
+
+class MomentSketch:
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.m3 = 0.0
+        self.m4 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values: np.ndarray) -> None:
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        other = MomentSketch()
+        other.count = len(values)
+        other.mean = values.mean()
+        deviations = values - other.mean
+        squared = deviations ** 2
+        other.m2 = squared.sum()
+        other.m3 = (squared * deviations).sum()
+        other.m4 = (squared ** 2).sum()
+        other.min, other.max = values.min(), values.max()
+        self.merge(other)
+
+    def merge(self, other: "MomentSketch") -> None:
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.__dict__.update(other.__dict__)
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        delta_n = delta / count
+        m2 = self.m2 + other.m2 + delta * delta_n * self.count * other.count
+        m3 = (self.m3 + other.m3 + delta * delta_n ** 2 * self.count * other.count * (self.count - other.count)
+              + 3 * delta_n * (self.count * other.m2 - other.count * self.m2))
+        m4 = (self.m4 + other.m4 + delta * delta_n ** 3 * self.count * other.count
+              * (self.count ** 2 - self.count * other.count + other.count ** 2)
+              + 6 * delta_n ** 2 * (self.count ** 2 * other.m2 + other.count ** 2 * self.m2)
+              + 4 * delta_n * (self.count * other.m3 - other.count * self.m3))
+        self.mean += delta_n * other.count
+        self.count, self.m2, self.m3, self.m4 = count, m2, m3, m4
+        self.min, self.max = min(self.min, other.min), max(self.max, other.max)
+
+    def std(self) -> float:
+        return np.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else np.nan
+
+    def skew(self) -> float:
+        if self.count < 3:
+            return np.nan
+        if self.m2 == 0:
+            return 0.0
+        n = self.count
+        return np.sqrt(n - 1) * n / (n - 2) * self.m3 / self.m2 ** 1.5
+
+    def kurtosis(self) -> float:
+        if self.count < 4:
+            return np.nan
+        if self.m2 == 0:
+            return 0.0
+        n = self.count
+        adjustment = 3 * (n - 1) ** 2 / ((n - 2) * (n - 3))
+        return n * (n + 1) * (n - 1) * self.m4 / ((n - 2) * (n - 3) * self.m2 ** 2) - adjustment
+
+
+class QuantileSketch:
+    def __init__(self, capacity: int = QUANTILE_CAPACITY, seed: int = 0):
+        self.capacity = capacity
+        self.levels = [np.empty(0)]
+        self.rng = np.random.default_rng(seed)
+
+    def update(self, values: np.ndarray) -> None:
+        self.levels[0] = np.concatenate([self.levels[0], values[~np.isnan(values)]])
+        self.compress()
+
+    def merge(self, other: "QuantileSketch") -> None:
+        for height, level in enumerate(other.levels):
+            if height == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[height] = np.concatenate([self.levels[height], level])
+        self.compress()
+
+    def compress(self) -> None:
+        height = 0
+        while height < len(self.levels):
+            if len(self.levels[height]) > self.capacity:
+                if height + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                level = np.sort(self.levels[height])
+                kept = len(level) % 2
+                promoted = level[kept + self.rng.integers(2)::2]
+                self.levels[height + 1] = np.concatenate([self.levels[height + 1], promoted])
+                self.levels[height] = level[:kept]
+            height += 1
+
+    def quantile(self, q: float) -> float:
+        values = np.concatenate(self.levels)
+        if len(values) == 0:
+            return np.nan
+        weights = np.concatenate([np.full(len(level), 2.0 ** height) for height, level in enumerate(self.levels)])
+        order = np.argsort(values, kind="stable")
+        values, weights = values[order], weights[order]
+        ranks = np.cumsum(weights) - weights / 2
+        return np.interp(q * (weights.sum() - 1) + 0.5, ranks, values)
+
+
+class DistinctSketch:
+    def __init__(self, precision: int = DISTINCT_PRECISION, exact_capacity: int = DISTINCT_EXACT_CAPACITY):
+        self.precision = precision
+        self.exact_capacity = exact_capacity
+        self.registers = np.zeros(2 ** precision, dtype="uint8")
+        self.hashes = np.empty(0, dtype="uint64")
+
+    def update(self, values: np.ndarray) -> None:
+        hashes = pd.util.hash_array(values)
+        self.add_exact(hashes)
+        buckets = (hashes >> np.uint64(64 - self.precision)).astype("intp")
+        remainder = hashes << np.uint64(self.precision)
+        high, low = (remainder >> np.uint64(32)).astype("uint32"), remainder.astype("uint32")
+        highest_bit = np.where(high > 0, 32 + np.floor(np.log2(np.maximum(high, 1))),
+                               np.floor(np.log2(np.maximum(low, 1))))
+        ranks = np.where(remainder > 0, 64 - highest_bit, 64 - self.precision + 1).astype("uint8")
+        np.maximum.at(self.registers, buckets, ranks)
+
+    def add_exact(self, hashes: np.ndarray) -> None:
+        if self.hashes is not None:
+            self.hashes = np.union1d(self.hashes, hashes)
+            if len(self.hashes) > self.exact_capacity:
+                self.hashes = None
+
+    def merge(self, other: "DistinctSketch") -> None:
+        np.maximum(self.registers, other.registers, out=self.registers)
+        if other.hashes is None:
+            self.hashes = None
+        else:
+            self.add_exact(other.hashes)
+
+    def estimate(self) -> float:
+        if self.hashes is not None:
+            return float(len(self.hashes))
+        m = len(self.registers)
+        estimate = 0.7213 / (1 + 1.079 / m) * m ** 2 / np.sum(2.0 ** -self.registers.astype("float64"))
+        zeros = np.count_nonzero(self.registers == 0)
+        if estimate <= 2.5 * m and zeros:
+            return m * np.log(m / zeros)
+        return estimate
+
+
+class HeavyHitterSketch:
+    def __init__(self, capacity: int = HEAVY_HITTER_CAPACITY):
+        self.capacity = capacity
+        self.counts = pd.Series(dtype="int64")
+
+    def update(self, values: pd.Series) -> None:
+        self.merge_counts(values.value_counts(sort=False))
+
+    def merge(self, other: "HeavyHitterSketch") -> None:
+        self.merge_counts(other.counts)
+
+    def merge_counts(self, counts: pd.Series) -> None:
+        counts = self.counts.add(counts.astype("int64"), fill_value=0).astype("int64")
+        if len(counts) > self.capacity:
+            counts = counts - counts.nlargest(self.capacity + 1).iloc[-1]
+            counts = counts[counts > 0]
+        self.counts = counts
+
+    def majority(self) -> tuple:
+        if self.counts.empty:
+            return np.nan, np.nan
+        return self.counts.idxmax(), self.counts.max()
+
+
+class ColumnSketch:
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.count = 0
+        self.moments = MomentSketch() if kind != "other" else None
+        self.quantiles = QuantileSketch() if kind != "other" else None
+        self.distinct = DistinctSketch() if kind == "other" else None
+        self.heavy_hitters = HeavyHitterSketch() if kind == "other" else None
+
+    def update(self, values: pd.Series) -> None:
+        self.count += int(values.count())
+        if self.kind == "other":
+            counts = values.value_counts(sort=False)
+            counts = counts[counts > 0]
+            self.distinct.update(counts.index.astype(str).to_numpy(dtype=object))
+            self.heavy_hitters.merge_counts(counts)
+            return
+        numbers = to_numbers(values)
+        self.moments.update(numbers)
+        self.quantiles.update(numbers)
+
+    def merge(self, other: "ColumnSketch") -> None:
+        self.count += other.count
+        for name in ("moments", "quantiles", "distinct", "heavy_hitters"):
+            if getattr(self, name) is not None:
+                getattr(self, name).merge(getattr(other, name))
+
+
+def get_column_kind(values: pd.Series) -> str:
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return "datetime"
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        return "number"
+    return "other"
+
+
+def to_numbers(values: pd.Series) -> np.ndarray:
+    if pd.api.types.is_datetime64_any_dtype(values):
+        numbers = values.to_numpy(dtype="datetime64[ns]").astype("int64").astype("float64")
+        numbers[values.isna().to_numpy()] = np.nan
+        return numbers
+    return values.to_numpy(dtype="float64", na_value=np.nan)
+
+
+def summarize_partition(partition: pd.DataFrame) -> dict:
+    sketches = {}
+    for column in partition.columns:
+        sketches[column] = ColumnSketch(get_column_kind(partition[column]))
+        sketches[column].update(partition[column])
+    return sketches
+
+
+def merge_summaries(summaries: dict, other: dict) -> dict:
+    for column, sketch in other.items():
+        if column in summaries:
+            summaries[column].merge(sketch)
+        else:
+            summaries[column] = sketch
+    return summaries
+
+
+def count_partition_outliers(partition: pd.DataFrame, bounds: pd.DataFrame) -> pd.DataFrame:
+    counts = pd.DataFrame(0, index=bounds.index, columns=["IQROutliers", "ZScoreOutliers"])
+    for column, row in bounds.iterrows():
+        values = partition[column].to_numpy(dtype="float64", na_value=np.nan)
+        counts.at[column, "IQROutliers"] = np.count_nonzero((values < row["IQRLower"]) | (values > row["IQRUpper"]))
+        zscore = (values - row["mean"]) / row["std"]
+        counts.at[column, "ZScoreOutliers"] = np.count_nonzero((zscore < -3) | (zscore > 3))
+    return counts
+
+
+def map_partitions(executor: concurrent.futures.Executor, function, partitions, window: int, *args) -> list:
+    pending, results = [], []
+    for partition in partitions:
+        pending.append(executor.submit(function, partition, *args))
+        if len(pending) >= window:
+            results.append(pending.pop(0).result())
+    return results + [future.result() for future in pending]
+
+
+def build_streaming_description(summaries: dict, outliers: pd.DataFrame) -> pd.DataFrame:
+    description = pd.DataFrame(index=list(summaries), columns=["Cardinality", "Majority", "MajorityPercentage",
+                                                               "Min", "Max", "Range", "Skewness", "IQR", "IQROutliers",
+                                                               "Kurtosis", "Mean", "STD", "ZScoreOutliers"],
+                               dtype=object)
+    for column, sketch in summaries.items():
+        if sketch.kind == "other":
+            majority, frequency = sketch.heavy_hitters.majority()
+            description.at[column, "Cardinality"] = min(round(sketch.distinct.estimate()), sketch.count)
+            description.at[column, "Majority"] = majority
+            description.at[column, "MajorityPercentage"] = frequency / sketch.count if sketch.count else np.nan
+            continue
+        q1, q3 = sketch.quantiles.quantile(0.25), sketch.quantiles.quantile(0.75)
+        minimum, maximum, mean = sketch.moments.min, sketch.moments.max, sketch.moments.mean
+        if sketch.kind == "datetime":
+            to_time = lambda value: pd.Timestamp(round(value))
+            minimum, maximum, mean, q1, q3 = map(to_time, (minimum, maximum, mean, q1, q3))
+        else:
+            description.at[column, "Skewness"] = sketch.moments.skew()
+            description.at[column, "Kurtosis"] = sketch.moments.kurtosis()
+            description.at[column, "STD"] = sketch.moments.std()
+            description.at[column, "IQROutliers"] = outliers.at[column, "IQROutliers"]
+            description.at[column, "ZScoreOutliers"] = outliers.at[column, "ZScoreOutliers"]
+        description.at[column, "Min"], description.at[column, "Max"] = minimum, maximum
+        description.at[column, "Range"], description.at[column, "Mean"] = maximum - minimum, mean
+        description.at[column, "IQR"] = q3 - q1
+    return description.map(safe_round).T
+
+
+def get_streaming_description(path: str, chunk_size: int = 100_000, workers: int = None) -> pd.DataFrame:
+    window = 2 * (workers or os.cpu_count())
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        summaries = {}
+        for summary in map_partitions(executor, summarize_partition, iter_dataset(path, chunk_size), window):
+            merge_summaries(summaries, summary)
+        numbers = [column for column, sketch in summaries.items() if sketch.kind == "number"]
+        bounds = pd.DataFrame(index=numbers, columns=["IQRLower", "IQRUpper", "mean", "std"], dtype="float64")
+        for column in numbers:
+            q1, q3 = summaries[column].quantiles.quantile(0.25), summaries[column].quantiles.quantile(0.75)
+            bounds.loc[column] = [q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1), summaries[column].moments.mean,
+                                  summaries[column].moments.std()]
+        outliers = pd.DataFrame(0, index=numbers, columns=["IQROutliers", "ZScoreOutliers"])
+        for counts in map_partitions(executor, count_partition_outliers, iter_dataset(path, chunk_size, numbers),
+                                     window, bounds):
+            outliers += counts
+    return build_streaming_description(summaries, outliers)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Describe a dataset chunk by chunk with mergeable sketches.")
+    parser.add_argument("path", nargs="?", default="../data/ENGINEERED_Melbourne_Housing_Market",
+                        help="dataset path without extension")
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, help="partitions summarized at once")
+    args = parser.parse_args()
+    start = time.perf_counter()
+    description = get_streaming_description(args.path, args.chunk_size, args.workers)
+    print(description.to_string())
+    print(f"Described {args.path} in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,120 @@
+import argparse
+import collections
+import functools
+import time
+import numpy as np
+import pandas as pd
+import joblib
+from sklearn.neighbors import BallTree
+from utils.storage import load_dataset
+
+SPATIAL_INDEX_PATH = "raw/spatial_index.pkl"
+COORDINATE_COLUMNS = ["Latitude", "Longitude"]
+ATTRIBUTE_COLUMNS = ["Suburb", "CouncilArea", "RegionName", "Postcode", "DistanceToCBD", "NeighbouringProperties",
+                     "Price"]
+SUGGESTED_COLUMNS = ["Suburb", "CouncilArea", "RegionName", "Postcode", "DistanceToCBD", "NeighbouringProperties"]
+EARTH_RADIUS_KM = 6371.0088
+LEAF_SIZE = 40
+
+
+class SpatialIndex:
+    def __init__(self, tree: BallTree, attributes: dict):
+        self.tree = tree
+        self.attributes = attributes
+
+    def __len__(self) -> int:
+        return self.tree.data.shape[0]
+
+    def query(self, lat: float, lng: float, k: int = 10) -> tuple:
+        distances, indices = self.tree.query([[np.radians(lat), np.radians(lng)]], min(k, len(self)))
+        return distances[0] * EARTH_RADIUS_KM, indices[0]
+
+    def nearest(self, lat: float, lng: float, k: int = 10) -> pd.DataFrame:
+        distances, indices = self.query(lat, lng, k)
+        return pd.DataFrame({"DistanceKm": distances,
+                             **{column: values[indices] for column, values in self.attributes.items()}})
+
+    def nearest_attributes(self, latitudes, longitudes) -> pd.DataFrame:
+        points = np.radians(np.column_stack([latitudes, longitudes]).astype(float))
+        distances, indices = self.tree.query(points, 1)
+        return pd.DataFrame({"DistanceKm": distances[:, 0] * EARTH_RADIUS_KM,
+                             **{column: values[indices[:, 0]] for column, values in self.attributes.items()}})
+
+    def suggest_inputs(self, lat: float, lng: float, k: int = 10) -> dict:
+        distances, indices = self.query(lat, lng, k)
+        suggestions = {}
+        for column in SUGGESTED_COLUMNS:
+            if column not in self.attributes:
+                continue
+            values = self.attributes[column][indices]
+            if column == "DistanceToCBD":
+                suggestions[column] = float(np.average(values, weights=1 / np.maximum(distances, 1e-3)))
+            else:
+                suggestions[column] = collections.Counter(values.tolist()).most_common(1)[0][0]
+        return suggestions
+
+    def radius_aggregate(self, latitudes, longitudes, radius_km: float = 1.0, column: str = "Price",
+                         statistic: str = "median") -> np.ndarray:
+        points = np.radians(np.column_stack([latitudes, longitudes]).astype(float))
+        indices = self.tree.query_radius(points, radius_km / EARTH_RADIUS_KM)
+        counts = np.fromiter((len(neighbours) for neighbours in indices), dtype=np.int64, count=len(indices))
+        result = np.full(len(points), 0.0 if statistic in ["count", "size"] else np.nan)
+        if counts.sum() == 0:
+            return result
+        values = pd.Series(self.attributes[column][np.concatenate(indices)])
+        aggregates = values.groupby(np.repeat(np.arange(len(points)), counts)).agg(statistic)
+        result[aggregates.index.to_numpy()] = aggregates.to_numpy()
+        return result
+
+
+def build_spatial_index(df: pd.DataFrame, leaf_size: int = LEAF_SIZE) -> SpatialIndex:
+    df = df.dropna(subset=COORDINATE_COLUMNS)
+    tree = BallTree(np.radians(df[COORDINATE_COLUMNS].to_numpy(float)), leaf_size, metric="haversine")
+    attributes = {column: np.asarray(df[column].astype(object) if isinstance(df[column].dtype, pd.CategoricalDtype)
+                                     else df[column]) for column in ATTRIBUTE_COLUMNS if column in df.columns}
+    return SpatialIndex(tree, attributes)
+
+
+def save_spatial_index(index: SpatialIndex, prefix: str = "") -> str:
+    joblib.dump({"tree": index.tree, "attributes": index.attributes}, prefix + SPATIAL_INDEX_PATH)
+    return prefix + SPATIAL_INDEX_PATH
+
+
+def load_spatial_index(prefix: str = "") -> SpatialIndex:
+    return SpatialIndex(**joblib.load(prefix + SPATIAL_INDEX_PATH))
+
+
+def scan_nearest(df: pd.DataFrame, lat: float, lng: float, k: int = 10) -> pd.DataFrame:
+    lat_radians, lng_radians = np.radians(df["Latitude"].to_numpy(float)), np.radians(df["Longitude"].to_numpy(float))
+    a = np.sin((lat_radians - np.radians(lat)) / 2) ** 2 + np.cos(lat_radians) * np.cos(np.radians(lat)) * np.sin(
+        (lng_radians - np.radians(lng)) / 2) ** 2
+    distances = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+    nearest = np.argsort(distances)[:k]
+    neighbours = df.iloc[nearest][[column for column in ATTRIBUTE_COLUMNS if column in df.columns]]
+    neighbours = neighbours.reset_index(drop=True)
+    neighbours.insert(0, "DistanceKm", distances[nearest])
+    return neighbours
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the sales spatial index and time lookups against a scan.")
+    parser.add_argument("--prefix", default="../", help="path prefix of the data/ and raw/ directories")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--radius-km", type=float, default=1.0)
+    parser.add_argument("--queries", type=int, default=1_000)
+    args = parser.parse_args()
+    dataset = load_dataset(f"{args.prefix}data/ANALYSED_Melbourne_Housing_Market")
+    start = time.perf_counter()
+    spatial_index = build_spatial_index(dataset)
+    print(f"Indexed {len(spatial_index)} sales in {time.perf_counter() - start:.2f}s "
+          f"into {save_spatial_index(spatial_index, args.prefix)}")
+    points = dataset[COORDINATE_COLUMNS].sample(args.queries, replace=True, random_state=42).to_numpy()
+    for name, lookup in [("index", spatial_index.nearest), ("scan", functools.partial(scan_nearest, dataset))]:
+        start = time.perf_counter()
+        for lat, lng in points:
+            lookup(lat, lng, args.k)
+        print(f"{name}: {(time.perf_counter() - start) / len(points) * 1000:.3f} ms per {args.k}-nearest lookup")
+    start = time.perf_counter()
+    medians = spatial_index.radius_aggregate(points[:, 0], points[:, 1], args.radius_km)
+    print(f"Median price within {args.radius_km} km of {len(points)} points in "
+          f"{(time.perf_counter() - start) * 1000:.1f} ms ({np.isnan(medians).sum()} points with no sales)")
@@ -0,0 +1,92 @@
+import argparse
+import glob
+import os
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as parquet
+except ImportError:
+    pa = None
+
+FORMAT_EXTENSIONS = {"feather": ".feather", "parquet": ".parquet", "csv": ".csv"}
+DEFAULT_FORMAT = "feather" if pa is not None else "csv"
+MAX_CATEGORICAL_RATIO = 0.5
+
+
+def encode_categoricals(df_input: pd.DataFrame) -> pd.DataFrame:
+    df = df_input.copy(deep=False)
+    for column in df.select_dtypes(include="object").columns:
+        if df[column].nunique() <= MAX_CATEGORICAL_RATIO * len(df):
+            df[column] = df[column].astype("category")
+    return df
+
+
+def find_dataset(path: str) -> tuple:
+    for fmt, extension in FORMAT_EXTENSIONS.items():
+        if os.path.exists(path + extension) and (fmt == "csv" or pa is not None):
+            return path + extension, fmt
+    raise FileNotFoundError(f"No {', '.join(FORMAT_EXTENSIONS.values())} dataset found for {path}")
+
+
+def save_dataset(df: pd.DataFrame, path: str, fmt: str = None, **csv_options) -> str:
+    fmt = fmt or DEFAULT_FORMAT
+    file_path = path + FORMAT_EXTENSIONS[fmt]
+    if fmt == "csv":
+        df.to_csv(file_path, **{"index": False, **csv_options})
+        return file_path
+    if pa is None:
+        raise ImportError(f"pyarrow is required to write {fmt} datasets")
+    table = pa.Table.from_pandas(encode_categoricals(df), preserve_index=False)
+    if fmt == "feather":
+        feather.write_feather(table, file_path, compression="uncompressed")
+    else:
+        parquet.write_table(table, file_path)
+    return file_path
+
+
+def read_dataset_file(file_path: str, columns: list = None, **csv_options) -> pd.DataFrame:
+    if file_path.endswith(FORMAT_EXTENSIONS["feather"]):
+        return feather.read_table(file_path, columns=columns, memory_map=True).to_pandas()
+    if file_path.endswith(FORMAT_EXTENSIONS["parquet"]):
+        return parquet.read_table(file_path, columns=columns, memory_map=True).to_pandas()
+    df = pd.read_csv(file_path, usecols=columns, **csv_options)
+    if "SaleDate" in df.columns:
+        df["SaleDate"] = pd.to_datetime(df["SaleDate"])
+    return df
+
+
+def load_dataset(path: str, columns: list = None, **csv_options) -> pd.DataFrame:
+    file_path, _ = find_dataset(path)
+    return read_dataset_file(file_path, columns, **csv_options)
+
+
+def iter_dataset(path: str, chunk_size: int = 100_000, columns: list = None, **csv_options):
+    file_path, fmt = find_dataset(path)
+    if fmt == "csv":
+        for chunk in pd.read_csv(file_path, usecols=columns, chunksize=chunk_size, **csv_options):
+            if "SaleDate" in chunk.columns:
+                chunk["SaleDate"] = pd.to_datetime(chunk["SaleDate"])
+            yield chunk
+    elif fmt == "feather":
+        table = feather.read_table(file_path, columns=columns, memory_map=True)
+        for start in range(0, table.num_rows, chunk_size):
+            yield table.slice(start, chunk_size).to_pandas()
+    else:
+        for batch in parquet.ParquetFile(file_path, memory_map=True).iter_batches(chunk_size, columns=columns):
+            yield batch.to_pandas()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert the stored pipeline datasets between formats.")
+    parser.add_argument("--directory", default="../data")
+    parser.add_argument("--to", choices=list(FORMAT_EXTENSIONS), default="csv")
+    args = parser.parse_args()
+    for file_path in sorted(glob.glob(os.path.join(args.directory, "**", "*.*"), recursive=True)):
+        path, extension = os.path.splitext(file_path)
+        if extension not in FORMAT_EXTENSIONS.values() or extension == FORMAT_EXTENSIONS[args.to]:
+            continue
+        is_target = os.path.basename(path).startswith("y_")
+        df = read_dataset_file(file_path, header=None if is_target else "infer")
+        print(f"{file_path} -> {save_dataset(df, path, args.to, header=not is_target)}")
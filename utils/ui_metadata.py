@@ -0,0 +1,67 @@
+import argparse
+import json
+import os
+
+UI_METADATA_PATH = "data/ui_metadata.json"
+BOUND_COLUMNS = ["Latitude", "Longitude", "DistanceToCBD"]
+CATEGORY_COLUMNS = ["RegionName", "CouncilArea"]
+MODEL_CATEGORY_COLUMNS = ["Suburb", "RealEstateAgent"]
+COUNT_COLUMNS = ["Bedrooms", "Rooms", "Bathrooms", "CarSpots"]
+PREVIEW_ROWS = 5
+
+
+# Only the standard library is imported at module level: the Streamlit pages import this module on every cold start,
+# while pandas, scikit-learn and the pickled artifacts are needed only when the manifest is (re)built.
+def build_ui_metadata(prefix: str = "") -> dict:
+    import utils.model_interface as mi
+    from utils.storage import load_dataset
+
+    df = load_dataset(f"{prefix}data/ANALYSED_Melbourne_Housing_Market")
+    if mi.preprocessor is None:
+        mi.load_preprocessor_and_model(prefix)
+    preview = json.loads(df.head(PREVIEW_ROWS).to_json(orient="split", index=False, date_format="iso"))
+    return {
+        "artifact_hash": mi.artifact_hash,
+        "n_rows": len(df),
+        "columns": list(df.columns),
+        "preview": {column: [row[index] for row in preview["data"]] for index, column in enumerate(preview["columns"])},
+        "bounds": {column: [float(df[column].min()), float(df[column].max())] for column in BOUND_COLUMNS},
+        "categories": {
+            **{column: sorted(map(str, df[column].dropna().unique())) for column in CATEGORY_COLUMNS},
+            **{column: list(map(str, mi.get_category_options(column))) for column in MODEL_CATEGORY_COLUMNS},
+            **{column: sorted(map(int, df[column].dropna().unique())) for column in COUNT_COLUMNS},
+        },
+    }
+
+
+def save_ui_metadata(metadata: dict, prefix: str = "") -> str:
+    path = prefix + UI_METADATA_PATH
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as file:
+        json.dump(metadata, file, indent=4)
+    return path
+
+
+def load_ui_metadata(prefix: str = "", build_missing: bool = True) -> dict:
+    path = prefix + UI_METADATA_PATH
+    if not os.path.exists(path):
+        if not build_missing:
+            raise FileNotFoundError(f"{path} not found; run the pipeline or utils/ui_metadata.py first")
+        save_ui_metadata(build_ui_metadata(prefix), prefix)
+    with open(path) as file:
+        return json.load(file)
+
+
+def get_file_version(path: str) -> float:
+    return os.path.getmtime(path) if os.path.exists(path) else 0.0
+
+
+def get_ui_metadata_version(prefix: str = "") -> float:
+    return get_file_version(prefix + UI_METADATA_PATH)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute the widget bounds and options used by the Streamlit app.")
+    parser.add_argument("--prefix", default="../", help="path prefix of the data/ and raw/ directories")
+    args = parser.parse_args()
+    print(f"Wrote {save_ui_metadata(build_ui_metadata(args.prefix), args.prefix)}")